@@ -0,0 +1,51 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..core.config import settings
+from ..core.profiler import ProfilerBusy, stack_sampler
+from ..core.security import get_admin_user
+from ..core.slow_queries import slow_query_log
+from ..schemas.admin import SlowQuery
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/slow-queries", response_model=List[SlowQuery])
+async def read_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    admin: str = Depends(get_admin_user)
+):
+    """
+    The most recent slow statements this worker ran, newest first. Empty
+    unless SLOW_QUERY_LOG_ENABLED is set; each worker keeps its own buffer.
+    """
+    return slow_query_log.recent(limit)
+
+
+@router.get("/profile", response_class=PlainTextResponse, responses={200: {"content": {"application/json": {}}}})
+async def read_profile(
+    seconds: float = Query(5.0, gt=0, description="How long to sample"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Time between samples"),
+    format: Literal["collapsed", "speedscope"] = "collapsed",
+    by_route: bool = Query(False, description="Tag event loop samples with the route being served"),
+    admin: str = Depends(get_admin_user)
+):
+    """
+    Sample the stacks of this worker's threads for ``seconds`` and return
+    them as collapsed stacks (one ``thread;frame;frame count`` line per
+    stack) or as a speedscope file. One profile runs at a time per worker;
+    another request meanwhile gets 409.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled")
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PROFILER_MAX_SECONDS:g} seconds per profile")
+    try:
+        profile = await stack_sampler.profile(seconds, interval_ms / 1000, by_route)
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if format == "speedscope":
+        return JSONResponse(profile.speedscope())
+    return PlainTextResponse(profile.collapsed())
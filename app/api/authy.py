@@ -1,81 +1,171 @@
 # app/api/authy.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from jose import jwt, JWTError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
-from app.core.database import get_db
-from app.schemas.user import UserCreate
+from app.core.revocation import revocations, revoke
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    create_reset_token,
+    decode_token,
+    get_password_hash,
+    verify_password,
+)
+from app.core.database import get_directory_db, tenant_session
+from app.core.outbox import enqueue_email, password_changed_email, password_reset_email
+from app.core.shards import claim_tenant, record_tenant_user, release_tenant
+from app.api import queries
+from app.schemas.user import UserCreate, TokenRefresh
 from app.models.user import User
 from pydantic import EmailStr
 
 router = APIRouter(tags=["authentication"])
 
+def _token_pair(email: str) -> dict:
+    return {
+        "access_token": create_access_token(data={"sub": email}),
+        "refresh_token": create_refresh_token(data={"sub": email}),
+        "token_type": "bearer",
+    }
+
+def _expiry(payload: dict) -> datetime:
+    return datetime.utcfromtimestamp(payload["exp"])
+
 # Register a new user
 @router.post("/register")
-async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == user.email))
-    existing_user = result.scalars().first()
-
-    if existing_user:
+async def register(user: UserCreate, db: AsyncSession = Depends(get_directory_db)):
+    # With several shards the directory entry reserves the email on all of
+    # them and places the tenant; see app/core/shards.py.
+    if not await claim_tenant(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
-    new_user = User(email=user.email, hashed_password=hashed_password)
+    try:
+        async with tenant_session(user.email, db) as tenant_db:
+            result = await tenant_db.execute(queries.USER_BY_EMAIL, {"email": user.email})
+            existing_user = result.scalars().first()
 
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+            if existing_user:
+                raise HTTPException(status_code=400, detail="Email already registered")
 
+            hashed_password = get_password_hash(user.password)
+            new_user = User(email=user.email, hashed_password=hashed_password)
+
+            tenant_db.add(new_user)
+            await tenant_db.commit()
+            await tenant_db.refresh(new_user)
+    except Exception:
+        await release_tenant(db, user.email)
+        raise
+
+    await record_tenant_user(db, user.email, new_user.id)
     return {"msg": "User created successfully"}
 
-# Login and get JWT token
+# Login and get an access token plus a refresh token
 @router.post("/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == form_data.username))
-    user = result.scalars().first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_directory_db)):
+    async with tenant_session(form_data.username, db) as tenant_db:
+        result = await tenant_db.execute(queries.USER_BY_EMAIL, {"email": form_data.username})
+        user = result.scalars().first()
 
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _token_pair(user.email)
+
+# Exchange a refresh token for a new pair; the old refresh token is revoked
+@router.post("/refresh")
+async def refresh(body: TokenRefresh, db: AsyncSession = Depends(get_directory_db)):
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+    payload = decode_token(body.refresh_token, "refresh", check_revoked=False)
+    if not payload:
+        raise invalid
+    email = payload["sub"]
+
+    # The unique jti makes rotation atomic: only one exchange of a given
+    # refresh token can insert its revocation. Presenting a rotated-out token
+    # again means it leaked, so every token of the user is revoked.
+    reused = revocations.is_token_revoked(payload["jti"])
+    if not reused:
+        if revocations.is_revoked(None, email, payload.get("iat")):
+            raise invalid  # issued before a password reset
+        revoke(db, email, _expiry(payload), jti=payload["jti"])
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            reused = True
+    if reused:
+        revoke(db, email, datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+               revoked_before=datetime.utcnow())
+        await db.commit()
+        raise invalid
+
+    return _token_pair(email)
+
+# Revoke a refresh token (and the access token presented with it, if any)
+@router.post("/logout")
+async def logout(body: TokenRefresh, request: Request, db: AsyncSession = Depends(get_directory_db)):
+    payload = decode_token(body.refresh_token, "refresh")
+    if payload:
+        revoke(db, payload["sub"], _expiry(payload), jti=payload["jti"])
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    access = decode_token(token, "access") if scheme.lower() == "bearer" else None
+    if access:
+        revoke(db, access["sub"], _expiry(access), jti=access["jti"])
 
-# Forgot password - return reset token
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()  # already revoked
+    return {"msg": "Logged out"}
+
+# Forgot password - email a reset link
 @router.post("/forgot-password")
-async def forgot_password(email: EmailStr, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalars().first()
+async def forgot_password(email: EmailStr, db: AsyncSession = Depends(get_directory_db)):
+    async with tenant_session(email, db) as tenant_db:
+        result = await tenant_db.execute(queries.USER_BY_EMAIL, {"email": email})
+        user = result.scalars().first()
+
+        if not user:
+            raise HTTPException(status_code=404, detail="Email not found")
 
-    if not user:
-        raise HTTPException(status_code=404, detail="Email not found")
+        reset_token = create_reset_token(data={"sub": user.email})
+        # Sent by the outbox dispatcher once this commits; see app/core/outbox.py.
+        enqueue_email(tenant_db, "password_reset", user.email, *password_reset_email(reset_token), user_id=user.id)
+        await tenant_db.commit()
 
-    reset_token = create_access_token(data={"sub": user.email}, expires_delta=timedelta(hours=1))
-    return {"msg": "Password reset email sent", "reset_token": reset_token}
+    return {"msg": "Password reset email sent"}
 
-# Reset password using token
+# Reset password using token; revokes every token issued before the reset
 @router.post("/reset-password")
-async def reset_password(token: str, new_password: str, db: AsyncSession = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=400, detail="Invalid token")
-    except JWTError:
+async def reset_password(token: str, new_password: str, db: AsyncSession = Depends(get_directory_db)):
+    payload = decode_token(token, "reset")
+    if not payload:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
-
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalars().first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user.hashed_password = get_password_hash(new_password)
-    await db.commit()
+    email = payload["sub"]
+
+    async with tenant_session(email, db) as tenant_db:
+        result = await tenant_db.execute(queries.USER_BY_EMAIL, {"email": email})
+        user = result.scalars().first()
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        user.hashed_password = get_password_hash(new_password)
+        enqueue_email(tenant_db, "password_changed", user.email, *password_changed_email(), user_id=user.id)
+        # Refresh tokens are the longest-lived tokens the cutoff has to outlast.
+        revoke(db, email, datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+               revoked_before=datetime.utcnow())
+        # Revocations live on the directory database. When the tenant is on
+        # another shard, commit them first: a failed password update then
+        # leaves the user logged out rather than their old tokens valid.
+        await db.commit()
+        await tenant_db.commit()
 
     return {"msg": "Password reset successfully"}
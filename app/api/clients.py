@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+from datetime import datetime
 from typing import List
 
-from ..core.database import get_db
+from . import queries
+from ..core.database import get_db, get_read_db
+from ..core.idempotency import Idempotency, idempotency
+from ..core.jobs import enqueue
+from ..core.live import activity_event, kpi_event, publish, RESYNC
 from ..core.security import get_current_user
+from ..core.suggest import client_suggestions
+from ..core.sync import next_sync_seq, tombstone
 from ..models.client import Client
-from ..models.user import User
-from ..schemas.client import ClientCreate, Client as ClientSchema
+from ..models.project import Project
+from ..schemas.client import ClientCreate, ClientSuggestion, Client as ClientSchema
+from ..schemas.job import JobAccepted
 
 router = APIRouter(tags=["clients"])
 
@@ -16,46 +24,69 @@ router = APIRouter(tags=["clients"])
 async def create_client(
     client: ClientCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    idempotent: Idempotency = Depends(idempotency)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    # A retry with the same Idempotency-Key gets the first response back.
+    replayed = await idempotent.replay(db, current_user)
+    if replayed:
+        return replayed
+
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db_client = Client(**client.dict(), user_id=user.id)
+    seq = await next_sync_seq(db, user.id)
+    db_client = Client(**client.dict(), user_id=user.id, sync_seq=seq)
     db.add(db_client)
-    await db.commit()
+    publish(db, user.id, kpi_event("activeClients", 1), activity_event("added client", db_client.name))
+    replayed = await idempotent.commit(db, current_user, db_client, ClientSchema)
+    if replayed:
+        return replayed
     await db.refresh(db_client)
+    client_suggestions.upsert(current_user, db_client)
     return db_client
 
 # Read all clients
 @router.get("/clients", response_model=List[ClientSchema])
 async def read_clients(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client).where(Client.user_id == user.id))
+    result = await db.execute(queries.CLIENTS, {"user_id": user.id})
     return result.scalars().all()
 
+# Typeahead over client names, emails and phones, served from memory
+@router.get("/clients/suggest", response_model=List[ClientSuggestion])
+async def suggest_clients(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: str = Depends(get_current_user)
+):
+    matches = await client_suggestions.suggest(current_user, q, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return [{"id": id, "name": name, "email": email, "phone": phone} for id, name, email, phone in matches]
+
 # Read a specific client by ID
 @router.get("/clients/{id}", response_model=ClientSchema)
 async def read_client(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client).where(Client.id == id, Client.user_id == user.id))
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -69,40 +100,59 @@ async def update_client(
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client).where(Client.id == id, Client.user_id == user.id))
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
+    seq = await next_sync_seq(db, user.id)
     for key, value in client_data.dict().items():
         setattr(client, key, value)
+    client.sync_seq = seq
 
     await db.commit()
     await db.refresh(client)
+    client_suggestions.upsert(current_user, client)
     return client
 
 # Delete a client
-@router.delete("/clients/{id}")
+@router.delete("/clients/{id}", status_code=202, response_model=JobAccepted)
 async def delete_client(
     id: int,
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client).where(Client.id == id, Client.user_id == user.id))
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
-    await db.delete(client)
+    # Hide the client and its projects (and, through those, their payments
+    # and notes) now; a background job removes the rows in batches.
+    seq = await next_sync_seq(db, user.id)
+    client.deleted_at = datetime.utcnow()
+    client.sync_seq = seq
+    await db.execute(
+        update(Project)
+        .where(Project.client_id == client.id, Project.deleted_at.is_(None))
+        .values(deleted_at=client.deleted_at)
+        .execution_options(synchronize_session=False)
+    )
+    # Deleting a client implicitly deletes its projects, payments and notes.
+    tombstone(db, user.id, "client", client.id, seq)
+    job = enqueue(db, "purge_client", {"client_id": client.id}, user_id=user.id)
+    # Every KPI may change with the client's projects and payments gone.
+    publish(db, user.id, RESYNC)
     await db.commit()
-    return {"msg": "Client deleted successfully"}
+    client_suggestions.remove(current_user, client.id)
+    return {"msg": "Client deleted successfully", "job_id": job.id}
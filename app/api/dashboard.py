@@ -1,17 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select
-from sqlalchemy.sql import extract
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional, Tuple
 
-from app.core.database import get_db
+from app.api import queries
+from app.core.config import settings
+from app.core.database import get_read_db
 from app.core.security import get_current_user
 
-from app.models.client import Client
 from app.models.user import User
-from app.models.payment import Payment
-from app.models.project import Project
 from app.schemas.dashboard import (
     PaymentCreate,
     PaymentResponse,
@@ -22,58 +19,106 @@ from app.schemas.dashboard import (
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+Period = Literal["month", "week", "quarter"]
+
+
+def _period_bounds(period: str, now: datetime) -> Tuple[datetime, datetime, datetime]:
+    """
+    Return ``(previous_start, current_start, next_start)`` for the calendar
+    period containing ``now``. Weeks start on Monday.
+    """
+    today = datetime(now.year, now.month, now.day)
+    if period == "week":
+        current = today - timedelta(days=today.weekday())
+        return current - timedelta(weeks=1), current, current + timedelta(weeks=1)
+
+    months = 3 if period == "quarter" else 1
+    index = now.year * 12 + (now.month - 1) // months * months
+
+    def start(i: int) -> datetime:
+        return datetime(i // 12, i % 12 + 1, 1)
+
+    return start(index - months), start(index), start(index + months)
+
+
+def _format_delta(current: float, previous: float) -> str:
+    return f"{current - previous:+g}"
+
+
+def _format_percent(current: float, previous: float) -> str:
+    if not previous:
+        return "+100%" if current else "+0%"
+    return f"{(current - previous) / abs(previous) * 100:+.0f}%"
+
+
 @router.get("/kpis", response_model=KpiData)
 async def get_dashboard_kpis(
-    db: AsyncSession = Depends(get_db),
+    period: Optional[Period] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Retrieve Key Performance Indicators for the dashboard.
+
+    Each KPI is compared with the previous ``period`` (month, week or quarter;
+    defaults to ``DASHBOARD_PERIOD``). Counts report the change since the
+    start of the current period, revenue the percentage change against the
+    whole previous period. All values are the current user's. Every table is
+    read once: current and previous values come from conditional aggregates,
+    and revenue only touches the two periods through a range on the indexed
+    ``date_paid``; payments of deleted projects do not count.
     """
-    result = await db.execute(select(func.count(Client.id)))
-    active_clients_count = result.scalar() or 0
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(func.count(Project.id)).where(Project.status == 'Active'))
-    projects_in_progress_count = result.scalar() or 0
+    period = period or settings.DASHBOARD_PERIOD
+    previous_start, current_start, next_start = _period_bounds(period, datetime.utcnow())
 
-    result = await db.execute(select(func.count(Project.id)).where(Project.status == 'Pending'))
-    pending_tasks_count = result.scalar() or 0
+    result = await db.execute(queries.DASHBOARD_CLIENTS, {"user_id": user.id, "current_start": current_start})
+    active_clients, active_clients_before = result.one()
 
-    now = datetime.utcnow()
-    result = await db.execute(
-        select(func.sum(Payment.amount)).where(
-            extract('month', Payment.date_paid) == now.month,
-            extract('year', Payment.date_paid) == now.year,
-        )
-    )
-    revenue_this_month = result.scalar() or 0.0
+    result = await db.execute(queries.DASHBOARD_PROJECTS, {"user_id": user.id, "current_start": current_start})
+    projects_in_progress, projects_in_progress_before, pending_tasks, pending_tasks_before = result.one()
+
+    result = await db.execute(queries.DASHBOARD_REVENUE, {
+        "user_id": user.id,
+        "previous_day": previous_start.date(),
+        "current_day": current_start.date(),
+        "next_day": next_start.date(),
+    })
+    revenue, revenue_previous = result.one()
+    revenue, revenue_previous = revenue or 0.0, revenue_previous or 0.0
 
     return KpiData(
-        activeClients=KpiValue(value=active_clients_count, change="+0"),
-        projectsInProgress=KpiValue(value=projects_in_progress_count, change="+0"),
-        revenueThisMonth=KpiValue(value=revenue_this_month, change="+0%"),
-        pendingTasks=KpiValue(value=pending_tasks_count, change="+0"),
+        period=period,
+        activeClients=KpiValue(value=active_clients, change=_format_delta(active_clients, active_clients_before)),
+        projectsInProgress=KpiValue(
+            value=projects_in_progress,
+            change=_format_delta(projects_in_progress, projects_in_progress_before),
+        ),
+        revenueThisMonth=KpiValue(value=revenue, change=_format_percent(revenue, revenue_previous)),
+        pendingTasks=KpiValue(value=pending_tasks, change=_format_delta(pending_tasks, pending_tasks_before)),
     )
 
 @router.get("/activities", response_model=List[ActivitySchema])
 async def get_dashboard_activities(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Retrieve a feed of recent activities.
+    Retrieve a feed of the current user's recent activities.
     """
-    result = await db.execute(
-        select(Client).order_by(Client.created_at.desc()).limit(5)
-    )
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    result = await db.execute(queries.RECENT_CLIENTS, {"user_id": user.id})
     recent_clients = result.scalars().all()
 
-    result = await db.execute(
-        select(Project)
-        .where(Project.status == 'Completed')
-        .order_by(Project.updated_at.desc())
-        .limit(5)
-    )
+    result = await db.execute(queries.RECENTLY_COMPLETED_PROJECTS, {"user_id": user.id})
     completed_projects = result.scalars().all()
 
     client_activities = [
@@ -0,0 +1,27 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import queries
+from ..core.database import get_read_db
+from ..core.security import get_current_user
+from ..schemas.email import EmailDelivery
+
+router = APIRouter(tags=["emails"])
+
+@router.get("/emails", response_model=List[EmailDelivery])
+async def read_emails(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Delivery status of the last 50 emails sent to the current user.
+    """
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    result = await db.execute(queries.RECENT_EMAILS, {"user_id": user.id})
+    return result.scalars().all()
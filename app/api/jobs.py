@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import queries
+from ..core.database import get_read_db
+from ..core.security import get_current_user
+from ..schemas.job import Job as JobSchema
+
+router = APIRouter(tags=["jobs"])
+
+@router.get("/jobs/{id}", response_model=JobSchema)
+async def read_job(
+    id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Status and progress of a background job started by the current user.
+    """
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    result = await db.execute(queries.OWNED_JOB, {"job_id": id, "user_id": user.id})
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,125 @@
+import json
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from . import queries
+from ..core.admission import db_gate
+from ..core.config import settings
+from ..core.database import tenant_session
+from ..core.live import Subscription, live_hub
+from ..core.security import decode_token
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+async def _authenticate(token: Optional[str]) -> Optional[Tuple[int, float]]:
+    """
+    ``(user_id, expires_at)`` for a valid access token, or None.
+
+    The session is closed before the stream starts, so an open stream holds
+    neither a pool connection nor a DB gate slot.
+    """
+    payload = decode_token(token, "access") if token else None
+    if payload is None:
+        return None
+    async with db_gate.slot(), tenant_session(payload["sub"]) as session:
+        result = await session.execute(queries.USER_BY_EMAIL, {"email": payload["sub"]})
+        user = result.scalars().first()
+    return (user.id, float(payload["exp"])) if user else None
+
+
+async def _events(subscription: Subscription, expires_at: float) -> AsyncIterator[Optional[dict]]:
+    """
+    Yield events for ``subscription`` and None whenever a heartbeat is due.
+    Ends with an ``expired`` event when the access token expires; the client
+    reconnects with a fresh one.
+    """
+    yield {"type": "ready"}
+    while True:
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            yield {"type": "expired"}
+            return
+        yield await subscription.next(min(settings.LIVE_HEARTBEAT_SECONDS, remaining))
+
+
+def _too_many_streams() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many open dashboard streams",
+        headers={"Retry-After": str(int(settings.LIVE_HEARTBEAT_SECONDS))},
+    )
+
+
+@router.get("/stream")
+async def dashboard_stream(
+    token: Optional[str] = Query(None, description="Access token, for clients such as EventSource that cannot set headers"),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events stream of dashboard updates for the current user.
+    """
+    if token is None and authorization:
+        scheme, _, token = authorization.partition(" ")
+        token = token if scheme.lower() == "bearer" else None
+    authenticated = await _authenticate(token)
+    if authenticated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id, expires_at = authenticated
+    subscription = live_hub.subscribe(user_id)
+    if subscription is None:
+        raise _too_many_streams()
+
+    async def body():
+        yield "retry: 5000\n\n"
+        async for payload in _events(subscription, expires_at):
+            if payload is None:
+                yield ": ping\n\n"
+            else:
+                yield f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+    # The background task also runs when the client disconnects mid-stream.
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(live_hub.unsubscribe, subscription),
+    )
+
+
+@router.websocket("/ws")
+async def dashboard_ws(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    WebSocket variant of ``/dashboard/stream``; heartbeats are ``{"type": "ping"}``.
+    """
+    try:
+        authenticated = await _authenticate(token)
+    except HTTPException:
+        await websocket.close(code=1013)  # try again later: DB gate is full
+        return
+    if authenticated is None:
+        await websocket.close(code=1008)
+        return
+    user_id, expires_at = authenticated
+    subscription = live_hub.subscribe(user_id)
+    if subscription is None:
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    try:
+        async for payload in _events(subscription, expires_at):
+            await websocket.send_json(payload or {"type": "ping"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(subscription)
@@ -1,25 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import or_
-from ..core.database import get_db
+from . import queries
+from .rows import rows_response, schema_rows
+from ..core.archive import find_archived, load_archived, load_archives
+from ..core.database import get_db, get_read_db
+from ..core.idempotency import Idempotency, idempotency
 from ..core.security import get_current_user
+from ..core.sync import next_sync_seq, tombstone
 from ..models.note import Note
-from ..models.user import User
-from ..models.client import Client
-from ..models.project import Project
 from ..schemas.note import NoteCreate, Note as NoteSchema
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(tags=["notes"])
 
+
+async def _archived_note(db: AsyncSession, user_id: int, note_id: int) -> Optional[dict]:
+    """
+    The user's note ``note_id`` if it has moved to cold storage.
+    """
+    result = await db.execute(queries.ARCHIVED_PROJECT_IDS, {"user_id": user_id})
+    return await find_archived(result.scalars().all(), "note", note_id)
+
+
+async def _not_found(db: AsyncSession, user_id: int, note_id: int) -> HTTPException:
+    if await _archived_note(db, user_id, note_id):
+        return HTTPException(status_code=409, detail="Note is archived and read-only")
+    return HTTPException(status_code=404, detail="Note not found or not owned by user")
+
 @router.post("/notes", response_model=NoteSchema)
 async def create_note(
     note: NoteCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    idempotent: Idempotency = Depends(idempotency)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    # A retry with the same Idempotency-Key gets the first response back.
+    replayed = await idempotent.replay(db, current_user)
+    if replayed:
+        return replayed
+
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -28,162 +48,132 @@ async def create_note(
         raise HTTPException(status_code=400, detail="Note cannot be linked to both project and client")
 
     if note.project_id:
-        result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-        client_ids = result.scalars().all()
-        result = await db.execute(
-            select(Project).where(Project.id == note.project_id, Project.client_id.in_(client_ids))
-        )
+        result = await db.execute(queries.OWNED_PROJECT, {"project_id": note.project_id, "user_id": user.id})
         project = result.scalars().first()
         if not project:
             raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
     elif note.client_id:
-        result = await db.execute(
-            select(Client).where(Client.id == note.client_id, Client.user_id == user.id)
-        )
+        result = await db.execute(queries.OWNED_CLIENT, {"client_id": note.client_id, "user_id": user.id})
         client = result.scalars().first()
         if not client:
             raise HTTPException(status_code=404, detail="Client not found or not owned by user")
     else:
         raise HTTPException(status_code=400, detail="Note must be linked to a project or client")
 
-    db_note = Note(**note.dict())
+    seq = await next_sync_seq(db, user.id)
+    db_note = Note(**note.dict(), user_id=user.id, sync_seq=seq)
     db.add(db_note)
-    await db.commit()
+    replayed = await idempotent.commit(db, current_user, db_note, NoteSchema)
+    if replayed:
+        return replayed
     await db.refresh(db_note)
     return db_note
 
 @router.get("/notes", response_model=List[NoteSchema])
-async def read_notes(db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_notes(db: AsyncSession = Depends(get_read_db), current_user: str = Depends(get_current_user)):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Note).where(or_(Note.client_id.in_(client_ids), Note.project_id.in_(project_ids)))
-    )
-    return result.scalars().all()
+    result = await db.execute(queries.ARCHIVED_PROJECT_IDS, {"user_id": user.id})
+    archived = await load_archives(result.scalars().all(), "note")
+    result = await db.execute(queries.NOTE_ROWS, {"user_id": user.id})
+    return rows_response(result, schema_rows(archived, NoteSchema))
 
 @router.get("/notes/{id}", response_model=NoteSchema)
-async def read_note(id: int, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_note(id: int, db: AsyncSession = Depends(get_read_db), current_user: str = Depends(get_current_user)):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Note).where(
-            Note.id == id,
-            or_(Note.client_id.in_(client_ids), Note.project_id.in_(project_ids))
-        )
-    )
+    result = await db.execute(queries.OWNED_NOTE, {"note_id": id, "user_id": user.id})
     note = result.scalars().first()
+    if not note:
+        note = await _archived_note(db, user.id, id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found or not owned by user")
     return note
 
 @router.put("/notes/{id}", response_model=NoteSchema)
 async def update_note(id: int, note_data: NoteCreate, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Note).where(
-            Note.id == id,
-            or_(Note.client_id.in_(client_ids), Note.project_id.in_(project_ids))
-        )
-    )
+    result = await db.execute(queries.OWNED_NOTE, {"note_id": id, "user_id": user.id})
     note = result.scalars().first()
     if not note:
-        raise HTTPException(status_code=404, detail="Note not found or not owned by user")
-
+        raise await _not_found(db, user.id, id)
+
+    # The note keeps its user_id, so it may only move within the user's data.
+    if note_data.project_id and note_data.project_id != note.project_id:
+        result = await db.execute(queries.OWNED_PROJECT, {"project_id": note_data.project_id, "user_id": user.id})
+        if not result.scalars().first():
+            raise HTTPException(status_code=403, detail="Cannot move note to a project not owned by user")
+    if note_data.client_id and note_data.client_id != note.client_id:
+        result = await db.execute(queries.OWNED_CLIENT, {"client_id": note_data.client_id, "user_id": user.id})
+        if not result.scalars().first():
+            raise HTTPException(status_code=403, detail="Cannot move note to a client not owned by user")
+
+    seq = await next_sync_seq(db, user.id)
     for key, value in note_data.dict().items():
         setattr(note, key, value)
+    note.sync_seq = seq
     await db.commit()
     await db.refresh(note)
     return note
 
 @router.delete("/notes/{id}")
 async def delete_note(id: int, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Note).where(
-            Note.id == id,
-            or_(Note.client_id.in_(client_ids), Note.project_id.in_(project_ids))
-        )
-    )
+    result = await db.execute(queries.OWNED_NOTE, {"note_id": id, "user_id": user.id})
     note = result.scalars().first()
     if not note:
-        raise HTTPException(status_code=404, detail="Note not found or not owned by user")
+        raise await _not_found(db, user.id, id)
 
+    seq = await next_sync_seq(db, user.id)
     await db.delete(note)
+    tombstone(db, user.id, "note", note.id, seq)
     await db.commit()
     return {"msg": "Note deleted successfully"}
 
 @router.get("/projects/{project_id}/notes", response_model=List[NoteSchema])
-async def read_project_notes(project_id: int, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_project_notes(project_id: int, db: AsyncSession = Depends(get_read_db), current_user: str = Depends(get_current_user)):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == project_id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": project_id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
-    result = await db.execute(select(Note).where(Note.project_id == project_id))
-    return result.scalars().all()
+    result = await db.execute(queries.PROJECT_NOTES, {"project_id": project_id})
+    notes = result.scalars().all()
+    if project.archived_at:
+        return await load_archived(project.id, "note") + notes
+    return notes
 
 @router.get("/clients/{client_id}/notes", response_model=List[NoteSchema])
-async def read_client_notes(client_id: int, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_client_notes(client_id: int, db: AsyncSession = Depends(get_read_db), current_user: str = Depends(get_current_user)):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(
-        select(Client).where(Client.id == client_id, Client.user_id == user.id)
-    )
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": client_id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found or not owned by user")
 
-    result = await db.execute(select(Note).where(Note.client_id == client_id))
+    result = await db.execute(queries.CLIENT_NOTES, {"client_id": client_id})
     return result.scalars().all()
@@ -1,77 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from ..core.database import get_db
+from . import queries
+from .rows import rows_response, schema_rows
+from ..core.archive import find_archived, load_archived, load_archives
+from ..core.database import get_db, get_read_db
+from ..core.idempotency import Idempotency, idempotency
+from ..core.live import kpi_event, publish
 from ..core.security import get_current_user
+from ..core.sync import next_sync_seq, tombstone
 from ..models.payment import Payment
-from ..models.user import User
-from ..models.client import Client
-from ..models.project import Project
 from ..schemas.payment import PaymentCreate, Payment as PaymentSchema
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(tags=["payments"])
 
+
+async def _archived_payment(db: AsyncSession, user_id: int, payment_id: int) -> Optional[dict]:
+    """
+    The user's payment ``payment_id`` if it has moved to cold storage.
+    """
+    result = await db.execute(queries.ARCHIVED_PROJECT_IDS, {"user_id": user_id})
+    return await find_archived(result.scalars().all(), "payment", payment_id)
+
+
+async def _not_found(db: AsyncSession, user_id: int, payment_id: int) -> HTTPException:
+    if await _archived_payment(db, user_id, payment_id):
+        return HTTPException(status_code=409, detail="Payment is archived and read-only")
+    return HTTPException(status_code=404, detail="Payment not found or not owned by user")
+
 @router.post("/payments", response_model=PaymentSchema)
 async def create_payment(
     payment: PaymentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    idempotent: Idempotency = Depends(idempotency)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    # A retry with the same Idempotency-Key gets the first response back.
+    replayed = await idempotent.replay(db, current_user)
+    if replayed:
+        return replayed
+
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == payment.project_id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": payment.project_id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
-    db_payment = Payment(**payment.dict())
+    seq = await next_sync_seq(db, user.id)
+    db_payment = Payment(**payment.dict(), user_id=user.id, sync_seq=seq)
     db.add(db_payment)
-    await db.commit()
+    publish(db, user.id, kpi_event("revenueThisMonth", db_payment.amount, db_payment.date_paid))
+    replayed = await idempotent.commit(db, current_user, db_payment, PaymentSchema)
+    if replayed:
+        return replayed
     await db.refresh(db_payment)
     return db_payment
 
 @router.get("/payments", response_model=List[PaymentSchema])
-async def read_payments(db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_payments(
+    date_from: Optional[date] = Query(None, alias="from", description="Earliest date_paid to include"),
+    date_to: Optional[date] = Query(None, alias="to", description="Latest date_paid to include"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(select(Payment).where(Payment.project_id.in_(project_ids)))
-    return result.scalars().all()
+    result = await db.execute(queries.ARCHIVED_PROJECT_IDS, {"user_id": user.id})
+    archived = await load_archives(result.scalars().all(), "payment")
+    if date_from is None and date_to is None:
+        result = await db.execute(queries.PAYMENT_ROWS, {"user_id": user.id})
+    else:
+        # Archives hold dates in ISO form, which sorts like the dates do.
+        first, last = (date_from or date.min).isoformat(), (date_to or date.max).isoformat()
+        archived = [row for row in archived if first <= row["date_paid"] <= last]
+        result = await db.execute(queries.PAYMENT_ROWS_BETWEEN, {
+            "user_id": user.id,
+            "date_from": date_from or date.min,
+            "date_to": date_to or date.max,
+        })
+    return rows_response(result, schema_rows(archived, PaymentSchema))
 
 @router.get("/payments/{id}", response_model=PaymentSchema)
-async def read_payment(id: int, db: AsyncSession = Depends(get_db), current_user: str = Depends(get_current_user)):
-    result = await db.execute(select(User).where(User.email == current_user))
+async def read_payment(id: int, db: AsyncSession = Depends(get_read_db), current_user: str = Depends(get_current_user)):
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Payment).where(Payment.id == id, Payment.project_id.in_(project_ids))
-    )
+    result = await db.execute(queries.OWNED_PAYMENT, {"payment_id": id, "user_id": user.id})
     payment = result.scalars().first()
+    if not payment:
+        payment = await _archived_payment(db, user.id, id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found or not owned by user")
 
@@ -84,26 +111,27 @@ async def update_payment(
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Payment).where(Payment.id == id, Payment.project_id.in_(project_ids))
-    )
+    result = await db.execute(queries.OWNED_PAYMENT, {"payment_id": id, "user_id": user.id})
     payment = result.scalars().first()
     if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found or not owned by user")
+        raise await _not_found(db, user.id, id)
 
+    if payment_data.project_id != payment.project_id:
+        result = await db.execute(queries.OWNED_PROJECT, {"project_id": payment_data.project_id, "user_id": user.id})
+        if not result.scalars().first():
+            raise HTTPException(status_code=403, detail="Cannot move payment to a project not owned by user")
+
+    seq = await next_sync_seq(db, user.id)
+    removed = kpi_event("revenueThisMonth", -payment.amount, payment.date_paid)
     for key, value in payment_data.dict().items():
         setattr(payment, key, value)
+    payment.sync_seq = seq
+    publish(db, user.id, removed, kpi_event("revenueThisMonth", payment.amount, payment.date_paid))
 
     await db.commit()
     await db.refresh(payment)
@@ -115,48 +143,41 @@ async def delete_payment(
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project.id).where(Project.client_id.in_(client_ids)))
-    project_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Payment).where(Payment.id == id, Payment.project_id.in_(project_ids))
-    )
+    result = await db.execute(queries.OWNED_PAYMENT, {"payment_id": id, "user_id": user.id})
     payment = result.scalars().first()
     if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found or not owned by user")
+        raise await _not_found(db, user.id, id)
 
+    seq = await next_sync_seq(db, user.id)
     await db.delete(payment)
+    tombstone(db, user.id, "payment", payment.id, seq)
+    publish(db, user.id, kpi_event("revenueThisMonth", -payment.amount, payment.date_paid))
     await db.commit()
     return {"msg": "Payment deleted successfully"}
 
 @router.get("/projects/{project_id}/payments", response_model=List[PaymentSchema])
 async def read_project_payments(
     project_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == project_id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": project_id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
-    result = await db.execute(select(Payment).where(Payment.project_id == project_id))
-    return result.scalars().all()
+    result = await db.execute(queries.PROJECT_PAYMENTS, {"project_id": project_id})
+    payments = result.scalars().all()
+    if project.archived_at:
+        return await load_archived(project.id, "payment") + payments
+    return payments
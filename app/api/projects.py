@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from typing import List
+import base64
+import binascii
 
-from ..core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from . import queries
+from .rows import rows_response
+from ..core.database import get_db, get_read_db
+from ..core.idempotency import Idempotency, idempotency
+from ..core.jobs import enqueue
+from ..core.live import kpi_event, project_status_events, publish
+from ..core.partitions import add_months
 from ..core.security import get_current_user
-from ..models.project import Project
-from ..models.user import User
-from ..models.client import Client
-from ..schemas.project import ProjectCreate, ProjectUpdate, Project as ProjectSchema
+from ..core.sync import next_sync_seq, tombstone
+from ..models.project import Project, ProjectStatus
+from ..schemas.project import ProjectBoard, ProjectCreate, ProjectUpdate, Project as ProjectSchema
+from ..schemas.job import JobAccepted
 
 router = APIRouter(tags=["projects"])
 
@@ -16,59 +25,119 @@ router = APIRouter(tags=["projects"])
 async def create_project(
     project: ProjectCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    idempotent: Idempotency = Depends(idempotency)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    # A retry with the same Idempotency-Key gets the first response back.
+    replayed = await idempotent.replay(db, current_user)
+    if replayed:
+        return replayed
+
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(
-        select(Client).where(Client.id == project.client_id, Client.user_id == user.id)
-    )
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": project.client_id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found or not owned by user")
 
-    db_project = Project(**project.dict())
+    seq = await next_sync_seq(db, user.id)
+    db_project = Project(**project.dict(), user_id=user.id, sync_seq=seq)
     db.add(db_project)
-    await db.commit()
+    publish(db, user.id, *project_status_events(db_project.name, None, db_project.status))
+    replayed = await idempotent.commit(db, current_user, db_project, ProjectSchema)
+    if replayed:
+        return replayed
     await db.refresh(db_project)
     return db_project
 
 @router.get("/projects", response_model=List[ProjectSchema])
 async def read_projects(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(select(Project).where(Project.client_id.in_(client_ids)))
+    result = await db.execute(queries.PROJECTS, {"user_id": user.id})
     return result.scalars().all()
 
+def _board_cursor(row) -> str:
+    position = f"{row['status'].name}|{row['updated_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _parse_board_cursor(cursor: str) -> Tuple[ProjectStatus, datetime, int]:
+    try:
+        status, updated_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return ProjectStatus[status], datetime.fromisoformat(updated_at), int(id)
+    except (binascii.Error, UnicodeDecodeError, KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _board_column(status: ProjectStatus, total: int, projects: list, more: bool) -> dict:
+    return {
+        "status": status,
+        "total": total,
+        "projects": projects,
+        "next_cursor": _board_cursor(projects[-1]) if more else None,
+    }
+
+@router.get("/projects/board", response_model=ProjectBoard)
+async def read_project_board(
+    limit: int = Query(20, ge=1, le=100, description="Projects per column"),
+    cursor: Optional[str] = Query(None, description="A column's next_cursor, to load more of that column"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Projects grouped by status, newest ``updated_at`` first: up to ``limit``
+    per column plus each column's total, from one windowed query. With a
+    ``cursor``, only that column, continuing after the cursor.
+    """
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if cursor is not None:
+        status, updated_at, after_id = _parse_board_cursor(cursor)
+        # One extra row tells whether the column goes on.
+        result = await db.execute(queries.PROJECT_BOARD_COLUMN, {
+            "user_id": user.id, "status": status, "updated_at": updated_at, "id": after_id, "limit": limit + 1,
+        })
+        rows = result.mappings().all()
+        projects = [row for row in rows if row["id"] is not None]
+        column = _board_column(status, rows[0]["total"], projects[:limit], len(projects) > limit)
+        return {"columns": [column]}
+
+    result = await db.execute(queries.PROJECT_BOARD, {"user_id": user.id, "limit": limit})
+    by_status = {status: [] for status in ProjectStatus}
+    totals = dict.fromkeys(ProjectStatus, 0)
+    for row in result.mappings():
+        by_status[row["status"]].append(row)
+        totals[row["status"]] = row["total"]
+    return {"columns": [
+        _board_column(status, totals[status], by_status[status], totals[status] > limit)
+        for status in ProjectStatus
+    ]}
+
 @router.get("/projects/{id}", response_model=ProjectSchema)
 async def read_project(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
@@ -82,73 +151,79 @@ async def update_project(
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
-    if project_data.client_id and project_data.client_id not in client_ids:
-        raise HTTPException(status_code=403, detail="Cannot assign project to a client not owned by user")
+    if project_data.client_id and project_data.client_id != project.client_id:
+        result = await db.execute(queries.OWNED_CLIENT, {"client_id": project_data.client_id, "user_id": user.id})
+        if not result.scalars().first():
+            raise HTTPException(status_code=403, detail="Cannot assign project to a client not owned by user")
 
+    seq = await next_sync_seq(db, user.id)
+    previous_status = project.status
     for key, value in project_data.dict(exclude_unset=True).items():
         setattr(project, key, value)
+    project.sync_seq = seq
+    publish(db, user.id, *project_status_events(project.name, previous_status, project.status))
 
     await db.commit()
     await db.refresh(project)
     return project
 
-@router.delete("/projects/{id}")
+@router.delete("/projects/{id}", status_code=202, response_model=JobAccepted)
 async def delete_project(
     id: int,
     db: AsyncSession = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(select(Client.id).where(Client.user_id == user.id))
-    client_ids = result.scalars().all()
-
-    result = await db.execute(
-        select(Project).where(Project.id == id, Project.client_id.in_(client_ids))
-    )
+    result = await db.execute(queries.OWNED_PROJECT, {"project_id": id, "user_id": user.id})
     project = result.scalars().first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by user")
 
-    await db.delete(project)
+    # Hide the project now; a background job purges its payments and notes.
+    seq = await next_sync_seq(db, user.id)
+    project.deleted_at = datetime.utcnow()
+    project.sync_seq = seq
+    tombstone(db, user.id, "project", project.id, seq)
+    job = enqueue(db, "purge_project", {"project_id": project.id}, user_id=user.id)
+    # Its payments stop counting towards revenue at once. Dashboards compare
+    # at most the previous quarter, which starts within six months.
+    result = await db.execute(queries.PROJECT_REVENUE_BY_DAY, {
+        "project_id": project.id, "date_from": add_months(date.today().replace(day=1), -6),
+    })
+    revenue = [kpi_event("revenueThisMonth", -row.amount, row.date_paid) for row in result]
+    publish(db, user.id, *project_status_events(project.name, project.status, None), *revenue)
     await db.commit()
-    return {"msg": "Project deleted successfully"}
+    return {"msg": "Project deleted successfully", "job_id": job.id}
 
 @router.get("/clients/{client_id}/projects", response_model=List[ProjectSchema])
 async def read_client_projects(
     client_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = await db.execute(
-        select(Client).where(Client.id == client_id, Client.user_id == user.id)
-    )
+    result = await db.execute(queries.OWNED_CLIENT, {"client_id": client_id, "user_id": user.id})
     client = result.scalars().first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found or not owned by user")
 
-    result = await db.execute(select(Project).where(Project.client_id == client_id))
-    return result.scalars().all()
+    result = await db.execute(queries.CLIENT_PROJECT_ROWS, {"client_id": client_id})
+    return rows_response(result)
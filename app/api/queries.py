@@ -0,0 +1,212 @@
+"""
+Prebuilt statements for the queries every request repeats.
+
+Building ``select(...).where(...)`` costs tens of microseconds of Python per
+statement, and so does deriving the cache key SQLAlchemy uses to find its
+compiled form. These module-level statements are built once with bound
+parameters; their cache keys are memoized on the statement object, so
+executing one is a dict lookup plus parameter binding::
+
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+
+Tenant-scoped statements filter on the ``user_id`` every table carries, so
+none of them needs the user's client or project ids first.
+"""
+from sqlalchemy import and_, bindparam, case, func, or_, select, true, tuple_
+
+from ..models.client import Client
+from ..models.job import Job
+from ..models.note import Note
+from ..models.outbox_email import OutboxEmail
+from ..models.payment import Payment
+from ..models.project import Project
+from ..models.sync_tombstone import SyncTombstone
+from ..models.user import User
+from ..core.reports import BUCKETS, date_bucket
+from ..schemas.note import Note as NoteSchema
+from ..schemas.payment import Payment as PaymentSchema
+from ..schemas.project import Project as ProjectSchema
+from .rows import response_columns
+
+_user_id = bindparam("user_id")
+
+_live_client = Client.deleted_at.is_(None)
+_live_project = Project.deleted_at.is_(None)
+
+# Soft-deleted rows still waiting for their purge job. Deleting a client
+# stamps its projects too, so a project is hidden if it is in this set, and a
+# payment or note if its parent is. The sets are small and served by partial
+# indexes, so filtering them out keeps tenant queries on one table's user_id
+# index.
+_deleted_client_ids = select(Client.id).where(Client.user_id == _user_id, Client.deleted_at.is_not(None))
+_deleted_project_ids = select(Project.id).where(Project.user_id == _user_id, Project.deleted_at.is_not(None))
+_live_payment = Payment.project_id.not_in(_deleted_project_ids)
+_live_note = and_(
+    or_(Note.client_id.is_(None), Note.client_id.not_in(_deleted_client_ids)),
+    or_(Note.project_id.is_(None), Note.project_id.not_in(_deleted_project_ids)),
+)
+
+# users
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+USER_BY_ID = select(User).where(User.id == _user_id)
+
+# clients
+CLIENTS = select(Client).where(Client.user_id == _user_id, _live_client)
+OWNED_CLIENT = select(Client).where(Client.id == bindparam("client_id"), Client.user_id == _user_id, _live_client)
+
+# projects
+PROJECTS = select(Project).where(Project.user_id == _user_id, _live_project)
+OWNED_PROJECT = select(Project).where(Project.id == bindparam("project_id"), Project.user_id == _user_id, _live_project)
+CLIENT_PROJECTS = select(Project).where(Project.client_id == bindparam("client_id"), _live_project)
+
+# payments
+PAYMENTS = select(Payment).where(Payment.user_id == _user_id, _live_payment)
+OWNED_PAYMENT = select(Payment).where(Payment.id == bindparam("payment_id"), Payment.user_id == _user_id, _live_payment)
+PROJECT_PAYMENTS = select(Payment).where(Payment.project_id == bindparam("project_id"))
+# A project's payments per day from a date on, for the revenue deltas of its
+# deletion.
+PROJECT_REVENUE_BY_DAY = (
+    select(Payment.date_paid, func.sum(Payment.amount).label("amount"))
+    .where(Payment.project_id == bindparam("project_id"), Payment.date_paid >= bindparam("date_from"))
+    .group_by(Payment.date_paid)
+)
+# Bounded on date_paid, so PostgreSQL scans only the partitions in range.
+PAYMENTS_BETWEEN = PAYMENTS.where(
+    Payment.date_paid >= bindparam("date_from"), Payment.date_paid <= bindparam("date_to")
+)
+
+# revenue report: payment sums per time bucket and group, in
+# [date_from, date_to); see app/core/reports.py
+def _revenue(bucket: str, group_by):
+    start = date_bucket(bucket, Payment.date_paid).label("bucket")
+    in_range = (Payment.user_id == _user_id, Payment.date_paid >= bindparam("date_from"),
+                Payment.date_paid < bindparam("date_to"))
+    if group_by is None:
+        return select(start, func.sum(Payment.amount).label("amount")).where(*in_range, _live_payment).group_by(start)
+    group = Client if group_by == "client" else Project
+    statement = (
+        select(start, group.id.label("group_id"), group.name.label("name"), func.sum(Payment.amount).label("amount"))
+        .join(Project, Project.id == Payment.project_id)
+        .where(*in_range, _live_project)
+    )
+    if group_by == "client":
+        statement = statement.join(Client, Client.id == Project.client_id)
+    return statement.group_by(start, group.id, group.name)
+
+
+REVENUE = {(bucket, group_by): _revenue(bucket, group_by) for bucket in BUCKETS for group_by in (None, "client", "project")}
+# Archived projects that may hold payments on or after a date; see
+# app/core/archive.py
+ARCHIVED_PROJECTS = (
+    select(Project.id, Project.name, Project.client_id, Client.name.label("client_name"))
+    .join(Client, Client.id == Project.client_id)
+    .where(Project.user_id == _user_id, Project.archived_at >= bindparam("archived_after"), _live_project)
+)
+
+# Archived projects, whose payments and notes are read from archive files
+ARCHIVED_PROJECT_IDS = select(Project.id).where(
+    Project.user_id == _user_id, Project.archived_at.is_not(None), _live_project
+)
+
+# notes
+NOTES = select(Note).where(Note.user_id == _user_id, _live_note)
+OWNED_NOTE = select(Note).where(Note.id == bindparam("note_id"), Note.user_id == _user_id, _live_note)
+PROJECT_NOTES = select(Note).where(Note.project_id == bindparam("project_id"))
+CLIENT_NOTES = select(Note).where(Note.client_id == bindparam("client_id"))
+
+# ORM-free column selects for list routes; see app/api/rows.py
+PAYMENT_ROWS = PAYMENTS.with_only_columns(*response_columns(PaymentSchema, Payment))
+PAYMENT_ROWS_BETWEEN = PAYMENTS_BETWEEN.with_only_columns(*response_columns(PaymentSchema, Payment))
+NOTE_ROWS = NOTES.with_only_columns(*response_columns(NoteSchema, Note))
+CLIENT_PROJECT_ROWS = CLIENT_PROJECTS.with_only_columns(*response_columns(ProjectSchema, Project))
+
+# dashboard: each KPI aggregate reads one table once, current and previous
+# values side by side; see app/api/dashboard.py
+_current_start = bindparam("current_start")
+DASHBOARD_CLIENTS = select(
+    func.count(Client.id),
+    func.count(case((Client.created_at < _current_start, Client.id))),
+).where(Client.user_id == _user_id, _live_client)
+_is_active, _is_pending = Project.status == "Active", Project.status == "Pending"
+_is_older = Project.created_at < _current_start
+DASHBOARD_PROJECTS = select(
+    func.count(case((_is_active, Project.id))),
+    func.count(case((and_(_is_active, _is_older), Project.id))),
+    func.count(case((_is_pending, Project.id))),
+    func.count(case((and_(_is_pending, _is_older), Project.id))),
+).where(Project.user_id == _user_id, Project.status.in_(["Active", "Pending"]), _live_project)
+_current_day = bindparam("current_day", type_=Payment.date_paid.type)
+DASHBOARD_REVENUE = select(
+    func.sum(case((Payment.date_paid >= _current_day, Payment.amount), else_=0)),
+    func.sum(case((Payment.date_paid < _current_day, Payment.amount), else_=0)),
+).where(
+    Payment.user_id == _user_id,
+    Payment.date_paid >= bindparam("previous_day"),
+    Payment.date_paid < bindparam("next_day"),
+    _live_payment,
+)
+RECENT_CLIENTS = (
+    select(Client).where(Client.user_id == _user_id, _live_client).order_by(Client.created_at.desc()).limit(5)
+)
+RECENTLY_COMPLETED_PROJECTS = (
+    select(Project)
+    .where(Project.user_id == _user_id, Project.status == "Completed", _live_project)
+    .order_by(Project.updated_at.desc())
+    .limit(5)
+)
+
+# project board: per status column, the newest projects and the column size.
+# Both statements walk ix_projects_board (user_id, status, updated_at, id).
+_board_order = (Project.updated_at.desc(), Project.id.desc())
+_board_ranked = (
+    select(
+        *response_columns(ProjectSchema, Project),
+        func.row_number().over(partition_by=Project.status, order_by=_board_order).label("position"),
+        func.count().over(partition_by=Project.status).label("total"),
+    )
+    .where(Project.user_id == _user_id, _live_project)
+    .subquery()
+)
+PROJECT_BOARD = (
+    select(_board_ranked)
+    .where(_board_ranked.c.position <= bindparam("limit"))
+    .order_by(_board_ranked.c.status, _board_ranked.c.position)
+)
+# One column after a cursor; the count is joined in so an exhausted column
+# still returns its total.
+_column = (Project.user_id == _user_id, Project.status == bindparam("status"), _live_project)
+_column_total = select(func.count().label("total")).where(*_column).subquery()
+_column_page = (
+    select(*response_columns(ProjectSchema, Project))
+    .where(*_column, tuple_(Project.updated_at, Project.id) < tuple_(
+        bindparam("updated_at", type_=Project.updated_at.type), bindparam("id", type_=Project.id.type)
+    ))
+    .order_by(*_board_order)
+    .limit(bindparam("limit"))
+    .subquery()
+)
+PROJECT_BOARD_COLUMN = (
+    select(_column_total.c.total, _column_page)
+    .select_from(_column_total.outerjoin(_column_page, true()))
+    .order_by(_column_page.c.updated_at.desc(), _column_page.c.id.desc())
+)
+
+# jobs
+OWNED_JOB = select(Job).where(Job.id == bindparam("job_id"), Job.user_id == _user_id)
+
+# outgoing email, newest first
+RECENT_EMAILS = (
+    select(OutboxEmail).where(OutboxEmail.user_id == _user_id).order_by(OutboxEmail.id.desc()).limit(50)
+)
+
+# sync: rows changed after a cursor
+_since = bindparam("since")
+CHANGED_CLIENTS = select(Client).where(Client.user_id == _user_id, Client.sync_seq > _since, _live_client)
+CHANGED_PROJECTS = select(Project).where(Project.user_id == _user_id, Project.sync_seq > _since, _live_project)
+CHANGED_PAYMENTS = select(Payment).where(Payment.user_id == _user_id, Payment.sync_seq > _since, _live_payment)
+CHANGED_NOTES = select(Note).where(Note.user_id == _user_id, Note.sync_seq > _since, _live_note)
+# Archives holding rows changed after the cursor
+CHANGED_ARCHIVES = ARCHIVED_PROJECT_IDS.where(Project.archived_sync_seq > _since)
+TOMBSTONES = select(SyncTombstone.entity, SyncTombstone.entity_id).where(
+    SyncTombstone.user_id == _user_id, SyncTombstone.sync_seq > _since
+)
@@ -0,0 +1,145 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Dict, Hashable, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import queries
+from ..core.archive import load_archived
+from ..core.config import settings
+from ..core.database import get_read_db
+from ..core.partitions import add_months
+from ..core.reports import (
+    MAX_BUCKETS,
+    Sums,
+    bucket_start,
+    bucket_starts,
+    default_start,
+    fill,
+    moving_averages,
+    next_bucket,
+    revenue_cache,
+    running_totals,
+)
+from ..core.security import get_current_user
+from ..schemas.report import Bucket, GroupBy, RevenueReport
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+async def _add_archived(db: AsyncSession, user_id: int, bucket: str, group_by: Optional[str],
+                        first: date, end: date, sums: Sums, names: Dict[Hashable, str]) -> None:
+    """
+    Add the payments in ``[first, end)`` of archived projects to ``sums``.
+    A project is archived only once it has had no payment for
+    ``ARCHIVE_AFTER_MONTHS``, so ranges more recent than that skip this.
+    """
+    archived_after = add_months(first, settings.ARCHIVE_AFTER_MONTHS)
+    if archived_after > date.today():
+        return
+    result = await db.execute(queries.ARCHIVED_PROJECTS, {
+        "user_id": user_id, "archived_after": datetime.combine(archived_after, time()),
+    })
+    projects = result.all()
+    archives = await asyncio.gather(*(load_archived(project.id, "payment") for project in projects))
+    for project, payments in zip(projects, archives):
+        if group_by == "client":
+            group, names[project.client_id] = project.client_id, project.client_name
+        elif group_by == "project":
+            group, names[project.id] = project.id, project.name
+        else:
+            group = None
+        for payment in payments:
+            day = date.fromisoformat(payment["date_paid"])
+            if first <= day < end:
+                start = bucket_start(bucket, day)
+                sums[start][group] = sums[start].get(group, 0.0) + payment["amount"]
+
+
+async def _query_sums(db: AsyncSession, user_id: int, bucket: str, group_by: Optional[str],
+                      first: date, end: date) -> Tuple[Sums, Dict[Hashable, str]]:
+    sums: Sums = defaultdict(dict)
+    names: Dict[Hashable, str] = {}
+    result = await db.execute(queries.REVENUE[bucket, group_by], {
+        "user_id": user_id, "date_from": first, "date_to": end,
+    })
+    for row in result:
+        group = None if group_by is None else row.group_id
+        if group_by is not None:
+            names[group] = row.name
+        sums[row.bucket][group] = row.amount
+    await _add_archived(db, user_id, bucket, group_by, first, end, sums, names)
+    return sums, names
+
+
+@router.get("/revenue", response_model=RevenueReport)
+async def read_revenue(
+    bucket: Bucket = "month",
+    group_by: Optional[GroupBy] = None,
+    date_from: Optional[date] = Query(None, alias="from", description="First day to include (default: 30 buckets back)"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last day to include (default: today)"),
+    window: int = Query(3, ge=1, le=52, description="Buckets per moving average"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Revenue per day, week (from Monday) or month, in total or per client or
+    project. ``from`` and ``to`` are widened to whole buckets. Empty buckets
+    count as 0.
+
+    Sums come from one grouped query; the sums of buckets that have ended
+    are cached until the user's data next changes, so a repeated report
+    only queries the buckets it has not seen.
+    """
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    last = date_to or date.today()
+    first = date_from or default_start(bucket, last)
+    if first > last:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    starts = bucket_starts(bucket, first, last)
+    if len(starts) > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BUCKETS} buckets per report")
+    end = next_bucket(bucket, starts[-1])
+
+    key = (current_user, bucket, group_by)
+    cached, cached_names = revenue_cache.get(key, user.sync_seq)
+    sums: Sums = {start: cached[start] for start in starts if start in cached}
+    names = dict(cached_names)
+    missing = [start for start in starts if start not in cached]
+    if missing:
+        queried, queried_names = await _query_sums(db, user.id, bucket, group_by, missing[0], end)
+        names.update(queried_names)
+        for start in starts:
+            if start >= missing[0]:
+                sums[start] = queried.get(start, {})
+        today = date.today()
+        ended = [start for start in missing if next_bucket(bucket, start) <= today]
+        revenue_cache.put(key, user.sync_seq, sums, names, ended)
+
+    by_group: Dict[Hashable, Dict[date, float]] = defaultdict(dict)
+    if group_by is None:
+        by_group[None] = {}
+    for start, groups in sums.items():
+        for group, amount in groups.items():
+            by_group[group][start] = amount
+
+    series = []
+    for group, amounts in by_group.items():
+        revenue = [round(amount, 2) for amount in fill(amounts, starts)]
+        totals = running_totals(revenue)
+        series.append({
+            "id": group,
+            "name": names.get(group),
+            "total": totals[-1],
+            "revenue": revenue,
+            "running_total": totals,
+            "moving_average": moving_averages(revenue, window),
+        })
+    series.sort(key=lambda s: s["total"], reverse=True)
+    return {"bucket": bucket, "group_by": group_by, "window": window, "buckets": starts, "series": series}
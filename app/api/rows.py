@@ -0,0 +1,41 @@
+"""
+ORM-free responses for read-only list routes.
+
+Loading ``select(Model)`` builds an ORM instance per row, registers it in the
+session's identity map, and then Pydantic reads every attribute back through
+``from_attributes``. For lists that are only serialized, the routes here
+select just the response schema's columns and encode the row mappings
+straight to JSON with orjson. They skip hydration, session bookkeeping and
+response-model validation. The columns come from the schema, so the payload
+has the same fields, and orjson writes dates, datetimes and enums in the
+same ISO and value forms Pydantic does.
+"""
+from typing import Iterable, List, Tuple, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def response_columns(schema: Type[BaseModel], model) -> Tuple:
+    """
+    The ``model`` columns backing each field of ``schema``, in field order.
+    """
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+def schema_rows(rows: Iterable[dict], schema: Type[BaseModel]) -> List[dict]:
+    """
+    ``rows`` (all columns, as from an archive) cut down to ``schema``'s
+    fields.
+    """
+    return [{name: row[name] for name in schema.model_fields} for row in rows]
+
+
+def rows_response(result, extra: Iterable[dict] = ()) -> Response:
+    """
+    JSON array response of ``extra`` followed by a column-select
+    ``result``'s rows.
+    """
+    rows = [*extra, *result.mappings().all()]
+    return Response(orjson.dumps(rows, default=dict), media_type="application/json")
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from . import queries
+from ..core.archive import load_archives
+from ..core.database import get_read_db
+from ..core.security import get_current_user
+from ..schemas.sync import SyncChanges
+
+router = APIRouter(tags=["sync"])
+
+@router.get("/sync", response_model=SyncChanges)
+async def sync(
+    since: Optional[int] = Query(None, ge=0, description="Cursor from the previous sync; omit for a full snapshot"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Everything created, updated or deleted since ``since``, plus the cursor
+    to pass next time. See app/core/sync.py.
+    """
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Read before the rows: every change up to the cursor is already
+    # committed, so none can be missed (later ones may show up twice).
+    cursor = user.sync_seq
+    # Untouched rows carry sync_seq 0, so a full snapshot starts below it.
+    after = -1 if since is None else since
+
+    result = await db.execute(queries.CHANGED_CLIENTS, {"user_id": user.id, "since": after})
+    clients = result.scalars().all()
+
+    result = await db.execute(queries.CHANGED_PROJECTS, {"user_id": user.id, "since": after})
+    projects = result.scalars().all()
+
+    result = await db.execute(queries.CHANGED_PAYMENTS, {"user_id": user.id, "since": after})
+    payments = result.scalars().all()
+
+    result = await db.execute(queries.CHANGED_NOTES, {"user_id": user.id, "since": after})
+    notes = result.scalars().all()
+
+    # Archival moves rows without changing them, so a client that has seen
+    # them keeps them; rows it has not seen come from the archive files.
+    result = await db.execute(queries.CHANGED_ARCHIVES, {"user_id": user.id, "since": after})
+    archives = result.scalars().all()
+    if archives:
+        payments = [row for row in await load_archives(archives, "payment") if row["sync_seq"] > after] + payments
+        notes = [row for row in await load_archives(archives, "note") if row["sync_seq"] > after] + notes
+
+    deleted = []
+    if since is not None:
+        result = await db.execute(queries.TOMBSTONES, {"user_id": user.id, "since": since})
+        deleted = [{"type": entity, "id": entity_id} for entity, entity_id in result.all()]
+
+    return {
+        "cursor": cursor,
+        "clients": clients,
+        "projects": projects,
+        "payments": payments,
+        "notes": notes,
+        "deleted": deleted,
+    }
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
-from ..core.database import get_db
+from . import queries
+from ..core.database import get_read_db
 from ..core.security import get_current_user
-from ..models.user import User
 from ..schemas.user import User as UserSchema
 
 router = APIRouter(tags=["users"])
@@ -12,12 +11,12 @@ router = APIRouter(tags=["users"])
 @router.get("/users/me", response_model=UserSchema)
 async def read_users_me(
     current_user: str = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retrieve the current authenticated user's details.
     """
-    result = await db.execute(select(User).where(User.email == current_user))
+    result = await db.execute(queries.USER_BY_EMAIL, {"email": current_user})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -26,14 +25,14 @@ async def read_users_me(
 @router.get("/users/{id}", response_model=UserSchema)
 async def read_user(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
     """
     Retrieve a user by ID (admin-only, placeholder for role check).
     """
     # Placeholder for admin role check
-    result = await db.execute(select(User).where(User.id == id))
+    result = await db.execute(queries.USER_BY_ID, {"user_id": id})
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
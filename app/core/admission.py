@@ -0,0 +1,152 @@
+"""
+Admission control: per-principal rate limits and a DB concurrency gate.
+
+Both shed load early with a cheap 429/503 and a ``Retry-After`` header
+instead of letting every request queue for a pool connection until they all
+time out together.
+
+* :func:`rate_limit` is a router-level dependency. Each route group (see
+  ``settings.RATE_LIMITS``) has a token bucket per principal: the verified
+  JWT subject, or the client address for anonymous routes such as /login.
+* :data:`db_gate` bounds the number of requests holding a database session
+  per process; ``get_db``/``get_read_db`` enter it before opening a session.
+
+State is per worker process, so effective limits scale with the number of
+workers.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from .config import settings
+from .security import decode_principal
+
+_PERIODS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    """
+    Parse ``"<count>/<s|m|h>,<burst>"`` into (tokens per second, burst).
+    """
+    rate, _, burst = spec.partition(",")
+    count, _, period = rate.partition("/")
+    per_second = float(count) / _PERIODS[period.strip() or "s"]
+    return per_second, float(burst) if burst else max(1.0, per_second)
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by (group, principal).
+    """
+
+    MAX_BUCKETS = 50_000
+
+    def __init__(self, limits: Dict[str, str]):
+        self.limits = {group: parse_limit(spec) for group, spec in limits.items()}
+        self._buckets: Dict[Tuple[str, str], list] = {}
+
+    def check(self, group: str, key: str) -> float:
+        """
+        Take a token; returns 0 if allowed, else seconds until one is available.
+        """
+        rate, burst = self.limits.get(group) or self.limits["default"]
+        now = time.monotonic()
+        bucket = self._buckets.get((group, key))
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._evict(now)
+            bucket = self._buckets[(group, key)] = [burst, now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate
+
+    def _evict(self, now: float) -> None:
+        # Drop buckets that have refilled completely; they carry no state.
+        full = [
+            key for key, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.limits.get(key[0], self.limits["default"])[0]
+            >= self.limits.get(key[0], self.limits["default"])[1]
+        ]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.MAX_BUCKETS:
+            self._buckets.clear()
+
+
+class ConcurrencyGate:
+    """
+    Bounds in-flight DB work. Waiters queue for at most ``timeout`` seconds,
+    and once ``max_waiting`` are queued further requests are rejected at once.
+    """
+
+    def __init__(self, limit: int, max_waiting: int, timeout: float):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            raise _overloaded()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise _overloaded()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry",
+        headers={"Retry-After": str(settings.DB_RETRY_AFTER_SECONDS)},
+    )
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMITS)
+
+db_gate = ConcurrencyGate(settings.DB_MAX_INFLIGHT, settings.DB_MAX_WAITING, settings.DB_QUEUE_TIMEOUT_SECONDS)
+
+
+def _principal_key(request: Request) -> str:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        principal = decode_principal(token)
+        if principal is not None:
+            # Saves get_current_user from decoding the same token again.
+            request.state.principal = principal
+            return f"user:{principal}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(group: str):
+    """
+    Router-level dependency enforcing the ``group`` rate limit.
+    """
+    async def dependency(request: Request):
+        if not settings.RATE_LIMITS_ENABLED:
+            return
+        retry_after = rate_limiter.check(group, _principal_key(request))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return dependency
@@ -0,0 +1,267 @@
+"""
+Cold storage for completed projects.
+
+Completed projects stop changing but their payments and notes stay in the
+hot tables, where they enlarge every index and scan. ``archive_projects``
+moves the payments and notes of each project that has been ``Completed``
+for ``ARCHIVE_AFTER_MONTHS`` into a gzip-compressed JSON Lines file under
+``ARCHIVE_DIR`` and deletes them from the database. The project row stays
+behind as a stub with ``archived_at`` set, so lists, the dashboard and
+ownership checks are unchanged.
+
+An archive holds one JSON object per line, ``{"type": "payment" | "note",
+"row": {...}}``, with every column of the row. Archived rows are read back
+(off the event loop) wherever hot rows are read: the payment and note lists
+and lookups by id, the per-project lists (merged with rows added after
+archival) and ``GET /sync``. Archived rows are read-only; writes to them get
+409. Archival does not change a row, so it leaves no sync tombstone; the
+project records the highest ``sync_seq`` among its archived rows, and a sync
+reads only the archives with rows the client has not seen. Files never change
+once their project is marked archived, so each worker keeps the last
+``ARCHIVE_CACHE_PROJECTS`` it parsed.
+
+A project only qualifies if none of its payments fall within the same
+window, so the dashboard's revenue periods never need the archive. The
+archive file is written and synced before the rows are deleted; if the
+transaction then fails, the rows are still hot and the next run overwrites
+the file.
+
+Run it from cron, for example::
+
+    python -m app.core.archive --months 12
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, select, update
+
+from .config import settings
+from .database import Shard, shard_map
+from .partitions import add_months
+from ..models.note import Note
+from ..models.payment import Payment
+from ..models.project import Project, ProjectStatus
+
+logger = logging.getLogger(__name__)
+
+KINDS = {"payment": Payment, "note": Note}
+
+
+class ArchiveMissing(RuntimeError):
+    """
+    A project is marked archived but its archive file is not there (say, on
+    a host that does not share ``ARCHIVE_DIR``).
+    """
+
+
+def archive_path(project_id: int) -> str:
+    # Spread files over subdirectories of at most 1000 projects each.
+    return os.path.join(settings.ARCHIVE_DIR, f"{project_id // 1000:06d}", f"project-{project_id}.jsonl.gz")
+
+
+def _encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def _columns(row) -> dict:
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+
+def write_archive(path: str, records: Iterable[Tuple[str, dict]]) -> None:
+    """
+    Atomically replace ``path`` with ``records`` (``(kind, columns)`` pairs).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    with open(partial, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for kind, row in records:
+                out.write(json.dumps({"type": kind, "row": row}, default=_encode, separators=(",", ":")).encode())
+                out.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+
+
+def read_archive(project_id: int) -> Dict[str, List[dict]]:
+    """
+    Archived rows of ``project_id`` by kind. Only call it for an archived
+    project: a missing file raises :class:`ArchiveMissing`.
+    """
+    rows: Dict[str, List[dict]] = {kind: [] for kind in KINDS}
+    path = archive_path(project_id)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                record = json.loads(line)
+                rows[record["type"]].append(record["row"])
+    except FileNotFoundError:
+        logger.error("Archive of project %s is missing: %s", project_id, path)
+        raise ArchiveMissing(f"Archive of project {project_id} is missing") from None
+    return rows
+
+
+_parsed: "OrderedDict[int, Dict[str, List[dict]]]" = OrderedDict()
+
+
+async def load_archived(project_id: int, kind: str) -> List[dict]:
+    """
+    Archived ``kind`` rows of ``project_id``, read in a worker thread unless
+    cached. The rows are shared; do not modify them.
+    """
+    rows = _parsed.get(project_id)
+    if rows is None:
+        rows = await asyncio.to_thread(read_archive, project_id)
+        _parsed[project_id] = rows
+        while len(_parsed) > settings.ARCHIVE_CACHE_PROJECTS:
+            _parsed.popitem(last=False)
+    else:
+        _parsed.move_to_end(project_id)
+    return rows[kind]
+
+
+async def load_archives(project_ids: Iterable[int], kind: str) -> List[dict]:
+    """
+    Archived ``kind`` rows of several projects, read concurrently.
+    """
+    archives = await asyncio.gather(*(load_archived(project_id, kind) for project_id in project_ids))
+    return [row for rows in archives for row in rows]
+
+
+async def find_archived(project_ids: Iterable[int], kind: str, row_id: int) -> Optional[dict]:
+    """
+    The archived ``kind`` row ``row_id`` if one of ``project_ids`` holds it.
+    """
+    for project_id in project_ids:
+        for row in await load_archived(project_id, kind):
+            if row["id"] == row_id:
+                return row
+    return None
+
+
+def remove_archive(project_id: int) -> None:
+    _parsed.pop(project_id, None)
+    try:
+        os.remove(archive_path(project_id))
+    except FileNotFoundError:
+        pass
+
+
+def _cutoff(months: int) -> datetime:
+    return datetime.combine(add_months(date.today(), -months), time())
+
+
+def archivable_projects(cutoff: datetime, limit: int):
+    recent_payment = exists().where(Payment.project_id == Project.id, Payment.date_paid >= cutoff.date())
+    return (
+        select(Project.id)
+        .where(
+            Project.status == ProjectStatus.COMPLETED,
+            Project.updated_at < cutoff,
+            Project.archived_at.is_(None),
+            Project.deleted_at.is_(None),
+            ~recent_payment,
+        )
+        .order_by(Project.id)
+        .limit(limit)
+    )
+
+
+async def archive_project(project_id: int, shard: Optional[Shard] = None) -> Optional[Dict[str, int]]:
+    """
+    Move one project's payments and notes (on ``shard``, by default the
+    primary database) to its archive file. Returns the number of rows moved
+    by kind, or None if the project is gone or already archived.
+    """
+    async with (shard or shard_map.directory).SessionLocal() as session:
+        result = await session.execute(
+            select(Project.id).where(
+                Project.id == project_id, Project.archived_at.is_(None), Project.deleted_at.is_(None)
+            ).with_for_update()
+        )
+        if result.scalar() is None:
+            return None
+
+        records, ids = [], {}
+        for kind, model in KINDS.items():
+            result = await session.execute(select(model).where(model.project_id == project_id).order_by(model.id))
+            rows = result.scalars().all()
+            records.extend((kind, _columns(row)) for row in rows)
+            ids[kind] = [row.id for row in rows]
+        await asyncio.to_thread(write_archive, archive_path(project_id), records)
+
+        # By id, so rows added while the file was written stay hot.
+        for kind, model in KINDS.items():
+            if ids[kind]:
+                await session.execute(
+                    delete(model).where(model.id.in_(ids[kind])).execution_options(synchronize_session=False)
+                )
+        await session.execute(
+            update(Project)
+            .where(Project.id == project_id)
+            # Keep updated_at: archiving is storage housekeeping, not an edit.
+            .values(archived_at=datetime.utcnow(), updated_at=Project.updated_at,
+                    archived_sync_seq=max((row["sync_seq"] for _, row in records), default=0))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    return {kind: len(kind_ids) for kind, kind_ids in ids.items()}
+
+
+async def archive_projects(months: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Archive every qualifying project on every shard, ``ARCHIVE_BATCH_SIZE``
+    candidates per scan, stopping after ``limit`` projects if given.
+
+    ``months`` may lengthen the ``ARCHIVE_AFTER_MONTHS`` window but not
+    shorten it: revenue reports skip the archives for ranges more recent
+    than that window.
+    """
+    if months is None:
+        months = settings.ARCHIVE_AFTER_MONTHS
+    if months < settings.ARCHIVE_AFTER_MONTHS:
+        raise ValueError(f"Cannot archive within ARCHIVE_AFTER_MONTHS ({settings.ARCHIVE_AFTER_MONTHS}): {months}")
+    cutoff = _cutoff(months)
+    totals = {"projects": 0, "payments": 0, "notes": 0}
+    for shard in shard_map.shards:
+        while limit is None or totals["projects"] < limit:
+            batch = settings.ARCHIVE_BATCH_SIZE if limit is None else min(settings.ARCHIVE_BATCH_SIZE, limit - totals["projects"])
+            async with shard.SessionLocal() as session:
+                candidates = (await session.execute(archivable_projects(cutoff, batch))).scalars().all()
+            if not candidates:
+                break
+            for project_id in candidates:
+                moved = await archive_project(project_id, shard)
+                if moved is None:
+                    continue
+                totals["projects"] += 1
+                totals["payments"] += moved["payment"]
+                totals["notes"] += moved["note"]
+    logger.info("Archived %(projects)d projects (%(payments)d payments, %(notes)d notes)", totals)
+    return totals
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Archive completed projects to cold storage.")
+    parser.add_argument("--months", type=int, default=None,
+                        help="Archive projects completed at least this many months ago "
+                             "(default and minimum ARCHIVE_AFTER_MONTHS)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many projects")
+    args = parser.parse_args(argv)
+    if args.months is not None and args.months < settings.ARCHIVE_AFTER_MONTHS:
+        parser.error(f"--months cannot be less than ARCHIVE_AFTER_MONTHS ({settings.ARCHIVE_AFTER_MONTHS})")
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(archive_projects(args.months, args.limit)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,136 @@
+from typing import Dict, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "frexta-backend"
     DATABASE_URL: str
+    # Optional read replica URL(s), comma-separated, used by GET routes.
+    DATABASE_READ_URL: Optional[str] = None
+    # After a write, the user's reads go to the primary for this long.
+    READ_AFTER_WRITE_SECONDS: float = 5.0
+    # How long an unreachable replica is skipped before being retried.
+    READ_REPLICA_RETRY_SECONDS: float = 30.0
+    # SQLite mode (sqlite+aiosqlite URLs, app/core/database.py): reader
+    # connections per worker next to the single writer, how long a
+    # connection waits on a lock, and page cache / memory-map sizes.
+    SQLITE_READERS: int = 4
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 5.0
+    SQLITE_CACHE_KIB: int = 64 * 1024
+    SQLITE_MMAP_BYTES: int = 256 * 1024 * 1024
+    # Tenant sharding (app/core/database.py, app/core/shards.py): extra
+    # tenant databases, comma-separated (shard 0 is DATABASE_URL, which also
+    # holds the shard directory), how long each worker caches a directory
+    # entry, and the block of ids each shard allocates from.
+    DATABASE_SHARD_URLS: Optional[str] = None
+    SHARD_DIRECTORY_TTL_SECONDS: float = 5.0
+    SHARD_ID_SPAN: int = 100_000_000
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    RESET_TOKEN_EXPIRE_MINUTES: int = 60
+    # In-memory revocation list (app/core/revocation.py): how often each
+    # worker picks up revocations made elsewhere (0 = only at startup) and
+    # the Bloom filter's sizing. Ids skipped by a sync are looked up again for
+    # REVOCATION_GAP_SECONDS, in case their transaction commits late.
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    REVOCATION_GAP_SECONDS: float = 60.0
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.01
+    # Rows removed per transaction when purging deleted clients/projects.
+    PURGE_BATCH_SIZE: int = 1000
+    # Cold storage (app/core/archive.py): where archive files go, how long a
+    # project must have been completed, candidates fetched per scan, and
+    # parsed archives each worker keeps in memory.
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_AFTER_MONTHS: int = 12
+    ARCHIVE_BATCH_SIZE: int = 100
+    ARCHIVE_CACHE_PROJECTS: int = 256
+    # Background jobs (app/core/jobs.py): concurrent jobs per process
+    # (0 disables the runner), idle poll interval, lease and retry backoff.
+    JOBS_WORKERS: int = 2
+    JOBS_POLL_SECONDS: float = 1.0
+    JOBS_LEASE_SECONDS: float = 300.0
+    JOBS_RETRY_BASE_SECONDS: float = 2.0
+    JOBS_RETRY_MAX_SECONDS: float = 300.0
+    # Outgoing email (app/core/outbox.py): the transport ("file", "smtp" or
+    # "package.module:factory"), sender address, where the file transport
+    # writes, the SMTP server, emails sent per batch, delivery attempts and
+    # retry backoff, and whether and how often this process dispatches.
+    EMAIL_TRANSPORT: str = "file"
+    EMAIL_FROM: str = "ClientConnect <no-reply@localhost>"
+    EMAIL_FILE_DIR: str = "outbox"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: float = 5.0
+    EMAIL_RETRY_MAX_SECONDS: float = 1800.0
+    EMAIL_LEASE_SECONDS: float = 120.0
+    EMAIL_DISPATCHER_ENABLED: bool = True
+    EMAIL_POLL_SECONDS: float = 2.0
+    # Link in password reset emails; {token} is replaced by the reset token.
+    PASSWORD_RESET_URL: str = "http://localhost:3000/reset-password?token={token}"
+    # Admission control (app/core/admission.py). Rate limits per route group
+    # as "<count>/<s|m|h>,<burst>", per principal and per worker process.
+    RATE_LIMITS_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, str] = {
+        "default": "20/s,60",
+        "auth": "10/m,10",
+        "heavy": "2/s,10",
+    }
+    # Requests holding a DB session at once per process (default pool size +
+    # overflow), how many may queue for a slot and for how long.
+    DB_MAX_INFLIGHT: int = 15
+    DB_MAX_WAITING: int = 100
+    DB_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    DB_RETRY_AFTER_SECONDS: int = 1
+    # Startup schema handling: "check" (require the Alembic head revision),
+    # "create_all" (dev only) or "off". See app/core/schema.py.
+    DB_STARTUP: str = "check"
+    # Default comparison window for dashboard KPI changes: "month", "week" or
+    # "quarter" (overridable per request with ?period=).
+    DASHBOARD_PERIOD: str = "month"
+    # PostgreSQL only (app/core/partitions.py): monthly payments partitions
+    # kept ahead of today, and how often each worker checks (0 = only at
+    # startup).
+    PAYMENTS_PARTITION_MONTHS_AHEAD: int = 3
+    PAYMENTS_PARTITION_CHECK_SECONDS: float = 6 * 3600
+    # How long responses to requests with an Idempotency-Key are replayed.
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    # Client typeahead (app/core/suggest.py): tenants whose index each worker
+    # keeps, and how old an index may get before it is rebuilt (which is how
+    # writes served by other workers reach it).
+    CLIENT_SUGGEST_TENANTS: int = 256
+    CLIENT_SUGGEST_MAX_AGE_SECONDS: float = 60.0
+    # Revenue reports (app/core/reports.py): reports whose ended buckets each
+    # worker caches.
+    REPORT_CACHE_ENTRIES: int = 1024
+    # Comma-separated emails of the users allowed on /api/admin.
+    ADMIN_EMAILS: str = ""
+    # Slow-query log (app/core/slow_queries.py): off by default. Statements
+    # taking at least the threshold are logged and kept in a ring buffer for
+    # GET /api/admin/slow-queries; the sample rate is the share of them whose
+    # plan is captured with EXPLAIN.
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_BUFFER_SIZE: int = 200
+    # Sampling profiler behind GET /api/admin/profile (app/core/profiler.py):
+    # whether it may run, and the longest profile it takes.
+    PROFILER_ENABLED: bool = True
+    PROFILER_MAX_SECONDS: float = 60.0
+    # Live dashboard streams (app/core/live.py): heartbeat interval, events
+    # buffered per stream before it is told to resync, and open streams
+    # allowed per user and worker process.
+    LIVE_HEARTBEAT_SECONDS: float = 15.0
+    LIVE_QUEUE_SIZE: int = 64
+    LIVE_MAX_STREAMS_PER_USER: int = 5
 
     class Config:
         env_file = ".env"
@@ -1,23 +1,372 @@
+import itertools
+import logging
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import bindparam, column, event, make_url, select, table
+from sqlalchemy.exc import DBAPIError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.admission import db_gate
 from app.core.config import settings
+from app.core.security import decode_principal, get_current_user
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,  # Optional: turn off in prod
-)
 
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool):
+    """
+    ``connect`` listener tuning each SQLite connection.
+
+    WAL lets readers run alongside the writer, and ``synchronous=NORMAL`` is
+    durable under WAL except for the last commits before a power loss. The
+    page cache and memory map keep hot pages out of read() calls.
+    """
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_SECONDS * 1000)}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_KIB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_BYTES}",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA foreign_keys=ON",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return on_connect
+
+
+def _create_engines(url: str):
+    """
+    Writer engine for ``url`` and, for a SQLite file, an engine for its
+    pool of read-only connections (None otherwise).
+    """
+    if not is_sqlite_file(url):
+        return create_async_engine(url, echo=False), None  # echo: optional, turn off in prod
+
+    # SQLite allows one writer at a time. A single pooled connection queues
+    # a worker's writers in the pool instead of failing with "database is
+    # locked"; reads use their own pool.
+    writer = create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS},
+    )
+    event.listen(writer.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+    reader = create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READERS,
+        max_overflow=0,
+        connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_SECONDS},
+    )
+    event.listen(reader.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+    return writer, reader
+
+
+class Shard:
+    """
+    One tenant database: sessions on its writer and read-only sessions.
+    """
+
+    def __init__(self, index: int, engine, read_engine=None):
+        self.index = index
+        self.engine = engine
+        self.read_engine = read_engine
+        self.SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        # Under SQLite's WAL a commit is visible to the readers at once, so
+        # unlike replicas they need no read-after-write pinning.
+        self.ReadSessionLocal = (
+            sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+            if read_engine is not None
+            else self.SessionLocal
+        )
+
+    @classmethod
+    def from_url(cls, index: int, url: str) -> "Shard":
+        return cls(index, *_create_engines(url))
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        if self.read_engine is not None:
+            await self.read_engine.dispose()
+
+
+engine, sqlite_read_engine = _create_engines(DATABASE_URL)
+primary = Shard(0, engine, sqlite_read_engine)
+
+AsyncSessionLocal = primary.SessionLocal
+
+# Read-only sessions on the primary database.
+PrimaryReadSessionLocal = primary.ReadSessionLocal
+
+# Optional read replicas: DATABASE_READ_URL may list several, comma-separated.
+READ_URLS = [url.strip() for url in (settings.DATABASE_READ_URL or "").split(",") if url.strip()]
+
+read_engines = [create_async_engine(url, echo=False, pool_pre_ping=True) for url in READ_URLS]
+
+ReadSessionLocals = [
+    sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+    for read_engine in read_engines
+]
 
 Base = declarative_base()
 
+
+@event.listens_for(Session, "after_commit")
+def _flag_commit(session):
+    session.info["committed"] = True
+
+
+class ReplicaRouter:
+    """
+    Picks a session factory for read-only requests.
+
+    Replicas are used round-robin. A principal that committed a write within
+    the last ``READ_AFTER_WRITE_SECONDS`` reads from the primary, so it always
+    sees its own writes despite replication lag. A replica that fails to hand
+    out a connection is skipped for ``READ_REPLICA_RETRY_SECONDS``.
+
+    State is per worker process; a user whose next request lands on another
+    worker may still read a lagging replica for that request.
+    """
+
+    def __init__(self, factories: List[sessionmaker]):
+        self.factories = factories
+        self._cycle = itertools.cycle(range(len(factories))) if factories else None
+        self._recent_writers: Dict[str, float] = {}
+        self._down_until: Dict[int, float] = {}
+
+    def mark_write(self, principal: str) -> None:
+        now = time.monotonic()
+        self._recent_writers[principal] = now + settings.READ_AFTER_WRITE_SECONDS
+        if len(self._recent_writers) > 10_000:
+            self._recent_writers = {p: t for p, t in self._recent_writers.items() if t > now}
+
+    def is_sticky(self, principal: str) -> bool:
+        return self._recent_writers.get(principal, 0.0) > time.monotonic()
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + settings.READ_REPLICA_RETRY_SECONDS
+
+    def candidates(self) -> List[int]:
+        """
+        Healthy replica indexes, starting from the next one in rotation.
+        """
+        if not self.factories:
+            return []
+        now = time.monotonic()
+        start = next(self._cycle)
+        order = [(start + i) % len(self.factories) for i in range(len(self.factories))]
+        return [i for i in order if self._down_until.get(i, 0.0) <= now]
+
+
+replica_router = ReplicaRouter(ReadSessionLocals)
+
+
+# The shard directory, read without the TenantShard model
+# (app/models/tenant_shard.py), which imports Base from this module.
+_tenant_shards = table("tenant_shards", column("email"), column("shard"), column("moving"))
+_DIRECTORY_ENTRY = (
+    select(_tenant_shards.c.shard, _tenant_shards.c.moving)
+    .where(_tenant_shards.c.email == bindparam("email"))
+)
+
+
+class ShardMap:
+    """
+    The tenant databases and the directory saying which one holds a tenant.
+
+    Shard 0 is ``DATABASE_URL``; ``DATABASE_SHARD_URLS`` adds the others.
+    Each shard has the full schema and holds whole tenants: the user row and
+    everything that belongs to it. Shard 0 also keeps what is not
+    tenant-scoped, namely the ``tenant_shards`` directory and token
+    revocations.
+
+    A new tenant is placed by a hash of its email (the token subject), and
+    the placement is recorded in the directory, so moving a tenant
+    (app/core/shards.py) is a directory update. Entries are cached per
+    worker for ``SHARD_DIRECTORY_TTL_SECONDS``; emails without an entry
+    are on shard 0. With a single shard there is no directory lookup at all.
+    """
+
+    def __init__(self, shards: List[Shard]):
+        self.shards = shards
+        self._entries: Dict[str, Tuple[int, bool, float]] = {}
+
+    @property
+    def directory(self) -> Shard:
+        return self.shards[0]
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+
+    def place(self, email: str) -> int:
+        """
+        Shard index for a new tenant.
+        """
+        return zlib.crc32(email.lower().encode()) % len(self.shards)
+
+    async def locate(self, email: str) -> Tuple[Shard, bool]:
+        """
+        ``(shard, moving)`` for the tenant ``email``. ``moving`` is set while
+        the tenant is being copied to another shard; writes must wait.
+        """
+        if not self.sharded:
+            return self.directory, False
+        now = time.monotonic()
+        cached = self._entries.get(email)
+        if cached is None or cached[2] <= now:
+            async with self.directory.ReadSessionLocal() as session:
+                row = (await session.execute(_DIRECTORY_ENTRY, {"email": email})).first()
+            if row is None:
+                # Not cached: the email may be registered any moment.
+                return self.directory, False
+            cached = (row.shard, row.moving, now + settings.SHARD_DIRECTORY_TTL_SECONDS)
+            self._entries[email] = cached
+            if len(self._entries) > 10_000:
+                self._entries = {e: c for e, c in self._entries.items() if c[2] > now}
+        return self.shards[cached[0]], cached[1]
+
+    def forget(self, email: str) -> None:
+        self._entries.pop(email, None)
+
+
+SHARD_URLS = [url.strip() for url in (settings.DATABASE_SHARD_URLS or "").split(",") if url.strip()]
+
+shard_map = ShardMap([primary] + [Shard.from_url(n, url) for n, url in enumerate(SHARD_URLS, start=1)])
+
+
+def _request_principal(request: Request) -> Optional[str]:
+    # get_db runs before get_current_user, so decode the bearer token here
+    # unless admission control already did.
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            principal = decode_principal(token)
+    return principal
+
+
+async def _writable_shard(request: Request) -> Shard:
+    if not shard_map.sharded:
+        return shard_map.directory
+    principal = _request_principal(request)
+    if principal is None:
+        return shard_map.directory
+    shard, moving = await shard_map.locate(principal)
+    if moving:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Your data is being moved; please retry shortly",
+            headers={"Retry-After": str(max(1, int(settings.SHARD_DIRECTORY_TTL_SECONDS)))},
+        )
+    return shard
+
+
 # ✅ Proper async DB dependency
-async def get_db():
-    async with AsyncSessionLocal() as session:
+async def get_db(request: Request):
+    """
+    Session on the authenticated tenant's shard (the directory database for
+    anonymous requests).
+    """
+    async with db_gate.slot():
+        shard = await _writable_shard(request)
+        async with shard.SessionLocal() as session:
+            yield session
+            # Set by get_current_user on authenticated routes.
+            principal = getattr(request.state, "principal", None)
+            if session.info.get("committed") and principal is not None:
+                replica_router.mark_write(principal)
+
+
+async def get_directory_db():
+    """
+    Session on the directory database (shard 0), for data that is not
+    tenant-scoped: token revocations and the shard directory.
+    """
+    async with db_gate.slot(), AsyncSessionLocal() as session:
+        yield session
+
+
+@asynccontextmanager
+async def tenant_session(email: str, directory_db: Optional[AsyncSession] = None):
+    """
+    Session on ``email``'s shard, for routes that find the tenant by email
+    rather than by token. Yields ``directory_db`` itself when the tenant
+    lives on the directory database.
+    """
+    shard, _ = await shard_map.locate(email)
+    if directory_db is not None and shard is shard_map.directory:
+        yield directory_db
+        return
+    async with shard.SessionLocal() as session:
         yield session
+
+
+async def get_read_db(principal: str = Depends(get_current_user)):
+    """
+    Session for read-only routes: a replica when one is configured and
+    healthy, otherwise the primary. Never commit through this session.
+    """
+    async with read_session(principal) as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session(principal: str):
+    """
+    :func:`get_read_db` for code that only sometimes needs the database.
+    """
+    async with db_gate.slot():
+        session = await _open_read_session(principal)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def _open_read_session(principal: str) -> AsyncSession:
+    shard, _ = await shard_map.locate(principal)
+    if shard is not shard_map.directory:
+        # Replicas (DATABASE_READ_URL) are of shard 0 only.
+        return shard.ReadSessionLocal()
+
+    if not replica_router.is_sticky(principal):
+        for index in replica_router.candidates():
+            session = replica_router.factories[index]()
+            try:
+                # Check out a connection now so an unreachable replica
+                # fails over here rather than inside the route.
+                await session.connection()
+            except (OSError, DBAPIError, OperationalError) as exc:
+                await session.close()
+                logger.warning("Read replica %d unavailable, skipping: %s", index, exc)
+                replica_router.mark_down(index)
+                continue
+            return session
+
+    return PrimaryReadSessionLocal()
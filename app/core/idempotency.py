@@ -0,0 +1,107 @@
+"""
+``Idempotency-Key`` support for create routes.
+
+A create request carrying the header stores its response in
+``idempotency_keys`` in the same transaction as the row it creates. A retry
+with the same key gets the stored response back from a single lookup,
+without running the ownership checks or touching the domain tables again.
+
+Concurrent duplicates are resolved by the unique ``(principal, key)``
+constraint: both requests do the work, but only the first to commit keeps
+it. The other fails on the key insert, rolls back everything it did and
+returns the winner's response instead. No request ever sees a half-stored
+key, and no duplicate row survives.
+
+Keys expire after ``IDEMPOTENCY_TTL_SECONDS``. An expired key is replaced
+the next time it is used; rows nobody reuses can be cleaned up with
+``DELETE FROM idempotency_keys WHERE expires_at < now()``.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional, Type
+
+from fastapi import Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from ..models.idempotency_key import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class Idempotency:
+    def __init__(self, key: Optional[str], request_hash: Optional[str]):
+        self.key = key
+        self.request_hash = request_hash
+
+    def _lookup(self, principal: str):
+        return select(IdempotencyKey).where(IdempotencyKey.principal == principal, IdempotencyKey.key == self.key)
+
+    async def replay(self, db, principal: str) -> Optional[JSONResponse]:
+        """
+        The stored response for this key, or None if the request should run.
+        """
+        if self.key is None:
+            return None
+        result = await db.execute(self._lookup(principal))
+        stored = result.scalars().first()
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == stored.id))
+            return None
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        return JSONResponse(stored.response, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+    async def commit(self, db, principal: str, created, schema: Type[BaseModel],
+                     status_code: int = 200) -> Optional[JSONResponse]:
+        """
+        Commit ``db``, storing ``created`` (rendered with ``schema``) as the
+        response for this key. Returns the stored response of a concurrent
+        request that committed the same key first, or None.
+        """
+        if self.key is None:
+            await db.commit()
+            return None
+
+        await db.flush()
+        now = datetime.utcnow()
+        db.add(IdempotencyKey(
+            principal=principal,
+            key=self.key,
+            request_hash=self.request_hash,
+            status_code=status_code,
+            response=schema.model_validate(created, from_attributes=True).model_dump(mode="json"),
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            replayed = await self.replay(db, principal)
+            if replayed is None:
+                raise
+            return replayed
+        return None
+
+
+async def idempotency(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
+) -> Idempotency:
+    """
+    Route dependency reading the optional ``Idempotency-Key`` header.
+    """
+    if idempotency_key is None:
+        return Idempotency(None, None)
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return Idempotency(idempotency_key, digest.hexdigest())
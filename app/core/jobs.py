@@ -0,0 +1,280 @@
+"""
+In-process background jobs.
+
+Deferred work is stored in the ``jobs`` table and executed by a small pool of
+asyncio workers running inside each uvicorn process, so no external broker is
+needed. Any worker process may claim any job: claims are a conditional
+``UPDATE`` whose row count tells the claimer whether it won, which works the
+same on PostgreSQL and SQLite.
+
+Handlers are plain coroutines registered by kind::
+
+    @job_runner.handler("purge_client")
+    async def purge_client(ctx: JobContext, client_id: int):
+        ...
+        await ctx.progress(0.5)
+
+and are enqueued in the request's own transaction with :func:`enqueue`. A job
+that raises is retried with exponential backoff until ``max_attempts``.
+
+A claim is a lease of ``JOBS_LEASE_SECONDS``, renewed in the background while
+the handler runs, so a worker that dies leaves its jobs to be claimed again
+once the lease runs out. Each claim bumps ``attempts``, and every later write
+of the claimer is conditional on it: a worker whose job was claimed again
+(its lease lapsed, say, while its connection hung) stops at its next
+progress report and does not overwrite the new claimer's status.
+
+With several tenant shards (see ``ShardMap`` in app/core/database.py) a job
+lives on the shard of the request that enqueued it. Workers claim from every
+shard, and handlers reach the job's shard through ``ctx.session()``.
+"""
+import asyncio
+import logging
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import Shard, shard_map
+from ..models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Awaitable[Optional[Dict[str, Any]]]]
+
+
+class LeaseLost(RuntimeError):
+    """
+    The job was claimed again by another worker after this one's lease ran
+    out.
+    """
+
+
+def _held(job_id: int, attempt: int):
+    """
+    The job, while still claimed by the worker running ``attempt``.
+    """
+    return and_(Job.id == job_id, Job.attempts == attempt, Job.status == JobStatus.RUNNING)
+
+
+class JobContext:
+    """
+    Passed to handlers to report progress; each report also renews the lease
+    and raises :class:`LeaseLost` if it has been lost.
+    """
+
+    def __init__(self, shard: Shard, job_id: int, attempt: int):
+        self.shard = shard
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def session(self) -> AsyncSession:
+        """
+        A new session on the shard holding the job (and its tenant's rows).
+        """
+        return self.shard.SessionLocal()
+
+    async def progress(self, fraction: float) -> None:
+        await self._renew(progress=max(0.0, min(1.0, fraction)))
+
+    async def _renew(self, **values) -> None:
+        async with self.session() as session:
+            renewed = await session.execute(
+                update(Job).where(_held(self.job_id, self.attempt)).values(locked_at=datetime.utcnow(), **values)
+            )
+            await session.commit()
+        if renewed.rowcount != 1:
+            raise LeaseLost(f"Job {self.job_id} was claimed again")
+
+    async def keep_lease(self) -> None:
+        """
+        Renew the lease a few times per ``JOBS_LEASE_SECONDS`` until
+        cancelled, so handlers that report no progress keep their job.
+        """
+        while True:
+            await asyncio.sleep(settings.JOBS_LEASE_SECONDS / 3)
+            try:
+                await self._renew()
+            except LeaseLost:
+                return
+            except Exception:
+                logger.exception("Could not renew the lease of job %s", self.job_id)
+
+
+class JobRunner:
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self.handlers[kind] = func
+            return func
+        return register
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def start(self, workers: int) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n), name=f"job-worker-{n}") for n in range(workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """
+        Wake idle workers; called once a transaction that enqueued jobs commits.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def drain(self) -> int:
+        """
+        Run due jobs inline until none are left. Returns how many ran.
+        """
+        ran = 0
+        while (claimed := await self._claim()) is not None:
+            await self._execute(*claimed)
+            ran += 1
+        return ran
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                claimed = await self._claim()
+            except Exception:
+                logger.exception("Job worker %d failed to claim a job", n)
+                claimed = None
+            if claimed is not None:
+                try:
+                    await self._execute(*claimed)
+                except Exception:
+                    # The job's lease runs out and it is claimed again.
+                    logger.exception("Job worker %d failed to record job %s", n, claimed[1])
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.JOBS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- claiming and running -------------------------------------------
+
+    async def _claim(self):
+        for shard in shard_map.shards:
+            claimed = await self._claim_on(shard)
+            if claimed is not None:
+                return claimed
+        return None
+
+    async def _claim_on(self, shard: Shard):
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_after <= now),
+            and_(Job.status == JobStatus.RUNNING,
+                 Job.locked_at < now - timedelta(seconds=settings.JOBS_LEASE_SECONDS)),
+        )
+        async with shard.SessionLocal() as session:
+            result = await session.execute(
+                select(Job.id, Job.kind, Job.payload, Job.attempts)
+                .where(claimable).order_by(Job.run_after).limit(8)
+            )
+            for job_id, kind, payload, attempts in result.all():
+                # Only one claimer's UPDATE can still match the row.
+                claimed = await session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.attempts == attempts, claimable)
+                    .values(status=JobStatus.RUNNING, locked_at=now, attempts=attempts + 1,
+                            started_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+                if claimed.rowcount == 1:
+                    return shard, job_id, kind, payload or {}, attempts + 1
+        return None
+
+    async def _execute(self, shard: Shard, job_id: int, kind: str, payload: Dict[str, Any], attempt: int) -> None:
+        handler = self.handlers.get(kind)
+        ctx = JobContext(shard, job_id, attempt)
+        lease = asyncio.create_task(ctx.keep_lease(), name=f"job-lease-{job_id}")
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {kind!r}")
+            result = await handler(ctx, **payload)
+        except asyncio.CancelledError:
+            # Shutting down: leave the job RUNNING; its lease expires and
+            # another worker picks it up.
+            raise
+        except LeaseLost:
+            logger.warning("Job %s (%s) attempt %d lost its lease; stopped", job_id, kind, attempt)
+            return
+        except Exception as exc:
+            await self._record_failure(shard, job_id, kind, attempt, exc)
+            return
+        finally:
+            lease.cancel()
+            await asyncio.gather(lease, return_exceptions=True)
+
+        try:
+            async with shard.SessionLocal() as session:
+                finished = await session.execute(
+                    update(Job).where(_held(job_id, attempt)).values(
+                        status=JobStatus.SUCCEEDED, progress=1.0, result=result,
+                        error=None, finished_at=datetime.utcnow(),
+                    )
+                )
+                await session.commit()
+        except Exception as exc:
+            # A result the column cannot store fails the attempt like an error
+            # in the handler would.
+            logger.exception("Job %s (%s) attempt %d could not be recorded", job_id, kind, attempt)
+            await self._record_failure(shard, job_id, kind, attempt, exc)
+            return
+        if finished.rowcount != 1:
+            logger.warning("Job %s (%s) attempt %d finished after losing its lease", job_id, kind, attempt)
+
+    async def _record_failure(self, shard: Shard, job_id: int, kind: str, attempt: int, exc: Exception) -> None:
+        async with shard.SessionLocal() as session:
+            max_attempts = (await session.execute(select(Job.max_attempts).where(Job.id == job_id))).scalar()
+            error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            now = datetime.utcnow()
+            if max_attempts is not None and attempt < max_attempts:
+                delay = min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempt - 1), settings.JOBS_RETRY_MAX_SECONDS)
+                values = {"status": JobStatus.QUEUED, "run_after": now + timedelta(seconds=delay), "error": error}
+                logger.warning("Job %s (%s) attempt %d failed, retrying in %.0fs: %s", job_id, kind, attempt, delay, error)
+            else:
+                values = {"status": JobStatus.FAILED, "finished_at": now, "error": error}
+                logger.error("Job %s (%s) failed after %d attempts: %s", job_id, kind, attempt, error)
+            await session.execute(update(Job).where(_held(job_id, attempt)).values(**values))
+            await session.commit()
+
+job_runner = JobRunner()
+
+
+def enqueue(db: AsyncSession, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None,
+            max_attempts: int = 5) -> Job:
+    """
+    Add a job to ``db``'s transaction. It becomes visible to the runner (and
+    idle workers are woken) when the caller commits.
+    """
+    if kind not in job_runner.handlers:
+        raise LookupError(f"No handler registered for job kind {kind!r}")
+    job = Job(kind=kind, payload=payload, user_id=user_id, max_attempts=max_attempts,
+              run_after=datetime.utcnow())
+    db.add(job)
+    db.sync_session.info["wake_jobs"] = True
+    return job
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_runner(session):
+    if session.info.pop("wake_jobs", False):
+        job_runner.notify()
@@ -0,0 +1,255 @@
+"""
+Live dashboard updates pushed to subscribed users.
+
+Write paths record small events with :func:`publish` inside their
+transaction; once it commits, the events are fanned out to every open
+dashboard stream of the owning user, so dashboards only re-run the KPI
+queries on first load instead of polling them.
+
+Events are JSON objects:
+
+* ``{"type": "kpi", "kpi": "activeClients", "delta": 1}``: add ``delta`` to a
+  KPI value. Revenue deltas carry the payment's ``date`` so the client can
+  tell whether it falls in the period on screen.
+* ``{"type": "activity", "action": ..., "target": ..., "time": ...}``: a new
+  entry for the activity feed, shaped like ``ActivitySchema``.
+* ``{"type": "resync"}``: the deltas cannot be applied incrementally (a bulk
+  change, events were dropped, or they were too large to relay); refetch the
+  dashboard.
+
+Each stream has a bounded queue. A subscriber that falls behind by
+``LIVE_QUEUE_SIZE`` events has its backlog replaced by a single ``resync``
+instead of holding memory or slowing the publisher down. Idle streams cost a
+coroutine parked on its queue; they wake every ``LIVE_HEARTBEAT_SECONDS`` to
+send a heartbeat so proxies keep the connection open.
+
+Subscribers are per worker process. On PostgreSQL, each worker also relays
+its committed events through ``LISTEN``/``NOTIFY`` on one dedicated
+connection, so a write served by one worker reaches streams held by the
+others.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "live_events"
+
+# PostgreSQL rejects NOTIFY payloads of this many bytes or more.
+NOTIFY_LIMIT = 8000
+
+RESYNC = {"type": "resync"}
+
+
+def kpi_event(kpi: str, delta: float, day: Optional[date] = None) -> dict:
+    payload = {"type": "kpi", "kpi": kpi, "delta": delta}
+    if day is not None:
+        payload["date"] = day.isoformat()
+    return payload
+
+
+def activity_event(action: str, target: str, time: Optional[datetime] = None) -> dict:
+    return {
+        "type": "activity",
+        "person": "System",
+        "action": action,
+        "target": target,
+        "time": (time or datetime.utcnow()).isoformat(),
+    }
+
+
+# Dashboard KPIs that count projects in a given status.
+_STATUS_KPIS = {"Active": "projectsInProgress", "Pending": "pendingTasks"}
+
+
+def project_status_events(name: str, old, new) -> List[dict]:
+    """
+    Events for a project moving from status ``old`` to ``new``; either is
+    None when the project is created or deleted.
+    """
+    old, new = getattr(old, "value", old), getattr(new, "value", new)
+    if old == new:
+        return []
+    payloads = []
+    if old in _STATUS_KPIS:
+        payloads.append(kpi_event(_STATUS_KPIS[old], -1))
+    if new in _STATUS_KPIS:
+        payloads.append(kpi_event(_STATUS_KPIS[new], 1))
+    if new == "Completed":
+        payloads.append(activity_event("completed project", name))
+    return payloads
+
+
+class Subscription:
+    """
+    One open stream: a bounded queue of events for a single user.
+    """
+
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+        self._resync_pending = False
+
+    def offer(self, payload: dict) -> None:
+        if self._resync_pending:
+            # The client refetches everything on resync; anything before
+            # that point is redundant.
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self._resync_pending = True
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """
+        The next event, or None if nothing arrived within ``timeout`` seconds.
+        """
+        try:
+            payload = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if payload is RESYNC:
+            self._resync_pending = False
+        return payload
+
+
+class LiveHub:
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._origin = uuid.uuid4().hex
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- subscribers -----------------------------------------------------
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """
+        Open a stream for ``user_id``, or None if the user already has
+        ``LIVE_MAX_STREAMS_PER_USER`` open in this process.
+        """
+        streams = self._subscribers[user_id]
+        if len(streams) >= settings.LIVE_MAX_STREAMS_PER_USER:
+            if not streams:
+                del self._subscribers[user_id]
+            return None
+        subscription = Subscription(user_id, settings.LIVE_QUEUE_SIZE)
+        streams.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        streams = self._subscribers.get(subscription.user_id)
+        if streams is None:
+            return
+        streams.discard(subscription)
+        if not streams:
+            del self._subscribers[subscription.user_id]
+
+    def dispatch(self, user_id: int, payloads: List[dict]) -> None:
+        for subscription in self._subscribers.get(user_id, ()):
+            for payload in payloads:
+                subscription.offer(payload)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(streams) for streams in self._subscribers.values())
+
+    # --- publishing ------------------------------------------------------
+
+    def committed(self, events: List[Tuple[int, List[dict]]]) -> None:
+        """
+        Deliver events of a committed transaction locally and, when the relay
+        is running, to the other workers.
+        """
+        for user_id, payloads in events:
+            self.dispatch(user_id, payloads)
+        if self._outbox is not None:
+            self._outbox.put_nowait(events)
+
+    # --- cross-worker relay ----------------------------------------------
+
+    async def start(self, engine) -> None:
+        if engine.dialect.name != "postgresql":
+            return
+        self._outbox = asyncio.Queue()
+        self._task = asyncio.create_task(self._relay(engine), name="live-relay")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._outbox = None
+
+    def _notify_payload(self, events: List[Tuple[int, List[dict]]]) -> str:
+        """
+        The relay message for ``events``; events too large for one NOTIFY
+        become a resync for each of their users.
+        """
+        message = json.dumps({"origin": self._origin, "events": events}, separators=(",", ":"))
+        if len(message.encode()) < NOTIFY_LIMIT:
+            return message
+        users = sorted({user_id for user_id, _ in events})
+        return json.dumps({"origin": self._origin, "events": [(user_id, [RESYNC]) for user_id in users]},
+                          separators=(",", ":"))
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == self._origin:
+            return
+        for user_id, payloads in message["events"]:
+            self.dispatch(user_id, payloads)
+
+    async def _relay(self, engine) -> None:
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = (await conn.get_raw_connection()).driver_connection
+                    await raw.add_listener(CHANNEL, self._on_notify)
+                    while True:
+                        events = await self._outbox.get()
+                        await raw.execute("SELECT pg_notify($1, $2)", CHANNEL, self._notify_payload(events))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Live event relay failed; reconnecting")
+                await asyncio.sleep(1.0)
+
+
+live_hub = LiveHub()
+
+
+def publish(db, user_id: int, *payloads: dict) -> None:
+    """
+    Queue events for ``user_id``'s dashboards; they are delivered only if
+    ``db``'s transaction commits.
+    """
+    if payloads:
+        db.sync_session.info.setdefault("live_events", []).append((user_id, list(payloads)))
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed(session):
+    events = session.info.pop("live_events", None)
+    if events:
+        live_hub.committed(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("live_events", None)
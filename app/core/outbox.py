@@ -0,0 +1,333 @@
+"""
+Transactional outbox for email.
+
+Routes never talk to a mail server. :func:`enqueue_email` adds an
+``outbox_emails`` row to the route's own transaction, so an email exists
+exactly when the change that caused it commits, and a slow or unreachable
+mail server adds nothing to request latency. The dispatcher (``outbox``)
+runs in each worker process. It claims due emails in batches of
+``EMAIL_BATCH_SIZE`` and hands each batch to the transport, which can send
+the whole batch over one connection.
+
+``EMAIL_TRANSPORT`` picks the transport:
+
+* ``file`` writes each email as an ``.eml`` file under ``EMAIL_FILE_DIR``
+  (development and tests);
+* ``smtp`` sends through ``SMTP_HOST``, one connection per batch;
+* ``package.module:factory`` names a callable returning any object with an
+  ``async send(emails)`` method like theirs.
+
+A failed email is retried with exponential backoff. After
+``EMAIL_MAX_ATTEMPTS`` it is marked ``Failed``. ``GET /api/emails`` shows
+each email's status, attempts and last error. Delivery is at least once: a
+dispatcher that dies between sending and recording it leaves the batch to
+be claimed again once its lease (``EMAIL_LEASE_SECONDS``) expires. Every
+email keeps one ``Message-ID`` across attempts, so receivers can drop
+duplicates.
+
+The body is only kept while the email may still be sent: marking it
+``Sent`` or ``Failed`` blanks it, so a password reset link does not outlive
+its delivery in the table or its backups.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import smtplib
+import ssl
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import parseaddr
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import Shard, shard_map
+from ..models.outbox_email import EmailStatus, OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    id: int
+    message_id: str
+    recipient: str
+    subject: str
+    body: str
+
+    def to_message(self) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = settings.EMAIL_FROM
+        message["To"] = self.recipient
+        message["Subject"] = self.subject
+        message["Message-ID"] = self.message_id
+        message.set_content(self.body)
+        return message
+
+
+def _message_id(shard: Shard, email_id: int) -> str:
+    domain = parseaddr(settings.EMAIL_FROM)[1].rpartition("@")[2] or "localhost"
+    return f"<outbox-{shard.index}-{email_id}@{domain}>"
+
+
+# --- transports ----------------------------------------------------------
+#
+# ``send`` returns the errors of emails that failed on their own, by email
+# id; raising fails the whole batch.
+
+class FileTransport:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, email: OutgoingEmail) -> str:
+        return os.path.join(self.directory, email.message_id.strip("<>").partition("@")[0] + ".eml")
+
+    async def send(self, emails: Sequence[OutgoingEmail]) -> Dict[int, str]:
+        await asyncio.to_thread(self._write, emails)
+        return {}
+
+    def _write(self, emails: Sequence[OutgoingEmail]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for email in emails:
+            with open(self.path(email), "wb") as out:
+                out.write(email.to_message().as_bytes())
+
+
+class SMTPTransport:
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls) -> "SMTPTransport":
+        return cls(settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USERNAME, settings.SMTP_PASSWORD,
+                   settings.SMTP_STARTTLS, settings.SMTP_TIMEOUT_SECONDS)
+
+    async def send(self, emails: Sequence[OutgoingEmail]) -> Dict[int, str]:
+        return await asyncio.to_thread(self._send, emails)
+
+    def _send(self, emails: Sequence[OutgoingEmail]) -> Dict[int, str]:
+        errors = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            for email in emails:
+                try:
+                    smtp.send_message(email.to_message())
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as exc:
+                    errors[email.id] = f"{type(exc).__name__}: {exc}"
+        return errors
+
+
+def load_transport(name: str):
+    if name == "file":
+        return FileTransport(settings.EMAIL_FILE_DIR)
+    if name == "smtp":
+        return SMTPTransport.from_settings()
+    module, _, factory = name.partition(":")
+    if not factory:
+        raise ValueError(f"Unknown EMAIL_TRANSPORT {name!r}")
+    return getattr(importlib.import_module(module), factory)()
+
+
+# --- dispatcher ----------------------------------------------------------
+
+def _claimable(now: datetime):
+    return or_(
+        and_(OutboxEmail.status == EmailStatus.PENDING, OutboxEmail.next_attempt_at <= now),
+        and_(OutboxEmail.status == EmailStatus.SENDING,
+             OutboxEmail.locked_at < now - timedelta(seconds=settings.EMAIL_LEASE_SECONDS)),
+    )
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self.transport = None  # loaded from EMAIL_TRANSPORT on first use
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def start(self) -> None:
+        if not settings.EMAIL_DISPATCHER_ENABLED:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch_forever(), name="email-outbox")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self) -> None:
+        """
+        Wake the dispatcher; called once a transaction that enqueued email
+        commits.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def drain(self) -> int:
+        """
+        Dispatch due batches inline until none are left. Returns how many
+        emails were handed to the transport.
+        """
+        handled = 0
+        while (batch := await self.dispatch_once()):
+            handled += batch
+        return handled
+
+    async def _dispatch_forever(self) -> None:
+        while True:
+            try:
+                handled = await self.dispatch_once()
+            except Exception:
+                logger.exception("Email dispatch failed")
+                handled = 0
+            if handled:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.EMAIL_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- claiming and sending --------------------------------------------
+
+    async def dispatch_once(self) -> int:
+        """
+        Claim and send one batch per shard. Returns how many emails were
+        handed to the transport.
+        """
+        handled = 0
+        for shard in shard_map.shards:
+            claimed = await self._claim(shard)
+            if claimed:
+                await self._deliver(shard, *claimed)
+                handled += len(claimed[1])
+        return handled
+
+    async def _claim(self, shard: Shard) -> Optional[Tuple[str, list]]:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        async with shard.SessionLocal() as session:
+            due = (await session.execute(
+                select(OutboxEmail.id).where(_claimable(now))
+                .order_by(OutboxEmail.next_attempt_at).limit(settings.EMAIL_BATCH_SIZE)
+            )).scalars().all()
+            if not due:
+                return None
+            # Re-checking the claim condition makes concurrent claimers
+            # split the batch instead of both taking it.
+            await session.execute(
+                update(OutboxEmail)
+                .where(OutboxEmail.id.in_(due), _claimable(now))
+                .values(status=EmailStatus.SENDING, locked_at=now, claim_token=token,
+                        attempts=OutboxEmail.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = (await session.execute(
+                select(OutboxEmail.id, OutboxEmail.recipient, OutboxEmail.subject, OutboxEmail.body,
+                       OutboxEmail.attempts, OutboxEmail.max_attempts)
+                .where(OutboxEmail.id.in_(due), OutboxEmail.claim_token == token)
+            )).all()
+            await session.commit()
+        return (token, claimed) if claimed else None
+
+    async def _deliver(self, shard: Shard, token: str, claimed: list) -> None:
+        if self.transport is None:
+            self.transport = load_transport(settings.EMAIL_TRANSPORT)
+        emails = [
+            OutgoingEmail(row.id, _message_id(shard, row.id), row.recipient, row.subject, row.body)
+            for row in claimed
+        ]
+        try:
+            errors = await self.transport.send(emails)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Email batch of %d failed: %s", len(emails), error)
+            errors = {email.id: error for email in emails}
+
+        now = datetime.utcnow()
+        ours = OutboxEmail.claim_token == token
+        async with shard.SessionLocal() as session:
+            sent = [row.id for row in claimed if row.id not in errors]
+            if sent:
+                await session.execute(
+                    update(OutboxEmail).where(OutboxEmail.id.in_(sent), ours)
+                    .values(status=EmailStatus.SENT, sent_at=now, last_error=None, claim_token=None, body="")
+                    .execution_options(synchronize_session=False)
+                )
+            for row in claimed:
+                if row.id not in errors:
+                    continue
+                if row.attempts < row.max_attempts:
+                    delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (row.attempts - 1),
+                                settings.EMAIL_RETRY_MAX_SECONDS)
+                    values = {"status": EmailStatus.PENDING, "next_attempt_at": now + timedelta(seconds=delay)}
+                else:
+                    values = {"status": EmailStatus.FAILED, "body": ""}
+                    logger.error("Email %s failed after %d attempts: %s", row.id, row.attempts, errors[row.id])
+                await session.execute(
+                    update(OutboxEmail).where(OutboxEmail.id == row.id, ours)
+                    .values(last_error=errors[row.id], claim_token=None, **values)
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        logger.info("Sent %d emails, %d failed", len(sent), len(errors))
+
+
+outbox = OutboxDispatcher()
+
+
+def enqueue_email(db: AsyncSession, kind: str, recipient: str, subject: str, body: str,
+                  user_id: Optional[int] = None) -> OutboxEmail:
+    """
+    Add an email to ``db``'s transaction. It is sent (and the dispatcher
+    woken) only if the caller commits.
+    """
+    email = OutboxEmail(kind=kind, user_id=user_id, recipient=recipient, subject=subject, body=body,
+                        max_attempts=settings.EMAIL_MAX_ATTEMPTS, next_attempt_at=datetime.utcnow())
+    db.add(email)
+    db.sync_session.info["wake_outbox"] = True
+    return email
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop("wake_outbox", False):
+        outbox.notify()
+
+
+# --- messages ------------------------------------------------------------
+
+def password_reset_email(token: str) -> Tuple[str, str]:
+    link = settings.PASSWORD_RESET_URL.format(token=token)
+    minutes = settings.RESET_TOKEN_EXPIRE_MINUTES
+    return "Reset your password", (
+        "Someone asked to reset the password of your ClientConnect account.\n\n"
+        f"To choose a new password, open this link within {minutes} minutes:\n\n{link}\n\n"
+        "If it wasn't you, ignore this email; your password stays the same.\n"
+    )
+
+
+def password_changed_email() -> Tuple[str, str]:
+    return "Your password was changed", (
+        "The password of your ClientConnect account was just changed, and every\n"
+        "device signed in with the old one has been signed out.\n\n"
+        "If you didn't do this, reset your password right away.\n"
+    )
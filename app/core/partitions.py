@@ -0,0 +1,164 @@
+"""
+Monthly range partitions of ``payments`` on PostgreSQL.
+
+The migration turns ``payments`` into a table partitioned by ``date_paid``
+with one partition per calendar month (``payments_y2025m07`` holds July
+2025) and a ``payments_default`` partition for anything outside them. Queries
+bounded on ``date_paid``, such as the dashboard revenue KPI and
+``GET /payments?from=&to=``, then only scan the months they cover.
+
+Each worker keeps ``PAYMENTS_PARTITION_MONTHS_AHEAD`` months of partitions
+in place, checking at startup and every ``PAYMENTS_PARTITION_CHECK_SECONDS``,
+so rows for a new month never pile up in the default partition. Rows that
+are already there when their month's partition is created are moved into
+it.
+
+On other databases ``payments`` is a plain table with an index on
+``date_paid`` and the maintainer does nothing.
+"""
+import asyncio
+import logging
+import zlib
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "payments"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Serialises partition DDL between workers booting at the same time.
+PARTITION_LOCK_KEY = zlib.crc32(b"frexta-backend:payments-partitions")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partitions(first: date, last: date) -> List[Tuple[str, date, date]]:
+    """
+    ``(name, lower, upper)`` of the monthly partitions covering ``first``
+    through ``last`` inclusive; ``upper`` is exclusive.
+    """
+    partitions = []
+    lower = month_start(first)
+    while lower <= last:
+        upper = add_months(lower, 1)
+        partitions.append((f"{TABLE}_y{lower.year:04d}m{lower.month:02d}", lower, upper))
+        lower = upper
+    return partitions
+
+
+async def is_partitioned(conn) -> bool:
+    result = await conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": TABLE},
+    )
+    return bool(result.scalar())
+
+
+async def _create_partition(conn, name: str, lower: date, upper: date) -> int:
+    """
+    Create one monthly partition, first moving any of its rows out of the
+    default partition (PostgreSQL refuses to create a partition whose rows
+    already sit in the default one). Returns the number of rows moved.
+    """
+    bounds = {"lower": lower, "upper": upper}
+    in_range = "date_paid >= :lower AND date_paid < :upper"
+    moved = (await conn.execute(
+        text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds
+    )).scalar()
+    if moved:
+        await conn.execute(text(
+            f"CREATE TEMP TABLE _moved_payments AS "
+            f"SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"
+        ), bounds)
+        await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    await conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+    if moved:
+        await conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM _moved_payments"))
+        await conn.execute(text("DROP TABLE _moved_payments"))
+    return moved
+
+
+async def ensure_payment_partitions(engine: AsyncEngine, today: Optional[date] = None,
+                                    months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create any missing partition from the current month through
+    ``months_ahead`` months later. Returns the names of the partitions
+    created; a no-op unless ``payments`` is partitioned.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    today = today or date.today()
+    if months_ahead is None:
+        months_ahead = settings.PAYMENTS_PARTITION_MONTHS_AHEAD
+    wanted = month_partitions(today, add_months(today, months_ahead))
+
+    created = []
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn):
+            return []
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        result = await conn.execute(
+            text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                 "WHERE i.inhparent = to_regclass(:table)"),
+            {"table": TABLE},
+        )
+        existing = set(result.scalars().all())
+        for name, lower, upper in wanted:
+            if name in existing:
+                continue
+            moved = await _create_partition(conn, name, lower, upper)
+            created.append(name)
+            logger.info("Created partition %s (%d rows moved from %s)", name, moved, DEFAULT_PARTITION)
+    return created
+
+
+class PartitionMaintainer:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, *engines: AsyncEngine) -> None:
+        """
+        Keep payments partitions ahead on every PostgreSQL engine (one per
+        tenant shard).
+        """
+        engines = tuple(engine for engine in engines if engine.dialect.name == "postgresql")
+        if not engines:
+            return
+        for engine in engines:
+            await ensure_payment_partitions(engine)
+        if settings.PAYMENTS_PARTITION_CHECK_SECONDS > 0:
+            self._task = asyncio.create_task(self._maintain_forever(engines), name="payment-partitions")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _maintain_forever(self, engines: Tuple[AsyncEngine, ...]) -> None:
+        while True:
+            await asyncio.sleep(settings.PAYMENTS_PARTITION_CHECK_SECONDS)
+            for engine in engines:
+                try:
+                    await ensure_payment_partitions(engine)
+                except Exception:
+                    logger.exception("Payment partition maintenance failed")
+
+
+partition_maintainer = PartitionMaintainer()
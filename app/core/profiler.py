@@ -0,0 +1,187 @@
+"""
+On-demand statistical profiler for a live worker.
+
+``GET /api/admin/profile`` starts a sampler thread for a few seconds. Every
+interval it reads the stack of each of the worker's threads from
+``sys._current_frames()`` and counts identical stacks. Nothing is traced, so
+the profiled code runs at full speed, less the GIL time the sampler takes for
+a snapshot. There is no thread and no hook outside a profile, so leaving the
+route enabled costs nothing.
+
+Samples of the event loop's thread can be tagged with the route being
+served: :class:`~app.core.request_context.RequestContextMiddleware` records
+each request's scope against its task, and the sampler looks up the loop's
+current task. Reading the frames' locals instead would make the interpreter
+sync the fast locals of a running frame from another thread.
+
+Profiles come out as collapsed stacks (``thread;frame;frame count`` lines,
+for ``flamegraph.pl`` and most flame graph viewers) or as a speedscope file.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .request_context import route_of, scopes_by_task
+
+# Frames kept per stack; deeper stacks lose their outermost frames.
+MAX_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # function, file, first line
+Key = Tuple[str, Optional[str], Tuple[Frame, ...]]  # thread, route, stack from the root
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short(filename: str) -> str:
+    """
+    ``filename`` relative to the app or to its installed package root.
+    """
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            return filename.rsplit(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return filename
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    """
+    ``frame``'s stack from its root.
+    """
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+class Profile:
+    def __init__(self, counts: Dict[Key, int], interval: float, duration: float):
+        self.counts = counts
+        self.interval = interval
+        self.duration = duration
+
+    @property
+    def samples(self) -> int:
+        return sum(self.counts.values())
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread, route, stack), count in sorted(self.counts.items(), key=lambda item: -item[1]):
+            names = [thread] + ([route] if route else [])
+            names += [f"{name} ({_short(filename)}:{line})" for name, filename, line in stack]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """
+        One sampled profile per thread (and route), weighted in seconds.
+        """
+        frames: List[dict] = []
+        index: Dict[Frame, int] = {}
+        profiles: Dict[str, dict] = defaultdict(lambda: {"samples": [], "weights": []})
+        for (thread, route, stack), count in self.counts.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, filename, line = frame
+                    frames.append({"name": name, "file": _short(filename), "line": line})
+                ids.append(index[frame])
+            profile = profiles[f"{thread} {route}" if route else thread]
+            profile["samples"].append(ids)
+            profile["weights"].append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "frexta-backend profiler",
+            "name": f"{self.duration:.1f}s profile",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(profile["weights"]), 6),
+                    **profile,
+                }
+                for name, profile in sorted(profiles.items())
+            ],
+        }
+
+
+class StackSampler:
+    """
+    Takes one profile at a time of the threads of this process.
+    """
+
+    def __init__(self):
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, seconds: float, interval: float, by_route: bool = False) -> Profile:
+        """
+        Sample every ``interval`` seconds for ``seconds``; raise
+        :class:`ProfilerBusy` if a profile is already being taken.
+        """
+        if self._running:
+            raise ProfilerBusy("A profile is already being taken")
+        self._running = True
+        try:
+            counts: Counter = Counter()
+            stop = threading.Event()
+            loop = asyncio.get_running_loop() if by_route else None
+            sampler = threading.Thread(
+                target=self._sample, args=(counts, interval, stop, threading.get_ident(), loop),
+                name="profiler", daemon=True,
+            )
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                # The sampler may be mid-snapshot; don't hold up the loop for it.
+                await asyncio.to_thread(sampler.join)
+            return Profile(dict(counts), interval, time.perf_counter() - started)
+        finally:
+            self._running = False
+
+    @staticmethod
+    def _sample(counts: Counter, interval: float, stop: threading.Event, loop_thread: int,
+                loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Count the stacks of every other thread until ``stop``; with ``loop``,
+        tag the loop thread's stacks with the route its current task serves.
+        """
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not stop.wait(interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    threads = {thread.ident: thread.name for thread in threading.enumerate()}
+                    names[ident] = "event-loop" if ident == loop_thread else threads.get(ident, str(ident))
+                route = None
+                if loop is not None and ident == loop_thread:
+                    route = route_of(scopes_by_task.get(asyncio.current_task(loop)))
+                counts[names[ident], route, _stack(frame)] += 1
+            # Frames keep their locals alive; drop them until the next sample.
+            frames = frame = None
+
+
+stack_sampler = StackSampler()
@@ -0,0 +1,75 @@
+"""
+Background purge of soft-deleted clients and projects.
+
+``DELETE /clients/{id}`` and ``DELETE /projects/{id}`` only stamp
+``deleted_at``, which hides the row (and, through the ownership queries,
+everything under it) immediately. The rows themselves, and the archive files
+of archived projects, are removed here, after the response has been sent, by
+a background job (see app/core/jobs.py) that works in batches of
+``PURGE_BATCH_SIZE`` with a commit per batch so no single statement holds
+locks on a large share of a table. Every step is idempotent, so a retried or
+re-claimed job simply carries on.
+"""
+import logging
+
+from sqlalchemy import delete, or_, select
+
+from .archive import remove_archive
+from .config import settings
+from .jobs import JobContext, job_runner
+from ..models.client import Client
+from ..models.note import Note
+from ..models.payment import Payment
+from ..models.project import Project
+
+logger = logging.getLogger(__name__)
+
+
+async def _delete_in_batches(ctx: JobContext, model, *criteria) -> int:
+    """
+    Delete rows of ``model`` matching ``criteria``, one bounded batch per
+    transaction. Returns the number of rows removed.
+    """
+    removed = 0
+    while True:
+        batch = select(model.id).where(*criteria).limit(settings.PURGE_BATCH_SIZE)
+        async with ctx.session() as session:
+            result = await session.execute(
+                delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        removed += result.rowcount
+        if result.rowcount < settings.PURGE_BATCH_SIZE:
+            return removed
+
+
+@job_runner.handler("purge_project")
+async def purge_project(ctx: JobContext, project_id: int) -> dict:
+    payments = await _delete_in_batches(ctx, Payment, Payment.project_id == project_id)
+    await ctx.progress(0.5)
+    notes = await _delete_in_batches(ctx, Note, Note.project_id == project_id)
+    remove_archive(project_id)
+    await _delete_in_batches(ctx, Project, Project.id == project_id, Project.deleted_at.is_not(None))
+    logger.info("Purged project %s (%d payments, %d notes)", project_id, payments, notes)
+    return {"payments": payments, "notes": notes}
+
+
+@job_runner.handler("purge_client")
+async def purge_client(ctx: JobContext, client_id: int) -> dict:
+    project_ids = select(Project.id).where(Project.client_id == client_id)
+    payments = await _delete_in_batches(ctx, Payment, Payment.project_id.in_(project_ids))
+    await ctx.progress(0.4)
+    notes = await _delete_in_batches(ctx, Note, or_(Note.client_id == client_id, Note.project_id.in_(project_ids)))
+    await ctx.progress(0.8)
+    async with ctx.session() as session:
+        archived = await session.execute(
+            select(Project.id).where(Project.client_id == client_id, Project.archived_at.is_not(None))
+        )
+        for project_id in archived.scalars():
+            remove_archive(project_id)
+    projects = await _delete_in_batches(ctx, Project, Project.client_id == client_id)
+    await _delete_in_batches(ctx, Client, Client.id == client_id, Client.deleted_at.is_not(None))
+    logger.info(
+        "Purged client %s (%d projects, %d payments, %d notes)", client_id, projects, payments, notes
+    )
+    return {"projects": projects, "payments": payments, "notes": notes}
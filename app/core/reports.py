@@ -0,0 +1,173 @@
+"""
+Revenue time series for ``GET /api/reports/revenue``.
+
+Payments are summed per time bucket (day, week or month) in SQL through
+:class:`date_bucket`, which compiles to ``date_trunc`` on PostgreSQL and to
+the equivalent ``date()`` modifiers on SQLite. The route then fills empty
+buckets and derives running totals and trailing moving averages per series,
+a whole column at a time.
+
+A bucket that has ended cannot gain payments without a write by its tenant,
+and every write advances the tenant's ``sync_seq``. Each worker therefore
+caches the sums of ended buckets in an LRU of ``REPORT_CACHE_ENTRIES``
+reports, validated by ``users.sync_seq``, which the route reads anyway. A
+repeated report only queries the buckets it has not seen, usually just the
+current one.
+"""
+from collections import OrderedDict
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from sqlalchemy import literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Date
+
+from .config import settings
+from .partitions import add_months
+
+BUCKETS = ("day", "week", "month")
+
+# Buckets shown when the request gives no ``from``.
+DEFAULT_BUCKETS = 30
+MAX_BUCKETS = 1000
+
+
+class date_bucket(FunctionElement):
+    """
+    ``date_bucket(unit, column)``: the first day of the day, week (starting
+    Monday) or month containing ``column``, as a date.
+    """
+    type = Date()
+    name = "date_bucket"
+    inherit_cache = True
+
+    def __init__(self, unit: str, expr):
+        if unit not in BUCKETS:
+            raise ValueError(f"Unknown bucket {unit!r}")
+        super().__init__(literal_column(f"'{unit}'"), expr)
+
+
+@compiles(date_bucket)
+def _date_bucket(element, compiler, **kw):
+    unit, expr = element.clauses
+    return f"CAST(date_trunc({compiler.process(unit, **kw)}, {compiler.process(expr, **kw)}) AS DATE)"
+
+
+@compiles(date_bucket, "sqlite")
+def _date_bucket_sqlite(element, compiler, **kw):
+    unit, expr = element.clauses
+    column = compiler.process(expr, **kw)
+    modifiers = {
+        "day": "",
+        # Back six days, then forward to the next Monday (or stay on it).
+        "week": ", '-6 days', 'weekday 1'",
+        "month": ", 'start of month'",
+    }[unit.name.strip("'")]
+    return f"date({column}{modifiers})"
+
+
+def bucket_start(unit: str, day: date) -> date:
+    """
+    :class:`date_bucket` in Python.
+    """
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    if unit == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(unit: str, start: date) -> date:
+    if unit == "month":
+        return add_months(start, 1)
+    return start + timedelta(days=7 if unit == "week" else 1)
+
+
+def bucket_starts(unit: str, first: date, last: date) -> List[date]:
+    """
+    Starts of the buckets covering ``first`` through ``last`` inclusive.
+    """
+    starts, start = [], bucket_start(unit, first)
+    while start <= last:
+        starts.append(start)
+        start = next_bucket(unit, start)
+    return starts
+
+
+def default_start(unit: str, last: date) -> date:
+    start = bucket_start(unit, last)
+    if unit == "month":
+        return add_months(start, 1 - DEFAULT_BUCKETS)
+    return start - (DEFAULT_BUCKETS - 1) * timedelta(days=7 if unit == "week" else 1)
+
+
+# --- series --------------------------------------------------------------
+
+def fill(sums: Dict[date, float], starts: List[date]) -> List[float]:
+    """
+    ``sums`` laid out over ``starts``, with 0 for buckets without payments.
+    """
+    return [sums.get(start, 0.0) for start in starts]
+
+
+def running_totals(values: List[float]) -> List[float]:
+    return [round(total, 2) for total in accumulate(values)]
+
+
+def moving_averages(values: List[float], window: int) -> List[float]:
+    """
+    Mean of each bucket and up to ``window - 1`` buckets before it, from one
+    pass of prefix sums.
+    """
+    prefix = [0.0, *accumulate(values)]
+    return [round((prefix[i] - prefix[max(0, i - window)]) / min(i, window), 2) for i in range(1, len(prefix))]
+
+
+# --- cache ---------------------------------------------------------------
+
+Sums = Dict[date, Dict[Hashable, float]]
+
+
+class RevenueCache:
+    """
+    Per-worker LRU of ended buckets' sums per report kind, keyed by
+    ``(principal, bucket, group_by)``.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple, Tuple[int, Sums, Dict[Hashable, str]]]" = OrderedDict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, key: Tuple, seq: int) -> Tuple[Sums, Dict[Hashable, str]]:
+        """
+        Cached sums and group names for ``key``, if nothing changed since
+        ``seq``; empty otherwise.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != seq:
+            return {}, {}
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: Tuple, seq: int, sums: Sums, names: Dict[Hashable, str], ended: Iterable[date]) -> None:
+        """
+        Keep the ``ended`` buckets of ``sums`` (with the names of their
+        groups) for ``key`` as of ``seq``.
+        """
+        cached, cached_names = self.get(key, seq)
+        cached = dict(cached)
+        for start in ended:
+            cached[start] = sums.get(start, {})
+        groups = {group for groups in cached.values() for group in groups}
+        names = {group: names.get(group, cached_names.get(group)) for group in groups}
+        self._entries[key] = (seq, cached, names)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.REPORT_CACHE_ENTRIES:
+            self._entries.popitem(last=False)
+
+
+revenue_cache = RevenueCache()
@@ -0,0 +1,56 @@
+"""
+The ASGI scope of the request being served, for code far from the route.
+
+Engine event hooks and samplers run without a ``Request`` at hand.
+``RequestContextMiddleware`` puts the scope in a context variable, which is
+copied into every task and greenlet the request runs in, and records it
+against the request's task in ``scopes_by_task`` for readers on other
+threads, which cannot see a task's context. The route template and principal
+are read from the scope when needed: routing adds the matched route to it,
+and ``get_current_user`` adds the principal.
+"""
+import asyncio
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+scopes_by_task: Dict[asyncio.Task, dict] = {}
+
+
+def route_of(scope: Optional[dict]) -> Optional[str]:
+    """
+    ``"GET /api/clients/{id}"`` for a routed request, else None.
+    """
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method', scope['type'].upper())} {path}"
+
+
+def principal_of(scope: Optional[dict]) -> Optional[str]:
+    if scope is None:
+        return None
+    state = scope.get("state") or {}
+    return state.get("principal")
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        token = current_scope.set(scope)
+        task = asyncio.current_task()
+        outer = scopes_by_task.get(task)
+        scopes_by_task[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+            if outer is None:
+                del scopes_by_task[task]
+            else:
+                scopes_by_task[task] = outer
@@ -0,0 +1,218 @@
+"""
+In-memory token revocation list.
+
+Revocations are persisted in ``token_revocations`` but checked without a
+database round trip: every worker keeps
+
+* a Bloom filter over revoked token ids, so the common case (a token that was
+  never revoked) is answered by a few bit tests;
+* an exact dict of revoked ids behind it, consulted only on a Bloom hit, to
+  weed out false positives;
+* per-subject cutoffs (from password resets) revoking every token issued
+  before a point in time.
+
+The list is rebuilt from the table at startup and then tails new rows every
+``REVOCATION_SYNC_SECONDS``, which is how a revocation made by one worker
+reaches the others.
+
+Ids are handed out when a row is inserted, not when it commits, so a row can
+become visible after rows with higher ids (on PostgreSQL, two revoking
+transactions committing in the other order). Each id skipped over by the
+tail is therefore kept as a gap and looked up again on every sync, until it
+shows up or ``REVOCATION_GAP_SECONDS`` have passed (its transaction rolled
+back, or the row had already expired when loaded).
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Gaps tracked at most; a larger jump in ids keeps only the ids right below
+# the new row, the likeliest to still be in flight.
+MAX_GAPS = 1000
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self):
+        self._revoked: Dict[str, datetime] = {}
+        self._cutoffs: Dict[str, float] = {}  # subject -> epoch seconds
+        self._bloom = self._new_bloom(0)
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}  # id not seen yet -> monotonic time it was skipped
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _new_bloom(entries: int) -> BloomFilter:
+        return BloomFilter(max(settings.REVOCATION_BLOOM_CAPACITY, entries * 2), settings.REVOCATION_BLOOM_ERROR_RATE)
+
+    # --- hot path --------------------------------------------------------
+
+    def is_revoked(self, jti: Optional[str], subject: Optional[str], issued_at: Optional[float]) -> bool:
+        cutoff = self._cutoffs.get(subject)
+        if cutoff is not None and (issued_at is None or issued_at < cutoff):
+            return True
+        return self.is_token_revoked(jti)
+
+    def is_token_revoked(self, jti: Optional[str]) -> bool:
+        """
+        Whether this specific token id was revoked (ignores subject cutoffs).
+        """
+        if jti is None or jti not in self._bloom:
+            return False
+        return jti in self._revoked
+
+    # --- updates ---------------------------------------------------------
+
+    def add(self, jti: Optional[str], subject: str, revoked_before: Optional[datetime], expires_at: datetime) -> None:
+        if jti is not None:
+            self._revoked[jti] = expires_at
+            self._bloom.add(jti)
+            if len(self._revoked) > self._bloom_capacity:
+                self._rebuild_bloom()
+        if revoked_before is not None:
+            cutoff = revoked_before.replace(tzinfo=timezone.utc).timestamp()
+            self._cutoffs[subject] = max(cutoff, self._cutoffs.get(subject, 0.0))
+
+    @property
+    def _bloom_capacity(self) -> int:
+        return int(-self._bloom.size * math.log(2) ** 2 / math.log(settings.REVOCATION_BLOOM_ERROR_RATE))
+
+    def _rebuild_bloom(self) -> None:
+        now = datetime.utcnow()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._bloom = self._new_bloom(len(self._revoked))
+        for jti in self._revoked:
+            self._bloom.add(jti)
+
+    def _apply(self, rows: List) -> None:
+        now = time.monotonic()
+        for row in rows:
+            self.add(row.jti, row.subject, row.revoked_before, row.expires_at)
+            self._gaps.pop(row.id, None)
+            if row.id > self._last_id:
+                for missing in range(max(self._last_id + 1, row.id - MAX_GAPS), row.id):
+                    self._gaps[missing] = now
+                self._last_id = row.id
+        if len(self._gaps) > MAX_GAPS:
+            for missing in sorted(self._gaps)[:-MAX_GAPS]:
+                del self._gaps[missing]
+
+    def _pending_gaps(self) -> List[int]:
+        """
+        Skipped ids still worth looking for; the others are forgotten.
+        """
+        horizon = time.monotonic() - settings.REVOCATION_GAP_SECONDS
+        self._gaps = {missing: skipped for missing, skipped in self._gaps.items() if skipped > horizon}
+        return sorted(self._gaps)
+
+    async def load(self, session) -> None:
+        """
+        Rebuild from every unexpired row in ``token_revocations``.
+        """
+        from ..models.token_revocation import TokenRevocation
+
+        result = await session.execute(
+            select(TokenRevocation).where(TokenRevocation.expires_at > datetime.utcnow()).order_by(TokenRevocation.id)
+        )
+        self._revoked, self._cutoffs, self._last_id, self._gaps = {}, {}, 0, {}
+        rows = result.scalars().all()
+        self._bloom = self._new_bloom(len(rows))
+        self._apply(rows)
+        logger.info("Loaded %d token revocations", len(rows))
+
+    async def sync(self, session) -> None:
+        """
+        Apply rows written since the last load/sync, including other workers',
+        and rows that committed late into a gap.
+        """
+        from ..models.token_revocation import TokenRevocation
+
+        newer = TokenRevocation.id > self._last_id
+        gaps = self._pending_gaps()
+        result = await session.execute(
+            select(TokenRevocation)
+            .where(or_(newer, TokenRevocation.id.in_(gaps)) if gaps else newer)
+            .order_by(TokenRevocation.id)
+        )
+        self._apply(result.scalars().all())
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def start(self, session_factory) -> None:
+        async with session_factory() as session:
+            await self.load(session)
+        if settings.REVOCATION_SYNC_SECONDS > 0:
+            self._task = asyncio.create_task(self._sync_forever(session_factory), name="revocation-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sync_forever(self, session_factory) -> None:
+        ticks = 0
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            ticks += 1
+            try:
+                async with session_factory() as session:
+                    await self.sync(session)
+                if ticks % 720 == 0:
+                    # Drop expired ids now and then so the filter stays sparse.
+                    self._rebuild_bloom()
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+
+revocations = RevocationList()
+
+
+def revoke(db, subject: str, expires_at: datetime, jti: Optional[str] = None,
+           revoked_before: Optional[datetime] = None):
+    """
+    Record a revocation in ``db``'s transaction; this worker applies it as
+    soon as the transaction commits, the others on their next sync.
+    """
+    from ..models.token_revocation import TokenRevocation
+
+    row = TokenRevocation(jti=jti, subject=subject, revoked_before=revoked_before, expires_at=expires_at)
+    db.add(row)
+    db.sync_session.info.setdefault("revocations", []).append(row)
+    return row
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    for row in session.info.pop("revocations", ()):
+        revocations.add(row.jti, row.subject, row.revoked_before, row.expires_at)
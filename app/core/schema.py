@@ -0,0 +1,96 @@
+"""
+Startup schema check.
+
+Migrations are applied once per deploy (``alembic upgrade head``), not by the
+web workers. On boot each worker only compares the database's Alembic
+revision with the head revision shipped in ``migrations/``, which is a single
+``SELECT`` instead of ``create_all``'s catalog queries per table. On
+PostgreSQL the check runs under an advisory lock so workers booting against a
+database that is being migrated wait for the migration to finish instead of
+racing it.
+"""
+import logging
+import os
+import zlib
+from functools import lru_cache
+from typing import FrozenSet
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+from .database import Base
+# Register every table on Base.metadata for create_all.
+from ..models import (  # noqa: F401
+    client, idempotency_key, job, note, outbox_email, payment, project, sync_tombstone, tenant_shard,
+    token_revocation, user,
+)
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic.ini")
+
+# Arbitrary but stable key shared by every worker (and by migrations/env.py).
+SCHEMA_LOCK_KEY = zlib.crc32(b"frexta-backend:schema")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def expected_heads() -> FrozenSet[str]:
+    """
+    Head revision(s) of the migration scripts bundled with this build.
+    """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return frozenset(ScriptDirectory.from_config(config).get_heads())
+
+
+def _current_heads(sync_conn) -> FrozenSet[str]:
+    from alembic.runtime.migration import MigrationContext
+
+    return frozenset(MigrationContext.configure(sync_conn).get_current_heads())
+
+
+async def ensure_schema(engine: AsyncEngine) -> None:
+    """
+    Verify (or, in ``create_all`` mode, create) the schema before serving.
+
+    ``settings.DB_STARTUP`` selects the behaviour:
+
+    * ``check`` (default) - fail fast unless the database is at the Alembic head.
+    * ``create_all`` - legacy ``Base.metadata.create_all`` for throwaway dev databases.
+    * ``off`` - do nothing; the caller manages the schema (tests, one-off scripts).
+    """
+    mode = settings.DB_STARTUP
+    if mode == "off":
+        return
+    if mode not in ("check", "create_all"):
+        raise ValueError(f"Unknown DB_STARTUP mode: {mode!r}")
+
+    async with engine.connect() as conn:
+        locked = conn.dialect.name == "postgresql"
+        if locked:
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            if mode == "create_all":
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.commit()
+                return
+
+            current = await conn.run_sync(_current_heads)
+            expected = expected_heads()
+            if current != expected:
+                raise SchemaOutOfDate(
+                    f"Database schema is at revision {sorted(current) or 'none'}, "
+                    f"expected {sorted(expected)}. Run `alembic upgrade head`."
+                )
+            logger.info("Database schema at revision %s", ", ".join(sorted(current)))
+        finally:
+            if locked:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
@@ -1,10 +1,13 @@
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
+from .revocation import revocations
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -15,25 +18,68 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+def _create_token(data: dict, expires_delta: timedelta, token_type: str):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (
-        expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-    to_encode.update({"exp": expire})
+    to_encode.update({
+        "exp": datetime.utcnow() + expires_delta,
+        # Sub-second iat so a password reset revokes exactly the older tokens.
+        "iat": time.time(),
+        "jti": uuid.uuid4().hex,
+        "typ": token_type,
+    })
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    return _create_token(data, expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES), "access")
+
+def create_refresh_token(data: dict):
+    return _create_token(data, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS), "refresh")
+
+def create_reset_token(data: dict):
+    return _create_token(data, timedelta(minutes=settings.RESET_TOKEN_EXPIRE_MINUTES), "reset")
+
+def decode_token(token: str, token_type: str, check_revoked: bool = True) -> Optional[dict]:
+    """
+    Claims of a valid, unexpired, unrevoked token of ``token_type``, or None.
+    The revocation check is in-memory; see app/core/revocation.py.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("typ") != token_type or not payload.get("sub"):
+        return None
+    if check_revoked and revocations.is_revoked(payload.get("jti"), payload["sub"], payload.get("iat")):
+        return None
+    return payload
+
+def decode_principal(token: str) -> Optional[str]:
+    """
+    Subject of a valid access token, or None.
+    """
+    payload = decode_token(token, "access")
+    return payload["sub"] if payload else None
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    # Admission control may already have verified this request's token.
+    email = getattr(request.state, "principal", None) or decode_principal(token)
+    if email is None:
         raise credentials_exception
+    # Lets get_db pin this user's reads to the primary after a write.
+    request.state.principal = email
     return email
+
+
+async def get_admin_user(principal: str = Depends(get_current_user)):
+    """
+    The principal, if it is listed in ``ADMIN_EMAILS``; 403 otherwise.
+    """
+    admins = {email.strip().lower() for email in (settings.ADMIN_EMAILS or "").split(",") if email.strip()}
+    if principal.lower() not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return principal
@@ -0,0 +1,327 @@
+"""
+Tenant shard directory and moves.
+
+Routing lives in ``ShardMap`` (app/core/database.py); this module writes the
+``tenant_shards`` directory and moves tenants between shards. Adding shards
+to a running deployment::
+
+    DATABASE_URL=<each shard's url> alembic upgrade head
+    python -m app.core.shards init
+
+``init`` records every existing user in the directory (before sharding they
+all live on shard 0) and, on PostgreSQL, starts each shard's id sequences at
+its own block of ``SHARD_ID_SPAN`` ids, so a tenant keeps its ids when it
+moves. SQLite has no sequence to move: it hands out ``max(id) + 1``, so ids
+on SQLite shards overlap, and a move onto a shard that already uses one of
+the tenant's ids is refused. SQLite shards are for local development.
+
+Moving a tenant while the app is serving it::
+
+    python -m app.core.shards move alice@example.com --to 2
+
+1. The directory entry is marked ``moving``. Once every worker's cached
+   entry has expired (``SHARD_DIRECTORY_TTL_SECONDS``, plus ``--grace`` for
+   writes already in flight), the tenant's writes get a 503 with
+   ``Retry-After`` while its reads carry on from the source.
+2. The tenant's rows are copied to the target in one transaction, keeping
+   their ids.
+3. The entry is pointed at the target, and stays ``moving`` until every
+   worker has seen the new shard.
+4. The rows are deleted from the source.
+
+An interrupted move can be run again. A partial copy on the target is
+discarded first, and once the entry points at the target a rerun only
+finishes steps 3 and 4.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import Shard, shard_map
+from ..models.client import Client
+from ..models.idempotency_key import IdempotencyKey
+from ..models.job import Job
+from ..models.note import Note
+from ..models.outbox_email import OutboxEmail
+from ..models.payment import Payment
+from ..models.project import Project
+from ..models.sync_tombstone import SyncTombstone
+from ..models.tenant_shard import TenantShard
+from ..models.token_revocation import TokenRevocation
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Tables with an id sequence; each shard allocates from its own block.
+ID_TABLES = (User, Client, Project, Payment, Note, SyncTombstone, Job, OutboxEmail, IdempotencyKey, TokenRevocation)
+
+
+class ShardMoveError(RuntimeError):
+    pass
+
+
+def _tenant_tables(user_id: int, email: str) -> List[Tuple[type, object]]:
+    """
+    ``(model, criteria)`` for every row of a tenant, parents first.
+    """
+    return [
+        (User, User.id == user_id),
+        (Client, Client.user_id == user_id),
+        (Project, Project.user_id == user_id),
+        (Payment, Payment.user_id == user_id),
+        (Note, Note.user_id == user_id),
+        (SyncTombstone, SyncTombstone.user_id == user_id),
+        (Job, Job.user_id == user_id),
+        (OutboxEmail, OutboxEmail.user_id == user_id),
+        (IdempotencyKey, IdempotencyKey.principal == email),
+    ]
+
+
+# --- directory -----------------------------------------------------------
+
+async def claim_tenant(db: AsyncSession, email: str) -> bool:
+    """
+    Reserve ``email`` in the directory on ``db`` (a directory session) and
+    place the new tenant. False if the email is already registered. Does
+    nothing with a single shard.
+    """
+    if not shard_map.sharded:
+        return True
+    db.add(TenantShard(email=email, shard=shard_map.place(email)))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+async def release_tenant(db: AsyncSession, email: str) -> None:
+    """
+    Undo :func:`claim_tenant` after the user could not be created.
+    """
+    if not shard_map.sharded:
+        return
+    await db.rollback()
+    await db.execute(delete(TenantShard).where(TenantShard.email == email))
+    await db.commit()
+    shard_map.forget(email)
+
+
+async def record_tenant_user(db: AsyncSession, email: str, user_id: int) -> None:
+    if not shard_map.sharded:
+        return
+    await db.execute(update(TenantShard).where(TenantShard.email == email).values(user_id=user_id))
+    await db.commit()
+
+
+async def _entry(email: str) -> Optional[TenantShard]:
+    async with shard_map.directory.SessionLocal() as session:
+        return (await session.execute(select(TenantShard).where(TenantShard.email == email))).scalars().first()
+
+
+async def _set_entry(email: str, **values) -> None:
+    async with shard_map.directory.SessionLocal() as session:
+        await session.execute(update(TenantShard).where(TenantShard.email == email).values(**values))
+        await session.commit()
+    shard_map.forget(email)
+
+
+# --- init ----------------------------------------------------------------
+
+async def _reserve_id_block(shard: Shard) -> None:
+    """
+    Start ``shard``'s id sequences at ``index * SHARD_ID_SPAN``, unless they
+    are already past it. PostgreSQL only; see the module docstring.
+    """
+    floor = shard.index * settings.SHARD_ID_SPAN
+    if floor == 0 or shard.engine.dialect.name != "postgresql":
+        return
+    async with shard.engine.begin() as conn:
+        for model in ID_TABLES:
+            table = model.__tablename__
+            sequence = (await conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table})).scalar()
+            last = (await conn.execute(text(f"SELECT last_value FROM {sequence}"))).scalar()
+            if last < floor:
+                await conn.execute(text("SELECT setval(:s, :v, false)"), {"s": sequence, "v": floor})
+                logger.info("Shard %d: %s ids start at %d", shard.index, table, floor)
+
+
+async def _record_users(shard: Shard) -> int:
+    """
+    Add ``shard``'s users that have no directory entry yet. Returns how many.
+    """
+    recorded, last_id = 0, 0
+    while True:
+        async with shard.SessionLocal() as session:
+            users = (await session.execute(
+                select(User.id, User.email).where(User.id > last_id).order_by(User.id).limit(BATCH_SIZE)
+            )).all()
+        if not users:
+            return recorded
+        last_id = users[-1].id
+        async with shard_map.directory.SessionLocal() as session:
+            known = set((await session.execute(
+                select(TenantShard.email).where(TenantShard.email.in_([u.email for u in users]))
+            )).scalars())
+            missing = [u for u in users if u.email not in known]
+            if missing:
+                await session.execute(insert(TenantShard), [
+                    {"email": u.email, "user_id": u.id, "shard": shard.index, "moving": False} for u in missing
+                ])
+                await session.commit()
+        recorded += len(missing)
+
+
+async def init_shards() -> Dict[str, int]:
+    recorded = 0
+    for shard in shard_map.shards:
+        await _reserve_id_block(shard)
+        recorded += await _record_users(shard)
+    logger.info("Recorded %d tenants in the shard directory", recorded)
+    return {"shards": len(shard_map.shards), "recorded": recorded}
+
+
+# --- moves ---------------------------------------------------------------
+
+async def _user_id(shard: Shard, email: str) -> Optional[int]:
+    async with shard.SessionLocal() as session:
+        return (await session.execute(select(User.id).where(User.email == email))).scalar()
+
+
+async def _delete_tenant(shard: Shard, email: str) -> int:
+    """
+    Delete the tenant ``email`` from ``shard``, children first, one bounded
+    batch per transaction. Returns the number of rows removed.
+    """
+    user_id = await _user_id(shard, email)
+    if user_id is None:
+        return 0
+    removed = 0
+    for model, criteria in reversed(_tenant_tables(user_id, email)):
+        while True:
+            batch = select(model.id).where(criteria).limit(BATCH_SIZE)
+            async with shard.SessionLocal() as session:
+                result = await session.execute(
+                    delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            removed += result.rowcount
+            if result.rowcount < BATCH_SIZE:
+                break
+    return removed
+
+
+async def _copy_tenant(source: Shard, target: Shard, email: str, user_id: int) -> Dict[str, int]:
+    """
+    Copy every row of the tenant from ``source`` to ``target`` in one
+    transaction, keeping ids. Refuses if the target already uses any of them.
+    """
+    copied = {}
+    async with source.SessionLocal() as src, target.SessionLocal() as dst:
+        for model, criteria in _tenant_tables(user_id, email):
+            rows = (await src.execute(select(model.__table__).where(criteria).order_by(model.id))).mappings().all()
+            for start in range(0, len(rows), BATCH_SIZE):
+                chunk = [dict(row) for row in rows[start:start + BATCH_SIZE]]
+                taken = (await dst.execute(
+                    select(model.id).where(model.id.in_([row["id"] for row in chunk])).limit(1)
+                )).scalar()
+                if taken is not None:
+                    raise ShardMoveError(
+                        f"{model.__tablename__} id {taken} is already used on shard {target.index}"
+                    )
+                await dst.execute(insert(model.__table__), chunk)
+            copied[model.__tablename__] = len(rows)
+        await dst.commit()
+    return copied
+
+
+async def _finish_move(email: str, target: int) -> int:
+    """
+    Clear the ``moving`` flag of a tenant already on ``target`` and delete
+    its rows from every other shard.
+    """
+    await asyncio.sleep(settings.SHARD_DIRECTORY_TTL_SECONDS)
+    await _set_entry(email, moving=False)
+    removed = 0
+    for shard in shard_map.shards:
+        if shard.index != target:
+            removed += await _delete_tenant(shard, email)
+    return removed
+
+
+async def move_tenant(email: str, target: int, grace: float = 5.0) -> Dict[str, int]:
+    """
+    Move the tenant ``email`` to shard ``target``; see the module docstring.
+    Returns the number of rows copied per table.
+    """
+    if not 0 <= target < len(shard_map.shards):
+        raise ShardMoveError(f"There is no shard {target}")
+    entry = await _entry(email)
+    if entry is None:
+        raise ShardMoveError(f"{email} is not in the shard directory; run `python -m app.core.shards init`")
+    if entry.shard == target:
+        removed = await _finish_move(email, target)
+        logger.info("%s is on shard %d; removed %d leftover rows", email, target, removed)
+        return {}
+
+    source = shard_map.shards[entry.shard]
+    destination = shard_map.shards[target]
+    user_id = await _user_id(source, email)
+    if user_id is None:
+        raise ShardMoveError(f"{email} has a directory entry for shard {source.index} but no user there")
+
+    await _set_entry(email, moving=True)
+    await asyncio.sleep(settings.SHARD_DIRECTORY_TTL_SECONDS + grace)
+    try:
+        await _delete_tenant(destination, email)  # a partial copy from an earlier attempt
+        copied = await _copy_tenant(source, destination, email, user_id)
+    except Exception:
+        await _set_entry(email, moving=False)
+        raise
+
+    await _set_entry(email, shard=target, user_id=user_id)
+    removed = await _finish_move(email, target)
+    logger.info("Moved %s from shard %d to %d (%d rows)", email, source.index, target, removed)
+    return copied
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the tenant shard directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init", help="Record every user in the directory and reserve id blocks per shard")
+    move = commands.add_parser("move", help="Move a tenant to another shard")
+    move.add_argument("email")
+    move.add_argument("--to", type=int, required=True, dest="target", help="Target shard index")
+    move.add_argument("--grace", type=float, default=5.0,
+                      help="Seconds to wait for in-flight writes after blocking them (default 5)")
+    where = commands.add_parser("where", help="Show the shard holding a tenant")
+    where.add_argument("email")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            if args.command == "init":
+                return await init_shards()
+            if args.command == "move":
+                return await move_tenant(args.email, args.target, args.grace)
+            entry = await _entry(args.email)
+            return None if entry is None else {"shard": entry.shard, "user_id": entry.user_id, "moving": entry.moving}
+        finally:
+            for shard in shard_map.shards:
+                await shard.dispose()
+
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Log of slow SQL statements, with sampled query plans.
+
+When ``SLOW_QUERY_LOG_ENABLED`` is set, every engine of the app gets a pair
+of cursor hooks timing each statement. A statement taking at least
+``SLOW_QUERY_THRESHOLD_MS`` is recorded with the route and principal of the
+request that ran it (see :mod:`app.core.request_context`) and its SQL with
+literals and placeholders folded to ``?``, so repeats of one query share a
+fingerprint. Entries go to the log (the entry is attached to the record as
+``slow_query`` for structured handlers) and to a ring buffer of the last
+``SLOW_QUERY_BUFFER_SIZE``, served by ``GET /api/admin/slow-queries``.
+
+For ``SLOW_QUERY_EXPLAIN_SAMPLE_RATE`` of the entries the plan is captured
+too, at most one at a time, on a connection of its own after the statement
+has returned: ``EXPLAIN (ANALYZE, BUFFERS)`` for reads on PostgreSQL, which
+runs the statement again, and a plain ``EXPLAIN`` for writes and for reads
+that lock rows or call a function with side effects (``FOR UPDATE``,
+advisory locks, ``nextval``...), which must not be repeated. SQLite gives
+``EXPLAIN QUERY PLAN``, taken on the read-only pool: the writer's single
+connection may still be held by the session that ran the statement.
+
+Statements of a connection with the ``slow_query_log=False`` execution option
+are never timed; the plan captures use it.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+from .request_context import current_scope, principal_of, route_of
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"\$\d+|%\([^)]*\)s|%s|(?<![:\w]):\w+")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+# Reads that must not run twice: row locks and functions with side effects.
+_NOT_REPEATABLE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b"
+    r"|\bpg_(?:try_)?advisory_(?:xact_)?lock\w*|\b(?:nextval|setval|pg_notify)\s*\(",
+    re.IGNORECASE,
+)
+
+
+def normalize(statement: str) -> str:
+    """
+    ``statement`` with literals and placeholders as ``?``, ``IN`` lists as
+    ``IN (...)`` and whitespace collapsed.
+    """
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _explain_sql(dialect: str, statement: str) -> Optional[str]:
+    if dialect == "postgresql":
+        # ANALYZE runs the statement, so only plain reads get it.
+        if statement.lstrip()[:6].upper() == "SELECT" and not _NOT_REPEATABLE.search(statement):
+            return f"EXPLAIN (ANALYZE, BUFFERS) {statement}"
+        return f"EXPLAIN {statement}"
+    if dialect == "sqlite":
+        return f"EXPLAIN QUERY PLAN {statement}"
+    return None
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self.entries: deque = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        self._engines: Dict[object, AsyncEngine] = {}  # sync engine -> engine plans are taken on
+        self._explaining = False
+        self._tasks = set()
+
+    def install(self, *engines: Optional[AsyncEngine],
+                plan_engines: Optional[Dict[AsyncEngine, AsyncEngine]] = None) -> None:
+        """
+        Time the statements of ``engines``; a no-op unless
+        ``SLOW_QUERY_LOG_ENABLED``. Plans of an engine's statements are taken
+        on its entry in ``plan_engines`` if any (a SQLite file's read-only
+        engine for its writer), else on the engine itself.
+        """
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            return
+        if self.entries.maxlen != settings.SLOW_QUERY_BUFFER_SIZE:
+            self.entries = deque(self.entries, maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        for async_engine in engines:
+            if async_engine is None or async_engine.sync_engine in self._engines:
+                continue
+            self._engines[async_engine.sync_engine] = (plan_engines or {}).get(async_engine, async_engine)
+            event.listen(async_engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(async_engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self) -> None:
+        for sync_engine in self._engines:
+            event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines.clear()
+
+    def recent(self, limit: int) -> List[dict]:
+        """
+        The last ``limit`` entries, newest first.
+        """
+        entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit]
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    # --- hooks -----------------------------------------------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and conn.get_execution_options().get("slow_query_log", True):
+            context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        scope = current_scope.get()
+        sql = normalize(statement)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 3),
+            "route": route_of(scope),
+            "principal": principal_of(scope),
+            "database": conn.engine.url.render_as_string(hide_password=True),
+            "statement": sql,
+            "fingerprint": hashlib.sha1(sql.encode()).hexdigest()[:16],
+            "rows": cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None,
+            "explain": None,
+        }
+        self.entries.append(entry)
+        logger.warning("Slow query (%.1f ms) in %s: %s", duration_ms, entry["route"] or "background", sql,
+                       extra={"slow_query": entry})
+        if not executemany and not self._explaining and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            self._start_explain(conn, statement, parameters, entry)
+
+    # --- plans -----------------------------------------------------------
+
+    def _start_explain(self, conn, statement: str, parameters, entry: dict) -> None:
+        async_engine = self._engines.get(conn.engine)
+        sql = _explain_sql(conn.dialect.name, statement)
+        if async_engine is None or sql is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._explaining = True
+        task = loop.create_task(self._explain(async_engine, sql, parameters, entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, async_engine: AsyncEngine, sql: str, parameters, entry: dict) -> None:
+        try:
+            async with async_engine.connect() as conn:
+                conn = await conn.execution_options(slow_query_log=False)
+                try:
+                    result = await conn.exec_driver_sql(sql, parameters or ())
+                    rows = result.all()
+                finally:
+                    await conn.rollback()
+        except Exception as exc:
+            logger.warning("Could not explain slow query %s: %s", entry["fingerprint"], exc)
+            return
+        finally:
+            self._explaining = False
+        entry["explain"] = "\n".join(" | ".join(str(value) for value in row) for row in rows)
+        logger.warning("Plan of slow query %s:\n%s", entry["fingerprint"], entry["explain"],
+                       extra={"slow_query": entry})
+
+    async def drain(self) -> None:
+        """
+        Wait for the plans being captured.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+slow_query_log = SlowQueryLog()
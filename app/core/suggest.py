@@ -0,0 +1,293 @@
+"""
+In-memory client typeahead.
+
+``GET /api/clients/suggest?q=`` is answered from a per-tenant index over
+client names, emails and phone numbers, without touching the database:
+
+* sorted lists of ``(key, client id)`` pairs answer prefix matches with a
+  binary search: one of names, ranked first, and one of tokens (the words of
+  the name, the email and its local part and domain, and the phone's digits).
+  Keys are case- and accent-folded;
+* a trigram index over names, email local parts and phone digits answers
+  substring matches ("smith" in "jsmith@acme.io") for queries of three
+  characters or more, once prefix matches run short. It is built on the
+  first such lookup.
+
+A tenant's index is built on its first query (two queries against a read
+session) and kept in a per-worker LRU of ``CLIENT_SUGGEST_TENANTS`` tenants.
+The client routes apply their own writes to it once committed. Writes served
+by other workers reach it when it is rebuilt, at most
+``CLIENT_SUGGEST_MAX_AGE_SECONDS`` after it was built.
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, select
+
+from .config import settings
+from .database import read_session
+from ..models.client import Client
+from ..models.user import User
+
+Entry = Tuple[int, str, str, Optional[str]]  # id, name, email, phone
+
+_USER_ID = select(User.id).where(User.email == bindparam("email"))
+_ENTRIES = select(Client.id, Client.name, Client.email, Client.phone).where(
+    Client.user_id == bindparam("user_id"), Client.deleted_at.is_(None)
+)
+
+_WORD = re.compile(r"[^\W_]+")
+_NOT_DIGIT = re.compile(r"\D+")
+
+
+def fold(text: str) -> str:
+    """
+    Lower-case ``text`` and strip its accents, so "Zoë" matches "zoe".
+    """
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _keys(name: str, email: str, phone: Optional[str]) -> Tuple[str, Set[str], str]:
+    """
+    The folded name, the prefix tokens and the substring haystack of a client.
+    """
+    name, email, phone = fold(name).strip(), fold(email).strip(), fold(phone or "")
+    local, _, domain = email.partition("@")
+    digits = _NOT_DIGIT.sub("", phone)
+    tokens = {name, email, local, domain, digits, *_WORD.findall(name), *_WORD.findall(local)}
+    tokens.discard("")
+    return name, tokens, "\n".join((name, local, digits))
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TenantIndex:
+    """
+    One tenant's clients. Not thread-safe; used from the event loop only.
+    """
+
+    def __init__(self, entries: Iterable[Entry] = ()):
+        self.built_at = time.monotonic()
+        self.clients: Dict[int, Entry] = {}
+        self._tokens: Dict[int, Set[str]] = {}
+        self._haystacks: Dict[int, str] = {}
+        self._folded: Dict[int, str] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._prefixes: List[Tuple[str, int]] = []
+        # Built on the first substring lookup; most tenants never need it.
+        self._trigrams: Optional[Dict[str, Set[int]]] = None
+        pairs = []
+        for entry in entries:
+            pairs.extend(self._add(entry))
+        self._names = sorted((name, i) for i, name in self._folded.items())
+        self._prefixes = sorted(pairs)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def _add(self, entry: Entry) -> List[Tuple[str, int]]:
+        client_id, name, email, phone = entry
+        folded, tokens, haystack = _keys(name, email, phone)
+        self.clients[client_id] = entry
+        self._folded[client_id] = folded
+        self._tokens[client_id] = tokens
+        self._haystacks[client_id] = haystack
+        if self._trigrams is not None:
+            for trigram in _trigrams(haystack):
+                self._trigrams[trigram].add(client_id)
+        return [(token, client_id) for token in tokens]
+
+    def upsert(self, entry: Entry) -> None:
+        self.remove(entry[0])
+        for pair in self._add(entry):
+            insort(self._prefixes, pair)
+        insort(self._names, (self._folded[entry[0]], entry[0]))
+
+    def remove(self, client_id: int) -> None:
+        if self.clients.pop(client_id, None) is None:
+            return
+        for token in self._tokens.pop(client_id):
+            del self._prefixes[bisect_left(self._prefixes, (token, client_id))]
+        del self._names[bisect_left(self._names, (self._folded.pop(client_id), client_id))]
+        haystack = self._haystacks.pop(client_id)
+        if self._trigrams is not None:
+            for trigram in _trigrams(haystack):
+                ids = self._trigrams[trigram]
+                ids.discard(client_id)
+                if not ids:
+                    del self._trigrams[trigram]
+
+    def _trigram_index(self) -> Dict[str, Set[int]]:
+        if self._trigrams is None:
+            self._trigrams = defaultdict(set)
+            for client_id, haystack in self._haystacks.items():
+                for trigram in _trigrams(haystack):
+                    self._trigrams[trigram].add(client_id)
+        return self._trigrams
+
+    # --- lookups ---------------------------------------------------------
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """
+        Ids of up to ``limit`` clients matching ``query``: first those whose
+        name starts with it, then those where every word of the query starts
+        a token (in token order), then, for queries of three or more
+        characters, those containing it. Ties go by name.
+        """
+        folded = " ".join(fold(query).split())
+        if not folded:
+            return []
+        alternatives = [folded.split()]
+        digits = _NOT_DIGIT.sub("", folded)
+        if len(digits) >= 3 and digits != folded:
+            alternatives.append([digits])  # "555-0199" and "(555) 0199" find the same phone
+
+        found: Dict[int, None] = {}
+        self._prefix_matches(self._names, [folded], limit, found)
+        for words in alternatives:
+            self._prefix_matches(self._prefixes, words, limit, found)
+        if len(found) < limit:
+            for needle in (folded, digits):
+                if len(needle) >= 3 and len(found) < limit:
+                    self._substring_matches(needle, limit, found)
+        return list(found)
+
+    def _prefix_matches(self, keys: List[Tuple[str, int]], words: List[str], limit: int,
+                        found: Dict[int, None]) -> None:
+        # Scan the most selective (longest) word; check the others per hit.
+        words = sorted(words, key=len, reverse=True)
+        lead, rest = words[0], words[1:]
+        position = bisect_left(keys, (lead,))
+        while len(found) < limit and position < len(keys):
+            key, client_id = keys[position]
+            if not key.startswith(lead):
+                return
+            position += 1
+            if client_id in found:
+                continue
+            tokens = self._tokens[client_id]
+            if all(any(t.startswith(word) for t in tokens) for word in rest):
+                found[client_id] = None
+
+    def _substring_matches(self, needle: str, limit: int, found: Dict[int, None]) -> None:
+        # Walk the rarest trigram's clients; the first ``limit`` that contain
+        # the needle are returned, by name.
+        trigrams = self._trigram_index()
+        postings = [trigrams.get(t, ()) for t in _trigrams(needle)]
+        if not postings:
+            return
+        matches = []
+        for client_id in min(postings, key=len):
+            if client_id not in found and needle in self._haystacks[client_id]:
+                matches.append((self._folded[client_id], client_id))
+                if len(found) + len(matches) == limit:
+                    break
+        for _, client_id in sorted(matches):
+            found[client_id] = None
+
+
+class ClientSuggestions:
+    """
+    Per-worker LRU of :class:`TenantIndex`, keyed by principal (the token's
+    subject), so a warm lookup needs neither the user row nor the clients.
+    """
+
+    def __init__(self):
+        self._indexes: "OrderedDict[str, TenantIndex]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Tenants written to while their index was loading; that index may
+        # have missed the write, so it is used once and not kept.
+        self._stale: Set[str] = set()
+
+    def clear(self) -> None:
+        self._indexes.clear()
+
+    async def suggest(self, principal: str, query: str, limit: int) -> Optional[List[Entry]]:
+        """
+        Up to ``limit`` clients of ``principal`` matching ``query``, or None
+        if the user does not exist.
+        """
+        index = self._cached(principal)
+        if index is None:
+            index = await self._load(principal)
+            if index is None:
+                return None
+        return [index.clients[i] for i in index.search(query, limit)]
+
+    def _cached(self, principal: str) -> Optional[TenantIndex]:
+        index = self._indexes.get(principal)
+        if index is None:
+            return None
+        if time.monotonic() - index.built_at > settings.CLIENT_SUGGEST_MAX_AGE_SECONDS:
+            del self._indexes[principal]
+            return None
+        self._indexes.move_to_end(principal)
+        return index
+
+    async def _load(self, principal: str) -> Optional[TenantIndex]:
+        # Concurrent first queries for a tenant share one load.
+        pending = self._loading.get(principal)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[principal] = future
+        try:
+            index = await self._build(principal)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved here; waiters re-raise it
+            raise
+        finally:
+            del self._loading[principal]
+        if index is not None and principal not in self._stale:
+            self._indexes[principal] = index
+            while len(self._indexes) > settings.CLIENT_SUGGEST_TENANTS:
+                self._indexes.popitem(last=False)
+        self._stale.discard(principal)
+        future.set_result(index)
+        return index
+
+    async def _build(self, principal: str) -> Optional[TenantIndex]:
+        async with read_session(principal) as db:
+            user_id = (await db.execute(_USER_ID, {"email": principal})).scalar()
+            if user_id is None:
+                return None
+            rows = (await db.execute(_ENTRIES, {"user_id": user_id})).all()
+        return TenantIndex(tuple(row) for row in rows)
+
+    # --- write paths -----------------------------------------------------
+
+    def upsert(self, principal: str, client) -> None:
+        """
+        Apply a committed create or update of ``client``.
+        """
+        self._written(principal)
+        index = self._indexes.get(principal)
+        if index is not None:
+            index.upsert((client.id, client.name, client.email, client.phone))
+
+    def remove(self, principal: str, client_id: int) -> None:
+        """
+        Apply a committed delete.
+        """
+        self._written(principal)
+        index = self._indexes.get(principal)
+        if index is not None:
+            index.remove(client_id)
+
+    def _written(self, principal: str) -> None:
+        if principal in self._loading:
+            self._stale.add(principal)
+
+
+client_suggestions = ClientSuggestions()
@@ -0,0 +1,44 @@
+"""
+Change tracking for ``GET /sync``.
+
+Every write to a user's clients, projects, payments or notes takes the next
+number from a per-user counter (``users.sync_seq``) and stamps it on the row
+(or, for deletes, on a ``sync_tombstones`` row). A sync cursor is simply the
+highest number the client has seen, and the delta is every row stamped
+above it, found through the ``(<owner>, sync_seq)`` indexes.
+
+The counter is bumped with an ``UPDATE`` that holds the user's row lock until
+the transaction ends, so a user's writes commit in sequence order: once the
+counter reads N, every change numbered N or lower is visible. Timestamps
+cannot promise that, because a transaction may commit after one that
+started later.
+"""
+from sqlalchemy import update
+
+from ..models.sync_tombstone import SyncTombstone
+from ..models.user import User
+
+
+async def next_sync_seq(db, user_id: int) -> int:
+    """
+    Reserve the next sequence number for ``user_id``'s data in ``db``'s
+    transaction.
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        # Keep updated_at: this is bookkeeping, not a change to the user.
+        .values(sync_seq=User.sync_seq + 1, updated_at=User.updated_at)
+        .returning(User.sync_seq)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one()
+
+
+def tombstone(db, user_id: int, entity: str, entity_id: int, seq: int) -> SyncTombstone:
+    """
+    Record in ``db``'s transaction that an ``entity`` row was deleted.
+    """
+    row = SyncTombstone(user_id=user_id, entity=entity, entity_id=entity_id, sync_seq=seq)
+    db.add(row)
+    return row
@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+import json
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from app.api.authy import router as auth_router
@@ -10,14 +13,36 @@ from app.api.projects import router as projects_router
 from app.api.payments import router as payments_router
 from app.api.notes import router as notes_router
 from app.api.dashboard import router as dashboard_router
+from app.api.reports import router as reports_router
+from app.api.jobs import router as jobs_router
+from app.api.emails import router as emails_router
+from app.api.live import router as live_router
+from app.api.sync import router as sync_router
+from app.api.admin import router as admin_router
+
+from app.core import purge  # noqa: F401  (registers the purge job handlers)
+from app.core.admission import rate_limit
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine, read_engines, shard_map
+from app.core.jobs import job_runner
+from app.core.live import live_hub
+from app.core.outbox import outbox
+from app.core.partitions import partition_maintainer
+from app.core.request_context import RequestContextMiddleware
+from app.core.revocation import revocations
+from app.core.schema import ensure_schema
+from app.core.slow_queries import slow_query_log
 
-from app.core.database import Base, engine
+OPENAPI_URL = "/api/openapi.json"
 
+# The OpenAPI routes are registered below so the rendered schema can be cached.
 app = FastAPI(
     title="ClientConnect",
     version="1.0.0",
     description="API for managing clients, projects, payments, and notes",
-    openapi_url="/api/openapi.json"
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 
 # CORS settings
@@ -28,7 +53,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Idempotent-Replayed"],
 )
+# Makes the current request's route and user visible to engine hooks
+app.add_middleware(RequestContextMiddleware)
 # Serve static frontend files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -38,18 +66,67 @@ async def serve_frontend():
     return FileResponse("static/index.html")
 
 
-#  Async-compatible table creation
+# Verify the schema revision; migrations run once per deploy, not per worker
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-# Routers
-app.include_router(auth_router, prefix="/api", tags=["auth"])
-app.include_router(users_router, prefix="/api", tags=["users"])
-app.include_router(clients_router, prefix="/api", tags=["clients"])
-app.include_router(projects_router, prefix="/api", tags=["projects"])
-app.include_router(payments_router, prefix="/api", tags=["payments"])
-app.include_router(notes_router, prefix="/api", tags=["notes"])
-app.include_router(dashboard_router, prefix="/api", tags=["dashboard"])
+    for shard in shard_map.shards:
+        await ensure_schema(shard.engine)
+    slow_query_log.install(*(shard.engine for shard in shard_map.shards),
+                           *(shard.read_engine for shard in shard_map.shards), *read_engines,
+                           plan_engines={shard.engine: shard.read_engine for shard in shard_map.shards
+                                         if shard.read_engine is not None})
+    await revocations.start(AsyncSessionLocal)
+    await job_runner.start(settings.JOBS_WORKERS)
+    await outbox.start()
+    # NOTIFY is relayed through the primary alone, whichever shard was written.
+    await live_hub.start(engine)
+    await partition_maintainer.start(*(shard.engine for shard in shard_map.shards))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await partition_maintainer.stop()
+    await live_hub.stop()
+    await outbox.stop()
+    await job_runner.stop()
+    await revocations.stop()
+    slow_query_log.uninstall()
+
+
+# OpenAPI schema, generated on first request and served as pre-rendered bytes
+_openapi_body = None
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi_json():
+    global _openapi_body
+    if _openapi_body is None:
+        _openapi_body = json.dumps(app.openapi(), separators=(",", ":")).encode()
+    return Response(_openapi_body, media_type="application/json")
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_docs():
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI")
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_docs():
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
+
+# Routers, each with the rate-limit group from settings.RATE_LIMITS
+auth_limit = [Depends(rate_limit("auth"))]
+default_limit = [Depends(rate_limit("default"))]
+heavy_limit = [Depends(rate_limit("heavy"))]
+
+app.include_router(auth_router, prefix="/api", tags=["auth"], dependencies=auth_limit)
+app.include_router(users_router, prefix="/api", tags=["users"], dependencies=default_limit)
+app.include_router(clients_router, prefix="/api", tags=["clients"], dependencies=default_limit)
+app.include_router(projects_router, prefix="/api", tags=["projects"], dependencies=default_limit)
+app.include_router(payments_router, prefix="/api", tags=["payments"], dependencies=default_limit)
+app.include_router(notes_router, prefix="/api", tags=["notes"], dependencies=default_limit)
+app.include_router(dashboard_router, prefix="/api", tags=["dashboard"], dependencies=heavy_limit)
+app.include_router(reports_router, prefix="/api", tags=["reports"], dependencies=heavy_limit)
+app.include_router(jobs_router, prefix="/api", tags=["jobs"], dependencies=default_limit)
+app.include_router(emails_router, prefix="/api", tags=["emails"], dependencies=default_limit)
+app.include_router(sync_router, prefix="/api", tags=["sync"], dependencies=default_limit)
+app.include_router(admin_router, prefix="/api", tags=["admin"], dependencies=default_limit)
+# Long-lived streams are capped per user by LIVE_MAX_STREAMS_PER_USER instead
+app.include_router(live_router, prefix="/api", tags=["dashboard"])
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
@@ -9,6 +9,16 @@ from ..core.database import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        Index("ix_clients_user_id_sync_seq", "user_id", "sync_seq"),
+        # The few soft-deleted rows awaiting purge; see app/api/queries.py
+        Index(
+            "ix_clients_user_id_deleted",
+            "user_id",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(nullable=False)
@@ -18,8 +28,12 @@ class Client(Base):
 
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Sequence number of the last change, for GET /sync; see app/core/sync.py
+    sync_seq: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Set on delete; the row and its children are purged in the background
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="client")
-    notes: Mapped[List["Note"]] = relationship(back_populates="client")
-    projects: Mapped[List["Project"]] = relationship(back_populates="client")
+    notes: Mapped[List["Note"]] = relationship(back_populates="client", passive_deletes=True)
+    projects: Mapped[List["Project"]] = relationship(back_populates="client", passive_deletes=True)
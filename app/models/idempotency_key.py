@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import JSON, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    The stored response of a create request sent with an ``Idempotency-Key``
+    header, replayed for retries with the same key until ``expires_at``.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("principal", "key", name="uq_idempotency_keys_principal_key"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # Keys are scoped to the authenticated user (the token subject).
+    principal: Mapped[str] = mapped_column(String, nullable=False)
+    key: Mapped[str] = mapped_column(String, nullable=False)
+    # Hash of method, path and body, so a key cannot be reused for another request.
+    request_hash: Mapped[str] = mapped_column(String, nullable=False)
+    status_code: Mapped[int] = mapped_column(nullable=False)
+    response: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import Enum as SqlEnum
+from ..core.database import Base
+import enum
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The runner's claim query: due queued jobs and expired leases.
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(nullable=False)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    status: Mapped[JobStatus] = mapped_column(SqlEnum(JobStatus), default=JobStatus.QUEUED)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
+
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=5)
+    progress: Mapped[float] = mapped_column(default=0.0)
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(nullable=True)
+
+    run_after: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Lease: refreshed on every progress update; a RUNNING job whose lease
+    # expired belonged to a worker that died and may be claimed again.
+    locked_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
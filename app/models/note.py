@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
@@ -9,15 +9,21 @@ from ..core.database import Base
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (Index("ix_notes_user_id_sync_seq", "user_id", "sync_seq"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     content: Mapped[str] = mapped_column(nullable=False)
 
-    project_id: Mapped[Optional[int]] = mapped_column(ForeignKey("projects.id"), nullable=True)
-    client_id: Mapped[Optional[int]] = mapped_column(ForeignKey("clients.id"), nullable=True)
+    project_id: Mapped[Optional[int]] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"), nullable=True, index=True)
+    client_id: Mapped[Optional[int]] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"), nullable=True, index=True)
+    # Denormalised owner (the user of the client this row belongs to), so
+    # tenant-scoped queries filter one table; set on insert by the API.
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
 
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Sequence number of the last change, for GET /sync; see app/core/sync.py
+    sync_seq: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # Relationships
     project: Mapped[Optional["Project"]] = relationship(back_populates="notes")
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import Enum as SqlEnum
+from ..core.database import Base
+import enum
+
+
+class EmailStatus(str, enum.Enum):
+    PENDING = "Pending"
+    SENDING = "Sending"
+    SENT = "Sent"
+    FAILED = "Failed"
+
+
+class OutboxEmail(Base):
+    """
+    An email written in the transaction that caused it and delivered
+    afterwards by the outbox dispatcher (app/core/outbox.py).
+    """
+    __tablename__ = "outbox_emails"
+    __table_args__ = (
+        # The dispatcher's claim query: due pending emails and expired leases.
+        Index("ix_outbox_emails_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
+    recipient: Mapped[str] = mapped_column(String, nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+
+    status: Mapped[EmailStatus] = mapped_column(SqlEnum(EmailStatus), default=EmailStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(default=0)
+    max_attempts: Mapped[int] = mapped_column(default=8)
+    last_error: Mapped[Optional[str]] = mapped_column(nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Lease: a SENDING email whose lease expired belonged to a dispatcher
+    # that died mid-batch and may be claimed (and sent) again.
+    locked_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    claim_token: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
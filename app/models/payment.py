@@ -1,22 +1,35 @@
 from datetime import datetime, date
 from typing import Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
 
 
 class Payment(Base):
+    # On PostgreSQL the table is partitioned by month of date_paid, with
+    # (id, date_paid) as its primary key; see app/core/partitions.py. ids
+    # still come from one sequence, so the mapper keys rows on id alone.
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_user_id_sync_seq", "user_id", "sync_seq"),
+        # A tenant's payments by date, for the revenue report
+        Index("ix_payments_user_id_date_paid", "user_id", "date_paid"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     amount: Mapped[float] = mapped_column(nullable=False)
-    date_paid: Mapped[date] = mapped_column(nullable=False)
-    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"))
+    date_paid: Mapped[date] = mapped_column(nullable=False, index=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"), index=True)
+    # Denormalised owner (the user of the client this row belongs to), so
+    # tenant-scoped queries filter one table; set on insert by the API.
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     notes: Mapped[Optional[str]] = mapped_column(nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Sequence number of the last change, for GET /sync; see app/core/sync.py
+    sync_seq: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # Relationships
     project: Mapped["Project"] = relationship(back_populates="payments")
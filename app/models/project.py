@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import Enum as SqlEnum
 from ..core.database import Base
@@ -16,16 +16,63 @@ class ProjectStatus(str, enum.Enum):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_user_id_sync_seq", "user_id", "sync_seq"),
+        # The few soft-deleted rows awaiting purge; see app/api/queries.py
+        Index(
+            "ix_projects_user_id_deleted",
+            "user_id",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+        # GET /projects/board: each status column, newest first
+        Index(
+            "ix_projects_board",
+            "user_id",
+            "status",
+            "updated_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        # Candidates for cold storage; see app/core/archive.py
+        Index(
+            "ix_projects_archivable",
+            "updated_at",
+            postgresql_where=text("status = 'COMPLETED' AND archived_at IS NULL AND deleted_at IS NULL"),
+            sqlite_where=text("status = 'COMPLETED' AND archived_at IS NULL AND deleted_at IS NULL"),
+        ),
+        # Archived projects whose rows lists and GET /sync read from files
+        Index(
+            "ix_projects_user_id_archived",
+            "user_id",
+            "archived_sync_seq",
+            postgresql_where=text("archived_at IS NOT NULL"),
+            sqlite_where=text("archived_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(nullable=False)
     description: Mapped[str] = mapped_column(nullable=False)
     status: Mapped[ProjectStatus] = mapped_column(SqlEnum(ProjectStatus), default=ProjectStatus.PENDING)
-    client_id: Mapped[int] = mapped_column(ForeignKey("clients.id"))
+    client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"), index=True)
+    # Denormalised owner (the user of the client this row belongs to), so
+    # tenant-scoped queries filter one table; set on insert by the API.
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Sequence number of the last change, for GET /sync; see app/core/sync.py
+    sync_seq: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Set on delete; the row and its children are purged in the background
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Set once its payments and notes have moved to cold storage
+    archived_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Highest sync_seq among the archived rows, so GET /sync reads only the
+    # archives a client has not seen
+    archived_sync_seq: Mapped[Optional[int]] = mapped_column(nullable=True)
 
     # Relationships
     client: Mapped["Client"] = relationship(back_populates="projects")
-    payments: Mapped[List["Payment"]] = relationship(back_populates="project")
-    notes: Mapped[List["Note"]] = relationship(back_populates="project")
+    payments: Mapped[List["Payment"]] = relationship(back_populates="project", passive_deletes=True)
+    notes: Mapped[List["Note"]] = relationship(back_populates="project", passive_deletes=True)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, false
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+
+class TenantShard(Base):
+    """
+    Shard directory entry: which shard database holds the tenant ``email``
+    (the token subject). Only the directory database (shard 0) uses this
+    table; see ``ShardMap`` in app/core/database.py.
+    """
+    __tablename__ = "tenant_shards"
+
+    email: Mapped[str] = mapped_column(String, primary_key=True)
+    # Unset until the user row exists on its shard.
+    user_id: Mapped[Optional[int]] = mapped_column(nullable=True, index=True)
+    shard: Mapped[int] = mapped_column(nullable=False)
+    # Set while app/core/shards.py copies the tenant; its writes get a 503.
+    moving: Mapped[bool] = mapped_column(default=False, server_default=false(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+
+class TokenRevocation(Base):
+    """
+    A revoked token (``jti`` set) or, for password resets, a cutoff revoking
+    every token of ``subject`` issued before ``revoked_before``.
+    """
+    __tablename__ = "token_revocations"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    jti: Mapped[Optional[str]] = mapped_column(String, unique=True, nullable=True)
+    subject: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    revoked_before: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Once this passes, every token the row applies to has expired anyway.
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
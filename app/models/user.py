@@ -13,6 +13,8 @@ class User(Base):
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Last sync sequence number handed out for this user's data; see app/core/sync.py
+    sync_seq: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # One-to-one relationship with Client
     client: Mapped[Optional["Client"]] = relationship(back_populates="user", uselist=False)
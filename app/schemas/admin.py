@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class SlowQuery(BaseModel):
+    at: str
+    duration_ms: float
+    route: Optional[str] = None
+    principal: Optional[str] = None
+    database: str
+    statement: str
+    fingerprint: str
+    rows: Optional[int] = None
+    explain: Optional[str] = None
+    """
+    A statement that took at least SLOW_QUERY_THRESHOLD_MS:
+    - route: "METHOD /path/{template}" of the request that ran it, None for
+      background work
+    - principal: the authenticated user, if any
+    - statement: the SQL with literals and parameters as ?; repeats of one
+      query share its fingerprint
+    - rows: rows affected, where the driver reports it
+    - explain: the query plan, for the sampled share of entries once captured
+    """
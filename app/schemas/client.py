@@ -10,6 +10,12 @@ class ClientBase(BaseModel):
 class ClientCreate(ClientBase):
     pass
 
+class ClientSuggestion(BaseModel):
+    id: int
+    name: str
+    email: str
+    phone: Optional[str] = None
+
 class Client(ClientBase):
     id: int
     user_id: int
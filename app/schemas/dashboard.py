@@ -74,6 +74,7 @@ class KpiValue(BaseModel):
     change: str
 
 class KpiData(BaseModel):
+    period: str
     activeClients: KpiValue
     projectsInProgress: KpiValue
     revenueThisMonth: KpiValue
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from enum import Enum
+
+class EmailStatus(str, Enum):
+    PENDING = "Pending"
+    SENDING = "Sending"
+    SENT = "Sent"
+    FAILED = "Failed"
+
+class EmailDelivery(BaseModel):
+    id: int
+    kind: str
+    recipient: str
+    subject: str
+    status: EmailStatus
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    next_attempt_at: datetime
+    sent_at: Optional[datetime] = None
+    """
+    Delivery status of an email sent to the user (without its body, which
+    may hold a reset link).
+    """
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+from enum import Enum
+
+class JobStatus(str, Enum):
+    QUEUED = "Queued"
+    RUNNING = "Running"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    progress: float
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    """
+    Schema for reporting a background job's status and progress.
+    """
+
+    class Config:
+        from_attributes = True
+
+class JobAccepted(BaseModel):
+    msg: str
+    job_id: int
+    """
+    Response for endpoints that hand their work to a background job (HTTP 202).
+    """
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class ProjectStatus(str, Enum):
@@ -53,6 +53,7 @@ class Project(ProjectBase):
     client_id: int
     created_at: datetime
     updated_at: datetime
+    archived_at: Optional[datetime] = None
     """
     Schema for returning a project from the API.
     Includes:
@@ -61,6 +62,7 @@ class Project(ProjectBase):
     - client_id
     - created_at
     - updated_at
+    - archived_at (set once its payments and notes are in cold storage)
     """
 
     class Config:
@@ -68,3 +70,18 @@ class Project(ProjectBase):
         """
         Enable compatibility with SQLAlchemy ORM objects.
         """
+
+class BoardColumn(BaseModel):
+    status: ProjectStatus
+    total: int
+    projects: List[Project]
+    next_cursor: Optional[str] = None
+    """
+    One status column of the project board:
+    - total: projects with this status
+    - projects: the newest by updated_at, up to the requested limit
+    - next_cursor: loads the rest of the column; None once it is exhausted
+    """
+
+class ProjectBoard(BaseModel):
+    columns: List[BoardColumn]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Literal, Optional
+
+Bucket = Literal["day", "week", "month"]
+GroupBy = Literal["client", "project"]
+
+class RevenueSeries(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    total: float
+    revenue: List[float]
+    running_total: List[float]
+    moving_average: List[float]
+    """
+    Revenue of one client or project (or of everything, when the report is
+    not grouped), one value per bucket of the report:
+    - revenue: payments received in the bucket, 0 if none
+    - running_total: revenue up to and including the bucket
+    - moving_average: mean revenue of the bucket and the window before it
+    """
+
+class RevenueReport(BaseModel):
+    bucket: Bucket
+    group_by: Optional[GroupBy] = None
+    window: int
+    buckets: List[date]
+    series: List[RevenueSeries]
+    """
+    Revenue time series. ``buckets`` holds the first day of each bucket;
+    every series has one value per bucket, in the same order. Series are
+    sorted by total, largest first.
+    """
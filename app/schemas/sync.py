@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import List
+
+from .client import Client
+from .note import Note
+from .payment import Payment
+from .project import Project
+
+class SyncDeletion(BaseModel):
+    type: str
+    id: int
+    """
+    A deleted row: ``type`` is client, project, payment or note. Deleting a
+    client or project also deletes everything under it.
+    """
+
+class SyncChanges(BaseModel):
+    cursor: int
+    clients: List[Client]
+    projects: List[Project]
+    payments: List[Payment]
+    notes: List[Note]
+    deleted: List[SyncDeletion]
+    """
+    Rows created or updated, and rows deleted, since the requested cursor.
+    Pass ``cursor`` as ``since`` on the next sync.
+    """
@@ -19,4 +19,7 @@ class User(UserBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
@@ -0,0 +1,11 @@
+"""
+Constants shared by the seeding tool and the load driver.
+
+Kept free of app imports so the load driver can run from any machine
+without the server's configuration.
+"""
+DEFAULT_PASSWORD = "bench-password"
+
+
+def bench_email(n: int) -> str:
+    return f"bench-user-{n}@example.com"
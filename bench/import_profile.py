@@ -0,0 +1,60 @@
+"""
+Import-time profile of the app.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+summarises the slowest modules, so regressions in worker cold-start time are
+visible before they ship:
+
+    python -m bench.import_profile --top 25
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def profile(module: str) -> List[Tuple[str, int, int]]:
+    """
+    Return ``(module, self_us, cumulative_us)`` for every import made by ``module``.
+    """
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    env.setdefault("SECRET_KEY", "import-profile")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Profile import time of the app.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rows = profile(args.module)
+    total = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    print(f"import {args.module}: {total / 1000:.1f} ms total, {len(rows)} modules\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    print(f"\n{'self ms':>9}  module (top by self time)")
+    for name, self_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Async load driver that replays a mix of the app's real routes.
+
+Each virtual user logs in as one of the tenants created by ``bench.seed`` and
+then issues weighted random requests (dashboard, list views, detail views and
+CRUD) until the run ends. Latencies are reported per route template:
+
+    python -m bench.load --base-url http://localhost:8000 \
+        --concurrency 64 --duration 60 --out results.json
+
+Pass ``--compare baseline.json`` to print the change against a previous run.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.common import DEFAULT_PASSWORD, bench_email
+
+
+class Stats:
+    """
+    Per-route latency samples and error counts.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "rps": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "rps": total / elapsed if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    rank = (len(sorted_samples) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (rank - low)
+
+
+class VirtualUser:
+    """
+    One logged-in tenant replaying the route mix.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, email: str, password: str, rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.client_ids: List[int] = []
+        self.project_ids: List[int] = []
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - started, ok=False)
+            return None
+        self.stats.record(route, time.perf_counter() - started, ok=response.status_code < 400)
+        return response
+
+    async def login(self) -> bool:
+        response = await self.call("POST /api/login", "POST", "/api/login",
+                                   data={"username": self.email, "password": self.password})
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def warm_up(self) -> None:
+        response = await self.call("GET /api/clients", "GET", "/api/clients")
+        if response is not None and response.status_code == 200:
+            self.client_ids = [c["id"] for c in response.json()]
+        response = await self.call("GET /api/projects", "GET", "/api/projects")
+        if response is not None and response.status_code == 200:
+            self.project_ids = [p["id"] for p in response.json()]
+
+    # --- route mix -------------------------------------------------------
+
+    async def dashboard(self):
+        await self.call("GET /api/dashboard/kpis", "GET", "/api/dashboard/kpis")
+        await self.call("GET /api/dashboard/activities", "GET", "/api/dashboard/activities")
+
+    async def list_clients(self):
+        await self.call("GET /api/clients", "GET", "/api/clients")
+
+    async def list_projects(self):
+        await self.call("GET /api/projects", "GET", "/api/projects")
+
+    async def list_payments(self):
+        await self.call("GET /api/payments", "GET", "/api/payments")
+
+    async def list_notes(self):
+        await self.call("GET /api/notes", "GET", "/api/notes")
+
+    async def client_detail(self):
+        if not self.client_ids:
+            return
+        client_id = self.rng.choice(self.client_ids)
+        await self.call("GET /api/clients/{id}", "GET", f"/api/clients/{client_id}")
+        await self.call("GET /api/clients/{client_id}/projects", "GET", f"/api/clients/{client_id}/projects")
+        await self.call("GET /api/clients/{client_id}/notes", "GET", f"/api/clients/{client_id}/notes")
+
+    async def project_detail(self):
+        if not self.project_ids:
+            return
+        project_id = self.rng.choice(self.project_ids)
+        await self.call("GET /api/projects/{id}", "GET", f"/api/projects/{project_id}")
+        await self.call("GET /api/projects/{project_id}/payments", "GET", f"/api/projects/{project_id}/payments")
+        await self.call("GET /api/projects/{project_id}/notes", "GET", f"/api/projects/{project_id}/notes")
+
+    async def crud_cycle(self):
+        response = await self.call("POST /api/clients", "POST", "/api/clients",
+                                   json={"name": "Load Test", "email": "load@example.com", "phone": None})
+        if response is None or response.status_code != 200:
+            return
+        client_id = response.json()["id"]
+        await self.call("PUT /api/clients/{id}", "PUT", f"/api/clients/{client_id}",
+                        json={"name": "Load Test (edited)", "email": "load@example.com", "phone": "555"})
+        response = await self.call("POST /api/projects", "POST", "/api/projects",
+                                   json={"name": "Load project", "description": "bench", "client_id": client_id})
+        if response is not None and response.status_code == 200:
+            project_id = response.json()["id"]
+            response = await self.call("POST /api/payments", "POST", "/api/payments",
+                                       json={"amount": 10.0, "date_paid": date.today().isoformat(),
+                                             "project_id": project_id})
+            if response is not None and response.status_code == 200:
+                payment_id = response.json()["id"]
+                await self.call("DELETE /api/payments/{id}", "DELETE", f"/api/payments/{payment_id}")
+            response = await self.call("POST /api/notes", "POST", "/api/notes",
+                                       json={"content": "bench", "project_id": project_id})
+            if response is not None and response.status_code == 200:
+                note_id = response.json()["id"]
+                await self.call("DELETE /api/notes/{id}", "DELETE", f"/api/notes/{note_id}")
+            await self.call("DELETE /api/projects/{id}", "DELETE", f"/api/projects/{project_id}")
+        await self.call("DELETE /api/clients/{id}", "DELETE", f"/api/clients/{client_id}")
+
+    async def relogin(self):
+        await self.login()
+
+    def scenarios(self):
+        # (weight, scenario) - roughly the shape of real dashboard traffic.
+        return [
+            (20, self.dashboard),
+            (15, self.list_clients),
+            (10, self.list_projects),
+            (8, self.list_payments),
+            (8, self.list_notes),
+            (20, self.client_detail),
+            (12, self.project_detail),
+            (5, self.crud_cycle),
+            (2, self.relogin),
+        ]
+
+    async def run(self, deadline: float) -> None:
+        if not await self.login():
+            return
+        await self.warm_up()
+        weights, scenarios = zip(*self.scenarios())
+        while time.perf_counter() < deadline:
+            await self.rng.choices(scenarios, weights=weights)[0]()
+
+
+async def run_load(base_url: str, concurrency: int, duration: float, users: int, first_user: int,
+                   password: str, seed_value: int) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        vusers = [
+            VirtualUser(client, stats, bench_email(first_user + i % users), password, random.Random(seed_value + i))
+            for i in range(concurrency)
+        ]
+        await asyncio.gather(*(v.run(deadline) for v in vusers))
+        elapsed = time.perf_counter() - started
+    return stats.summary(elapsed)
+
+
+def print_report(summary: dict, baseline: Optional[dict] = None) -> None:
+    header = f"{'route':<42} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header)
+    print("-" * len(header))
+    for route, r in summary["routes"].items():
+        line = (f"{route:<42} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+        if baseline:
+            before = baseline["routes"].get(route)
+            line += f" {_delta(before['p95_ms'], r['p95_ms']) if before else 'new':>8}"
+        print(line)
+    print("-" * len(header))
+    total = f"total: {summary['requests']} requests, {summary['errors']} errors, {summary['rps']:.1f} req/s"
+    if baseline:
+        total += f" ({_delta(baseline['rps'], summary['rps'])} throughput)"
+    print(total)
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a mix of API routes at a fixed concurrency.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--users", type=int, default=1_000, help="number of seeded bench users to spread load over")
+    parser.add_argument("--first-user", type=int, default=1, help="id of the first seeded bench user")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON summary to this file")
+    parser.add_argument("--compare", help="JSON summary of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args.base_url, args.concurrency, args.duration, args.users,
+                                   args.first_user, args.password, args.seed))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print_report(summary, baseline)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(summary, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
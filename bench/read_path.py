@@ -0,0 +1,114 @@
+"""
+Rows/sec and peak memory of list serialization: ORM instances vs column rows.
+
+Seeds one tenant with ``--rows`` payments in a throwaway SQLite file, then
+serves its ``GET /payments`` list both ways:
+
+* ``orm`` - ``select(Payment)`` hydrated into ORM instances, validated into
+  the response schema through ``from_attributes`` and dumped to JSON, as
+  FastAPI does for a ``response_model``;
+* ``rows`` - the column select and orjson encoding in ``app.api.rows``.
+
+    python -m bench.read_path --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import List
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="read-path-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_DB_PATH}")
+os.environ.setdefault("SECRET_KEY", "read-path")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+from app.api import queries  # noqa: E402
+from app.api.rows import rows_response  # noqa: E402
+from app.core import schema  # noqa: E402,F401  (registers every model)
+from app.core.database import Base  # noqa: E402
+from app.models.client import Client  # noqa: E402
+from app.models.payment import Payment  # noqa: E402
+from app.models.project import Project, ProjectStatus  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.payment import Payment as PaymentSchema  # noqa: E402
+
+PAYMENTS = TypeAdapter(List[PaymentSchema])
+
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "hashed_password": "x"}])
+        await conn.execute(insert(Client), [{"id": 1, "user_id": 1, "name": "client", "email": "c@example.com"}])
+        await conn.execute(insert(Project), [
+            {"id": i, "client_id": 1, "user_id": 1, "name": f"project {i}", "description": "",
+             "status": ProjectStatus.ACTIVE} for i in range(1, 101)
+        ])
+        now, today = datetime.utcnow(), date.today()
+        for start in range(0, rows, 10_000):
+            await conn.execute(insert(Payment), [
+                {"id": i + 1, "amount": 100.0 + i % 500, "date_paid": today - timedelta(days=i % 730),
+                 "project_id": i % 100 + 1, "user_id": 1, "notes": None, "created_at": now, "updated_at": now}
+                for i in range(start, min(start + 10_000, rows))
+            ])
+
+
+async def serve_orm(session: AsyncSession) -> bytes:
+    result = await session.execute(queries.PAYMENTS, {"user_id": 1})
+    return PAYMENTS.dump_json(PAYMENTS.validate_python(result.scalars().all(), from_attributes=True))
+
+
+async def serve_rows(session: AsyncSession) -> bytes:
+    return rows_response(await session.execute(queries.PAYMENT_ROWS, {"user_id": 1})).body
+
+
+async def measure(engine, serve, repeat: int):
+    """
+    Best wall time of ``repeat`` runs, and the peak traced memory of one.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            body = await serve(session)
+            best = min(best, time.perf_counter() - started)
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        await serve(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak, len(body)
+
+
+async def main_async(rows: int, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{_DB_PATH}")
+    await seed(engine, rows)
+    print(f"GET /payments for a tenant with {rows:,} payments, best of {repeat}\n")
+    print(f"{'variant':<8} {'seconds':>8} {'rows/s':>11} {'peak MiB':>9} {'body MiB':>9}")
+    results = {}
+    for name, serve in (("orm", serve_orm), ("rows", serve_rows)):
+        seconds, peak, size = await measure(engine, serve, repeat)
+        results[name] = (seconds, peak)
+        print(f"{name:<8} {seconds:>8.3f} {rows / seconds:>11,.0f} {peak / 2**20:>9.1f} {size / 2**20:>9.1f}")
+    await engine.dispose()
+
+    (orm_s, orm_peak), (rows_s, rows_peak) = results["orm"], results["rows"]
+    print(f"\nrows: {orm_s / rows_s:.1f}x throughput, {rows_peak / orm_peak:.0%} of the ORM peak memory")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare ORM and column-row list serialization.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-request Python CPU spent preparing SQL statements.
+
+Compares the statement sequence of ``GET /notes`` (user lookup, notes) built
+inline on every call against the prebuilt statements in ``app.api.queries``. Two numbers are reported per variant:
+
+* ``prepare`` - building the statements and deriving their cache keys, which
+  is what SQLAlchemy does before it can reuse a compiled statement;
+* ``execute`` - the full round trip against an in-memory SQLite database.
+
+    python -m bench.statement_cpu --iterations 5000
+"""
+import argparse
+import os
+import time
+from typing import Callable, List, Tuple
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "statement-cpu")
+
+from sqlalchemy import create_engine, or_, select  # noqa: E402
+
+from app.api import queries  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.core import schema  # noqa: E402,F401  (registers every model)
+from app.models.client import Client  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.models.project import Project, ProjectStatus  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+EMAIL = "bench@example.com"
+
+
+def inline_statements(user_id: int) -> List[Tuple]:
+    deleted_clients = select(Client.id).where(Client.user_id == user_id, Client.deleted_at.is_not(None))
+    deleted_projects = select(Project.id).where(Project.user_id == user_id, Project.deleted_at.is_not(None))
+    return [
+        (select(User).where(User.email == EMAIL), None),
+        (select(Note).where(
+            Note.user_id == user_id,
+            or_(Note.client_id.is_(None), Note.client_id.not_in(deleted_clients)),
+            or_(Note.project_id.is_(None), Note.project_id.not_in(deleted_projects)),
+        ), None),
+    ]
+
+
+def prebuilt_statements(user_id: int) -> List[Tuple]:
+    return [
+        (queries.USER_BY_EMAIL, {"email": EMAIL}),
+        (queries.NOTES, {"user_id": user_id}),
+    ]
+
+
+def seed(engine) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": EMAIL, "hashed_password": "x"}])
+        conn.execute(Client.__table__.insert(), [
+            {"id": i, "user_id": 1, "name": f"client {i}", "email": f"c{i}@example.com"} for i in range(1, 11)
+        ])
+        conn.execute(Project.__table__.insert(), [
+            {"id": i, "client_id": (i % 10) + 1, "user_id": 1, "name": f"project {i}", "description": "",
+             "status": ProjectStatus.ACTIVE} for i in range(1, 41)
+        ])
+        conn.execute(Note.__table__.insert(), [
+            {"id": i, "project_id": i, "user_id": 1, "content": f"note {i}"} for i in range(1, 41)
+        ])
+
+
+def timed(fn: Callable[[], None], iterations: int) -> float:
+    """Return microseconds per call."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Measure statement preparation CPU per request.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    engine = create_engine("sqlite://")
+    seed(engine)
+
+    def prepare(build):
+        def run():
+            for statement, _ in build(1):
+                statement._generate_cache_key()
+        return run
+
+    def execute(build):
+        def run():
+            with engine.connect() as conn:
+                for statement, params in build(1):
+                    conn.execute(statement, params).all()
+        return run
+
+    print(f"GET /notes statement sequence, {args.iterations} iterations\n")
+    print(f"{'variant':<10} {'prepare us':>11} {'execute us':>11}")
+    results = {}
+    for name, build in (("inline", inline_statements), ("prebuilt", prebuilt_statements)):
+        results[name] = (timed(prepare(build), args.iterations), timed(execute(build), args.iterations))
+        print(f"{name:<10} {results[name][0]:>11.1f} {results[name][1]:>11.1f}")
+
+    saved = results["inline"][1] - results["prebuilt"][1]
+    print(f"\nprebuilt saves {saved:.1f} us of CPU per request ({saved / results['inline'][1]:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Latency of the in-memory client typeahead (app/core/suggest.py).
+
+Builds one tenant's index over ``--clients`` synthetic clients and times
+lookups for a mix of short prefixes, multi-word, phone and substring
+queries, plus the cost of building the index and applying a write.
+
+    python -m bench.suggest --clients 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "suggest")
+
+from app.core.suggest import TenantIndex  # noqa: E402
+
+FIRST = ["Ada", "Alan", "Grace", "Linus", "Zoë", "Jonas", "Maria", "Kenji", "Amara", "Olu", "Søren", "Priya"]
+LAST = ["Lovelace", "Turing", "Hopper", "Torvalds", "Smith", "Acker", "García", "Sato", "Okafor", "Kierkegaard"]
+QUERIES = ["a", "gr", "smi", "ada lov", "garcia", "555-01", "orvald", "client7", "zz", "kenji sato", "example"]
+
+
+def entries(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        yield (i, f"{first} {last} {i}", f"{first.lower()}.{i}@client{i % 97}.example.com",
+               f"555-{rng.randrange(10_000):04d}" if i % 3 else None)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Time client typeahead lookups.")
+    parser.add_argument("--clients", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index = TenantIndex(entries(args.clients))
+    print(f"built an index of {len(index):,} clients in {time.perf_counter() - started:.2f}s\n")
+
+    print(f"{'query':<12} {'matches':>7} {'p50 us':>8} {'p99 us':>8}")
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            found = index.search(query, args.limit)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{query:<12} {len(found):>7} {statistics.median(samples) * 1e6:>8.0f} {p99 * 1e6:>8.0f}")
+
+    started = time.perf_counter()
+    for i in range(1, args.repeat + 1):
+        index.upsert((i, f"Renamed {i}", f"renamed{i}@example.com", None))
+    print(f"\nupsert: {(time.perf_counter() - started) / args.repeat * 1e6:.0f} us each")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 //Dashboard.jsx
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import API from '../utils/api';
@@ -40,6 +40,21 @@ const formatTimeAgo = (dateString) => {
     return date.toLocaleDateString();
 };
 
+// Whether an ISO date falls in the current month/week/quarter.
+const inCurrentPeriod = (isoDate, period = 'month') => {
+    const [year, month, day] = isoDate.split('-').map(Number);
+    const now = new Date();
+    if (period === 'week') {
+        const start = new Date(now.getFullYear(), now.getMonth(), now.getDate() - ((now.getDay() + 6) % 7));
+        const date = new Date(year, month - 1, day);
+        return date >= start && date < new Date(start.getFullYear(), start.getMonth(), start.getDate() + 7);
+    }
+    if (period === 'quarter') {
+        return year === now.getFullYear() && Math.floor((month - 1) / 3) === Math.floor(now.getMonth() / 3);
+    }
+    return year === now.getFullYear() && month === now.getMonth() + 1;
+};
+
 const Dashboard = () => {
   const { user } = useAuth();
   const [kpis, setKpis] = useState(null);
@@ -48,26 +63,70 @@ const Dashboard = () => {
   const [error, setError] = useState(null);
   const [isSidebarExpanded, setIsSidebarExpanded] = useState(true);
 
+  const fetchDashboardData = useCallback(async () => {
+    try {
+      setLoading(true);
+      const [kpiRes, activityRes] = await Promise.all([
+        API.get('/api/dashboard/kpis'),
+        API.get('/api/dashboard/activities')
+      ]);
+      setKpis(kpiRes.data);
+      setActivities(activityRes.data);
+      setError(null);
+    } catch (err) {
+      console.error("Failed to fetch dashboard data:", err);
+      setError("Could not load dashboard data.");
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  useEffect(() => {
+    fetchDashboardData();
+  }, [fetchDashboardData]);
+
+  // Live updates: the server pushes KPI deltas and new activities, so the
+  // aggregates are only queried on load and on "resync".
   useEffect(() => {
-    const fetchDashboardData = async () => {
-      try {
-        setLoading(true);
-        const [kpiRes, activityRes] = await Promise.all([
-          API.get('/api/dashboard/kpis'),
-          API.get('/api/dashboard/activities')
-        ]);
-        setKpis(kpiRes.data);
-        setActivities(activityRes.data);
-        setError(null);
-      } catch (err) {
-        console.error("Failed to fetch dashboard data:", err);
-        setError("Could not load dashboard data.");
-      } finally {
-        setLoading(false);
+    let source = null;
+    let closed = false;
+
+    const applyEvent = (event) => {
+      if (event.type === 'resync') {
+        fetchDashboardData();
+      } else if (event.type === 'kpi') {
+        setKpis((current) => {
+          if (!current?.[event.kpi] || (event.date && !inCurrentPeriod(event.date, current.period))) return current;
+          return { ...current, [event.kpi]: { ...current[event.kpi], value: current[event.kpi].value + event.delta } };
+        });
+      } else if (event.type === 'activity') {
+        setActivities((current) => [event, ...current].slice(0, 5));
       }
     };
-    fetchDashboardData();
-  }, []);
+
+    const connect = async () => {
+      // Any authenticated call refreshes an expired access token first.
+      await API.get('/api/users/me').catch(() => null);
+      const token = JSON.parse(localStorage.getItem('user'))?.access_token;
+      if (closed || !token) return;
+      source = new EventSource(`${process.env.REACT_APP_API_URL || ''}/api/dashboard/stream?token=${encodeURIComponent(token)}`);
+      source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        if (event.type === 'expired') {
+          source.close();
+          connect();
+        } else {
+          applyEvent(event);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      source?.close();
+    };
+  }, [fetchDashboardData]);
 
   const kpiItems = [
     { title: "Active Clients", data: kpis?.activeClients, link: "/clients", icon: <Users size={24} className="text-blue-400"/> },
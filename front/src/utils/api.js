@@ -12,4 +12,31 @@ API.interceptors.request.use((req) => {
   return req;
 });
 
-export default API;
\ No newline at end of file
+// Access tokens are short-lived: on a 401, exchange the refresh token for a
+// new pair once and replay the request. Concurrent 401s share one refresh.
+let refreshing = null;
+
+API.interceptors.response.use(
+  (res) => res,
+  async (error) => {
+    const original = error.config;
+    const user = JSON.parse(localStorage.getItem('user'));
+    if (error.response?.status !== 401 || original._retried || !user?.refresh_token || original.url === '/api/refresh') {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      refreshing = refreshing || API.post('/api/refresh', { refresh_token: user.refresh_token });
+      const res = await refreshing;
+      localStorage.setItem('user', JSON.stringify({ ...user, ...res.data }));
+    } catch (refreshError) {
+      localStorage.removeItem('user');
+      return Promise.reject(refreshError);
+    } finally {
+      refreshing = null;
+    }
+    return API(original);
+  }
+);
+
+export default API;
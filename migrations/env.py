@@ -1,8 +1,12 @@
+import asyncio
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import pool, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from alembic import context
-from app.core.database import Base, engine
-from app.models import user, client, project, payment, note
+from app.core.config import settings
+from app.core.database import Base
+from app.core.schema import SCHEMA_LOCK_KEY
+from app.models import user, client, project, payment, note, job, token_revocation, sync_tombstone, idempotency_key, tenant_shard, outbox_email
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -10,9 +14,8 @@ fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 def run_migrations_offline():
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=settings.DATABASE_URL,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -20,17 +23,38 @@ def run_migrations_offline():
     with context.begin_transaction():
         context.run_migrations()
 
-def run_migrations_online():
-    connectable = engine
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata
-        )
-        with context.begin_transaction():
-            context.run_migrations()
+def do_run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_migrations_online():
+    # Async like the app, run on the sync facade, but without the app
+    # engine's connect hooks: with SQLite's foreign_keys=ON, the table copies
+    # of batch_alter_table fail while rows still reference the old table.
+    # The advisory lock makes booting workers wait in app.core.schema until
+    # we are done.
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    try:
+        async with engine.connect() as connection:
+            locked = connection.dialect.name == "postgresql"
+            if locked:
+                await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+            try:
+                await connection.run_sync(do_run_migrations)
+                await connection.commit()
+            finally:
+                if locked:
+                    await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    finally:
+        # Also on failure: aiosqlite's connection thread would keep the
+        # process (and `alembic upgrade head && uvicorn ...`) from exiting.
+        await engine.dispose()
 
 if context.is_offline_mode():
     run_migrations_offline()
 else:
-    run_migrations_online()
\ No newline at end of file
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,88 @@
+"""soft delete and cascading foreign keys
+
+Revision ID: a3c5e7f91b20
+Revises: 1e9ecdaa77e6
+Create Date: 2025-07-14 10:02:11.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f91b20'
+down_revision: Union[str, None] = '1e9ecdaa77e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table) for every child -> parent foreign key
+CHILD_FKS = [
+    ('projects', 'client_id', 'clients'),
+    ('payments', 'project_id', 'projects'),
+    ('notes', 'project_id', 'projects'),
+    ('notes', 'client_id', 'clients'),
+]
+
+
+def _recreate_fks(ondelete: Union[str, None]) -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        _recreate_sqlite_fks(ondelete)
+        return
+    # Dropping and re-adding NOT VALID only touches the catalog, so that
+    # transaction holds its locks briefly. The validation scans run
+    # afterwards, each committed on its own, under a lock that lets reads and
+    # writes through.
+    action = f' ON DELETE {ondelete}' if ondelete else ''
+    for table, column, parent in CHILD_FKS:
+        name = f'{table}_{column}_fkey'
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}')
+        op.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) '
+            f'REFERENCES {parent} (id){action} NOT VALID'
+        )
+    with op.get_context().autocommit_block():
+        for table, column, _ in CHILD_FKS:
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_fkey')
+
+
+def _recreate_sqlite_fks(ondelete: Union[str, None]) -> None:
+    # SQLite cannot alter constraints in place, so each table is copied with
+    # its new foreign keys. The app turns foreign_keys on for its own
+    # connections, making the cascades real; migrations run with it off
+    # (migrations/env.py), as the copy is dropped and renamed while other
+    # rows still reference the table. The initial migration left the keys
+    # unnamed; the naming convention gives them the names used here.
+    naming_convention = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+    for table in dict.fromkeys(table for table, _, _ in CHILD_FKS):
+        with op.batch_alter_table(table, naming_convention=naming_convention) as batch_op:
+            for _, column, parent in (fk for fk in CHILD_FKS if fk[0] == table):
+                name = f'{table}_{column}_fkey'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, parent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    op.add_column('clients', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.add_column('projects', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    # Foreign-key indexes: cascades and batched purges look children up by parent id.
+    with op.get_context().autocommit_block():
+        for table, column, _ in CHILD_FKS:
+            op.create_index(
+                op.f(f'ix_{table}_{column}'), table, [column], unique=False,
+                postgresql_concurrently=True,
+            )
+
+    _recreate_fks('CASCADE')
+
+
+def downgrade() -> None:
+    _recreate_fks(None)
+
+    for table, column, _ in reversed(CHILD_FKS):
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
+
+    op.drop_column('projects', 'deleted_at')
+    op.drop_column('clients', 'deleted_at')
@@ -0,0 +1,137 @@
+"""denormalize user_id onto projects, payments and notes
+
+Revision ID: a8c2e6f4b9d1
+Revises: f1b7d3e9a5c2
+Create Date: 2025-07-29 09:41:27.503816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e6f4b9d1'
+down_revision: Union[str, None] = 'f1b7d3e9a5c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows updated per backfill statement; each batch commits on its own so no
+# long transaction holds row locks or bloats the WAL.
+BATCH_SIZE = 10_000
+
+# (table, expression for the owning user_id), in dependency order: payments
+# read projects.user_id, so projects are filled first.
+OWNERS = [
+    ('projects', '(SELECT clients.user_id FROM clients WHERE clients.id = projects.client_id)'),
+    ('payments', '(SELECT projects.user_id FROM projects WHERE projects.id = payments.project_id)'),
+    ('notes', 'COALESCE('
+              '(SELECT clients.user_id FROM clients WHERE clients.id = notes.client_id), '
+              '(SELECT projects.user_id FROM projects WHERE projects.id = notes.project_id))'),
+]
+
+# (table, owner column) pairs of the GET /sync indexes replaced by (user_id, sync_seq)
+OLD_SYNC_INDEXES = [
+    ('projects', 'client_id'),
+    ('payments', 'project_id'),
+    ('notes', 'client_id'),
+    ('notes', 'project_id'),
+]
+
+# Partial indexes over the soft-deleted rows still awaiting purge
+DELETED_INDEXES = ['clients', 'projects']
+
+
+def _backfill(table: str, owner: str) -> None:
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text(f'SELECT MIN(id), MAX(id) FROM {table}')).one()
+    if low is None:
+        return
+    update = sa.text(
+        f'UPDATE {table} SET user_id = {owner} '
+        f'WHERE id >= :low AND id < :high AND user_id IS NULL'
+    )
+    for start in range(low, high + 1, BATCH_SIZE):
+        bind.execute(update, {'low': start, 'high': start + BATCH_SIZE})
+    # Catch rows inserted by the previous release while the batches ran.
+    bind.execute(sa.text(f'UPDATE {table} SET user_id = {owner} WHERE user_id IS NULL'))
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # Nullable first: adding the column is then a catalog-only change.
+    for table, _ in OWNERS:
+        op.add_column(table, sa.Column('user_id', sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for table, owner in OWNERS:
+            _backfill(table, owner)
+
+    # Deleting a client now stamps its projects too; do the same for clients
+    # already waiting for their purge job. Committed on its own, so its row
+    # locks are not held through the constraint changes below.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'UPDATE projects SET deleted_at = '
+            '(SELECT clients.deleted_at FROM clients WHERE clients.id = projects.client_id) '
+            'WHERE projects.deleted_at IS NULL AND projects.client_id IN '
+            '(SELECT clients.id FROM clients WHERE clients.deleted_at IS NOT NULL)'
+        )
+
+    if is_postgres:
+        # In autocommit mode every statement is its own transaction. Adding a
+        # constraint NOT VALID only touches the catalog, so its strong lock
+        # (ACCESS EXCLUSIVE on the table for the check, SHARE ROW EXCLUSIVE
+        # on users for the foreign key) is released at once. VALIDATE then
+        # scans the table under SHARE UPDATE EXCLUSIVE, which lets reads and
+        # writes through. SET NOT NULL runs only after the check's VALIDATE
+        # has committed, so it reuses the check instead of scanning again.
+        with op.get_context().autocommit_block():
+            for table, _ in OWNERS:
+                op.execute(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fkey FOREIGN KEY (user_id) '
+                    f'REFERENCES users (id) NOT VALID'
+                )
+                op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_user_id_fkey')
+                op.execute(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_not_null '
+                    f'CHECK (user_id IS NOT NULL) NOT VALID'
+                )
+                op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_user_id_not_null')
+                op.execute(f'ALTER TABLE {table} ALTER COLUMN user_id SET NOT NULL')
+                op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {table}_user_id_not_null')
+    else:
+        for table, _ in OWNERS:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+                batch_op.create_foreign_key(f'{table}_user_id_fkey', 'users', ['user_id'], ['id'])
+
+    with op.get_context().autocommit_block():
+        for table, _ in OWNERS:
+            op.create_index(
+                f'ix_{table}_user_id_sync_seq', table, ['user_id', 'sync_seq'], unique=False,
+                postgresql_concurrently=True,
+            )
+        for table in DELETED_INDEXES:
+            op.create_index(
+                f'ix_{table}_user_id_deleted', table, ['user_id'], unique=False,
+                postgresql_where=sa.text('deleted_at IS NOT NULL'),
+                sqlite_where=sa.text('deleted_at IS NOT NULL'),
+                postgresql_concurrently=True,
+            )
+        for table, owner in OLD_SYNC_INDEXES:
+            op.drop_index(f'ix_{table}_{owner}_sync_seq', table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    for table, owner in OLD_SYNC_INDEXES:
+        op.create_index(f'ix_{table}_{owner}_sync_seq', table, [owner, 'sync_seq'], unique=False)
+    for table in DELETED_INDEXES:
+        op.drop_index(f'ix_{table}_user_id_deleted', table_name=table)
+    for table, _ in reversed(OWNERS):
+        op.drop_index(f'ix_{table}_user_id_sync_seq', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'{table}_user_id_fkey', type_='foreignkey')
+            batch_op.drop_column('user_id')
@@ -0,0 +1,28 @@
+"""index payments user_id date_paid
+
+Revision ID: a9e3c7f1d5b8
+Revises: f4c8a2e6b1d9
+Create Date: 2025-08-13 09:27:51.640318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e3c7f1d5b8'
+down_revision: Union[str, None] = 'f4c8a2e6b1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Not CONCURRENTLY: PostgreSQL cannot build a partitioned table's index
+    # that way, so this takes a SHARE lock on payments while it builds.
+    op.create_index('ix_payments_user_id_date_paid', 'payments', ['user_id', 'date_paid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_user_id_date_paid', table_name='payments')
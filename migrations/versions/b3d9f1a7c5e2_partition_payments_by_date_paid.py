@@ -0,0 +1,110 @@
+"""partition payments by date_paid
+
+Revision ID: b3d9f1a7c5e2
+Revises: a8c2e6f4b9d1
+Create Date: 2025-08-01 11:26:40.917352
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9f1a7c5e2'
+down_revision: Union[str, None] = 'a8c2e6f4b9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, amount, date_paid, project_id, user_id, notes, created_at, updated_at, sync_seq'
+
+COLUMN_DDL = """
+    id INTEGER NOT NULL DEFAULT nextval('payments_id_seq'::regclass),
+    amount FLOAT NOT NULL,
+    date_paid DATE NOT NULL,
+    project_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    notes VARCHAR,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    sync_seq INTEGER NOT NULL DEFAULT 0
+"""
+
+# (name, columns) of the secondary indexes, rebuilt on the new table
+INDEXES = [
+    ('ix_payments_id', ['id']),
+    ('ix_payments_project_id', ['project_id']),
+    ('ix_payments_date_paid', ['date_paid']),
+    ('ix_payments_user_id_sync_seq', ['user_id', 'sync_seq']),
+]
+
+# Months of partitions created past the current one; workers keep this many
+# in place afterwards (PAYMENTS_PARTITION_MONTHS_AHEAD).
+MONTHS_AHEAD = 3
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _swap_out(old_name: str) -> None:
+    # Free the names the new table's primary key and indexes will use.
+    op.execute(f'ALTER TABLE payments RENAME TO {old_name}')
+    op.execute(f'ALTER INDEX payments_pkey RENAME TO {old_name}_pkey')
+    for name, _ in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def _finish(old_name: str) -> None:
+    op.execute(f'INSERT INTO payments ({COLUMNS}) SELECT {COLUMNS} FROM {old_name}')
+    op.execute('ALTER SEQUENCE payments_id_seq OWNED BY payments.id')
+    op.execute(f'DROP TABLE {old_name}')
+    # Built after the copy, which is much faster than maintaining them row by row.
+    for name, columns in INDEXES:
+        op.create_index(name, 'payments', columns, unique=False)
+    op.execute(
+        'ALTER TABLE payments ADD CONSTRAINT payments_project_id_fkey FOREIGN KEY (project_id) '
+        'REFERENCES projects (id) ON DELETE CASCADE'
+    )
+    op.execute('ALTER TABLE payments ADD CONSTRAINT payments_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)')
+
+
+def upgrade() -> None:
+    # PostgreSQL only. Elsewhere payments stays a plain table with its
+    # date_paid index, and app/core/partitions.py does nothing.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # The swap runs in the migration's transaction: readers see either the
+    # old table or the fully copied partitioned one.
+    _swap_out('payments_unpartitioned')
+    # The partition key must be part of the primary key; ids still come from
+    # the one sequence and stay unique.
+    op.execute(f'CREATE TABLE payments ({COLUMN_DDL}, PRIMARY KEY (id, date_paid)) PARTITION BY RANGE (date_paid)')
+    op.execute('CREATE TABLE payments_default PARTITION OF payments DEFAULT')
+
+    today = date.today()
+    first = op.get_bind().execute(sa.text('SELECT MIN(date_paid) FROM payments_unpartitioned')).scalar() or today
+    lower, last = first.replace(day=1), _add_months(today, MONTHS_AHEAD)
+    while lower <= last:
+        upper = _add_months(lower, 1)
+        op.execute(
+            f"CREATE TABLE payments_y{lower.year:04d}m{lower.month:02d} PARTITION OF payments "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        lower = upper
+
+    _finish('payments_unpartitioned')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _swap_out('payments_partitioned')
+    op.execute(f'CREATE TABLE payments ({COLUMN_DDL}, PRIMARY KEY (id))')
+    # Dropping the partitioned table drops every partition with it.
+    _finish('payments_partitioned')
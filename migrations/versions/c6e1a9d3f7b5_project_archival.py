@@ -0,0 +1,36 @@
+"""project archival
+
+Revision ID: c6e1a9d3f7b5
+Revises: b3d9f1a7c5e2
+Create Date: 2025-08-05 16:12:08.630915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e1a9d3f7b5'
+down_revision: Union[str, None] = 'b3d9f1a7c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVABLE = "status = 'COMPLETED' AND archived_at IS NULL AND deleted_at IS NULL"
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_projects_archivable', 'projects', ['updated_at'], unique=False,
+            postgresql_where=sa.text(ARCHIVABLE),
+            sqlite_where=sa.text(ARCHIVABLE),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_archivable', table_name='projects')
+    op.drop_column('projects', 'archived_at')
@@ -0,0 +1,41 @@
+"""archived sync seq
+
+Revision ID: d2a8f4c6e0b3
+Revises: a9e3c7f1d5b8
+Create Date: 2025-08-20 11:04:39.218467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f4c6e0b3'
+down_revision: Union[str, None] = 'a9e3c7f1d5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('archived_sync_seq', sa.Integer(), nullable=True))
+    # The highest sync_seq of the rows already archived is in their files;
+    # the owner's current counter is a safe upper bound.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'UPDATE projects SET archived_sync_seq = '
+            '(SELECT users.sync_seq FROM users WHERE users.id = projects.user_id) '
+            'WHERE archived_at IS NOT NULL'
+        )
+        op.create_index(
+            'ix_projects_user_id_archived', 'projects', ['user_id', 'archived_sync_seq'], unique=False,
+            postgresql_where=sa.text('archived_at IS NOT NULL'),
+            sqlite_where=sa.text('archived_at IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_user_id_archived', table_name='projects')
+    op.drop_column('projects', 'archived_sync_seq')
@@ -0,0 +1,26 @@
+"""index payments date_paid
+
+Revision ID: d2f6b8a4c7e1
+Revises: c4e8a2d6b1f3
+Create Date: 2025-07-21 10:42:37.509216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8a4c7e1'
+down_revision: Union[str, None] = 'c4e8a2d6b1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_payments_date_paid'), 'payments', ['date_paid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payments_date_paid'), table_name='payments')
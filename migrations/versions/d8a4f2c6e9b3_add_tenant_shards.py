@@ -0,0 +1,37 @@
+"""add tenant shard directory
+
+Revision ID: d8a4f2c6e9b3
+Revises: c6e1a9d3f7b5
+Create Date: 2025-08-08 11:27:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4f2c6e9b3'
+down_revision: Union[str, None] = 'c6e1a9d3f7b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Created on every shard (they share one migration history) but only
+    # used on shard 0. Filled by `python -m app.core.shards init`.
+    op.create_table('tenant_shards',
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('moving', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_index(op.f('ix_tenant_shards_user_id'), 'tenant_shards', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tenant_shards_user_id'), table_name='tenant_shards')
+    op.drop_table('tenant_shards')
@@ -0,0 +1,51 @@
+"""add outbox emails
+
+Revision ID: e2b7c5a9d4f1
+Revises: d8a4f2c6e9b3
+Create Date: 2025-08-11 14:05:19.402736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c5a9d4f1'
+down_revision: Union[str, None] = 'd8a4f2c6e9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_emails',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('recipient', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'SENDING', 'SENT', 'FAILED', name='emailstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('claim_token', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_emails_id'), 'outbox_emails', ['id'], unique=False)
+    op.create_index(op.f('ix_outbox_emails_user_id'), 'outbox_emails', ['user_id'], unique=False)
+    op.create_index('ix_outbox_emails_status_next_attempt_at', 'outbox_emails', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_emails_status_next_attempt_at', table_name='outbox_emails')
+    op.drop_index(op.f('ix_outbox_emails_user_id'), table_name='outbox_emails')
+    op.drop_index(op.f('ix_outbox_emails_id'), table_name='outbox_emails')
+    op.drop_table('outbox_emails')
+    sa.Enum(name='emailstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,59 @@
+"""sync sequences and tombstones
+
+Revision ID: e5a9c3d7f2b4
+Revises: d2f6b8a4c7e1
+Create Date: 2025-07-23 14:08:51.274630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c3d7f2b4'
+down_revision: Union[str, None] = 'd2f6b8a4c7e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, owner column) pairs indexed for GET /sync
+SYNCED = [
+    ('clients', 'user_id'),
+    ('projects', 'client_id'),
+    ('payments', 'project_id'),
+    ('notes', 'client_id'),
+    ('notes', 'project_id'),
+]
+
+
+def upgrade() -> None:
+    # Existing rows start at 0 and are covered by a full (cursor-less) sync.
+    for table in ('users', 'clients', 'projects', 'payments', 'notes'):
+        op.add_column(table, sa.Column('sync_seq', sa.Integer(), server_default='0', nullable=False))
+    for table, owner in SYNCED:
+        op.create_index(f'ix_{table}_{owner}_sync_seq', table, [owner, 'sync_seq'], unique=False)
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('sync_seq', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstones_id'), 'sync_tombstones', ['id'], unique=False)
+    op.create_index('ix_sync_tombstones_user_id_sync_seq', 'sync_tombstones', ['user_id', 'sync_seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_user_id_sync_seq', table_name='sync_tombstones')
+    op.drop_index(op.f('ix_sync_tombstones_id'), table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+
+    for table, owner in SYNCED:
+        op.drop_index(f'ix_{table}_{owner}_sync_seq', table_name=table)
+    for table in ('notes', 'payments', 'projects', 'clients', 'users'):
+        op.drop_column(table, 'sync_seq')
@@ -0,0 +1,34 @@
+"""index project board
+
+Revision ID: f4c8a2e6b1d9
+Revises: e2b7c5a9d4f1
+Create Date: 2025-08-12 10:41:37.215804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a2e6b1d9'
+down_revision: Union[str, None] = 'e2b7c5a9d4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = "deleted_at IS NULL"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_projects_board', 'projects', ['user_id', 'status', 'updated_at', 'id'], unique=False,
+            postgresql_where=sa.text(LIVE),
+            sqlite_where=sa.text(LIVE),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_board', table_name='projects')
@@ -0,0 +1,224 @@
+"""
+Shared fixtures for the API test-suite.
+
+The app is pointed at a throwaway SQLite database (via aiosqlite) before it is
+imported, seeded with two fixture tenants of very different sizes, and driven
+through FastAPI's TestClient. ``query_recorder`` captures every statement the
+async engine sends to the database so tests can assert on query counts.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="frexta-tests-")
+_DB_PATH = os.path.join(_DB_DIR, "test.db")
+DATABASE_URL = f"sqlite+aiosqlite:///{_DB_PATH}"
+
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["DB_STARTUP"] = "off"  # the ``tenants`` fixture creates the schema
+os.environ["JOBS_WORKERS"] = "0"  # jobs run only when a test calls ``run_jobs``
+os.environ["RATE_LIMITS_ENABLED"] = "false"  # enabled explicitly by test_admission
+os.environ["REVOCATION_SYNC_SECONDS"] = "0"  # no background polling while counting queries
+os.environ["ARCHIVE_DIR"] = os.path.join(_DB_DIR, "archive")
+os.environ["EMAIL_DISPATCHER_ENABLED"] = "false"  # email goes out only when a test drains the outbox
+os.environ["EMAIL_FILE_DIR"] = os.path.join(_DB_DIR, "outbox")
+os.environ["ADMIN_EMAILS"] = "small@example.com,large@example.com"  # the budget tenants reach /api/admin
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.database import Base, engine, read_engines, sqlite_read_engine  # noqa: E402
+from app.core.jobs import job_runner  # noqa: E402
+from app.core.security import create_access_token, create_refresh_token, get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.client import Client  # noqa: E402
+from app.models.job import Job, JobStatus  # noqa: E402
+from app.models.note import Note  # noqa: E402
+from app.models.payment import Payment  # noqa: E402
+from app.models.project import Project, ProjectStatus  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+TEST_PASSWORD = "correct horse battery staple"
+
+
+@dataclass
+class Tenant:
+    """
+    Ids of a seeded tenant's rows, used to build request URLs.
+
+    ``spare_*`` rows have no children and exist only so DELETE routes have
+    something to remove without disturbing the rest of the fixture data.
+    """
+    name: str
+    email: str
+    token: str
+    refresh_token: str
+    # A second user of the tenant whose password the reset route may change
+    # (a reset revokes every token of its user).
+    reset_email: str
+    user_id: int
+    client_id: int
+    project_id: int
+    payment_id: int
+    client_note_id: int
+    project_note_id: int
+    spare_client_id: int
+    spare_project_id: int
+    spare_payment_id: int
+    spare_note_id: int
+    job_id: int
+    client_ids: List[int] = field(default_factory=list)
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def _seed_tenant(session: Session, name: str, clients: int, projects_per_client: int, rows_per_project: int, hashed_password: str) -> Tenant:
+    email = f"{name}@example.com"
+    user = User(email=email, hashed_password=hashed_password)
+    reset_user = User(email=f"reset-{name}@example.com", hashed_password=hashed_password)
+    session.add_all([user, reset_user])
+    session.flush()
+
+    statuses = list(ProjectStatus)
+    today = date.today()
+    client_ids, first = [], {}
+    for c in range(clients):
+        client = Client(name=f"{name} client {c}", email=f"client{c}@{name}.example.com", phone="555-0100", user_id=user.id)
+        session.add(client)
+        session.flush()
+        client_ids.append(client.id)
+        client_note = Note(content=f"note for client {c}", client_id=client.id, user_id=user.id)
+        session.add(client_note)
+        for p in range(projects_per_client):
+            project = Project(
+                name=f"{name} project {c}.{p}",
+                description="seeded project",
+                status=statuses[p % len(statuses)],
+                client_id=client.id,
+                user_id=user.id,
+            )
+            session.add(project)
+            session.flush()
+            for r in range(rows_per_project):
+                session.add(Payment(amount=100.0 + r, date_paid=today - timedelta(days=r * 7), project_id=project.id, user_id=user.id))
+                session.add(Note(content=f"note {r} for project {c}.{p}", project_id=project.id, user_id=user.id))
+            session.flush()
+            first.setdefault("project", project)
+        first.setdefault("client", client)
+        first.setdefault("client_note", client_note)
+
+    session.flush()
+    project = first["project"]
+    payment = session.query(Payment).filter(Payment.project_id == project.id).first()
+    project_note = session.query(Note).filter(Note.project_id == project.id).first()
+
+    spare_client = Client(name=f"{name} spare", email=f"spare@{name}.example.com", user_id=user.id)
+    spare_project = Project(name=f"{name} spare project", description="spare", client_id=first["client"].id, user_id=user.id)
+    spare_payment = Payment(amount=1.0, date_paid=today, project_id=project.id, user_id=user.id)
+    spare_note = Note(content="spare note", client_id=first["client"].id, user_id=user.id)
+    job = Job(kind="purge_client", payload={"client_id": 0}, user_id=user.id, status=JobStatus.SUCCEEDED)
+    session.add_all([spare_client, spare_project, spare_payment, spare_note, job])
+    session.flush()
+
+    return Tenant(
+        name=name,
+        email=email,
+        token=create_access_token(data={"sub": email}),
+        refresh_token=create_refresh_token(data={"sub": email}),
+        reset_email=reset_user.email,
+        user_id=user.id,
+        client_id=first["client"].id,
+        project_id=project.id,
+        payment_id=payment.id,
+        client_note_id=first["client_note"].id,
+        project_note_id=project_note.id,
+        spare_client_id=spare_client.id,
+        spare_project_id=spare_project.id,
+        spare_payment_id=spare_payment.id,
+        spare_note_id=spare_note.id,
+        job_id=job.id,
+        client_ids=client_ids,
+    )
+
+
+@pytest.fixture(scope="session")
+def tenants():
+    """
+    Seed a ``small`` and a ``large`` tenant through a synchronous engine.
+
+    The large tenant has many times more rows in every table, so any route
+    whose query count depends on result size shows up as a difference
+    between the two.
+    """
+    sync_engine = create_engine(f"sqlite:///{_DB_PATH}")
+    Base.metadata.create_all(sync_engine)
+    hashed_password = get_password_hash(TEST_PASSWORD)
+    with Session(sync_engine, expire_on_commit=False) as session:
+        seeded = {
+            "small": _seed_tenant(session, "small", clients=1, projects_per_client=1, rows_per_project=1, hashed_password=hashed_password),
+            "large": _seed_tenant(session, "large", clients=12, projects_per_client=4, rows_per_project=5, hashed_password=hashed_password),
+        }
+        session.commit()
+    sync_engine.dispose()
+    return seeded
+
+
+@pytest.fixture(scope="session")
+def client(tenants):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run_jobs(client):
+    """
+    Run every due background job on the app's event loop; returns the count.
+    """
+    return lambda: client.portal.call(job_runner.drain)
+
+
+class QueryRecorder:
+    """
+    Collects the SQL statements issued by the app's async engine.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._recording = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._recording:
+            self.statements.append(statement)
+
+    @contextmanager
+    def record(self):
+        self.statements = []
+        self._recording = True
+        try:
+            yield self
+        finally:
+            self._recording = False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture(scope="session")
+def query_recorder(client):
+    recorder = QueryRecorder()
+    engines = [engine, sqlite_read_engine, *read_engines]
+    for async_engine in engines:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", recorder._before_cursor_execute)
+    yield recorder
+    for async_engine in engines:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", recorder._before_cursor_execute)
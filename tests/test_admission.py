@@ -0,0 +1,68 @@
+"""
+Admission control: rate limits per principal and the DB concurrency gate.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import admission
+from app.core.admission import ConcurrencyGate, RateLimiter, parse_limit
+
+from .conftest import TEST_PASSWORD
+
+
+@pytest.fixture
+def strict_limits(monkeypatch):
+    monkeypatch.setattr(admission.settings, "RATE_LIMITS_ENABLED", True)
+    limiter = RateLimiter({"default": "1/m,3", "auth": "1/m,2", "heavy": "1/m,1"})
+    monkeypatch.setattr(admission, "rate_limiter", limiter)
+    return limiter
+
+
+def test_parse_limit():
+    assert parse_limit("20/s,60") == (20.0, 60.0)
+    assert parse_limit("30/m,5") == (0.5, 5.0)
+    assert parse_limit("7") == (7.0, 7.0)
+
+
+def test_login_is_limited_per_client_address(client, tenants, strict_limits):
+    form = {"username": tenants["small"].email, "password": "wrong"}
+    assert [client.post("/api/login", data=form).status_code for _ in range(2)] == [401, 401]
+
+    response = client.post("/api/login", data={"username": tenants["small"].email, "password": TEST_PASSWORD})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_limits_are_per_user_and_per_group(client, tenants, strict_limits):
+    small, large = tenants["small"], tenants["large"]
+    assert [client.get("/api/clients", headers=small.headers).status_code for _ in range(4)] == [200, 200, 200, 429]
+
+    # Another user, and another group for the same user, have their own buckets.
+    assert client.get("/api/clients", headers=large.headers).status_code == 200
+    assert client.get("/api/dashboard/kpis", headers=small.headers).status_code == 200
+
+
+def test_gate_sheds_load_when_full():
+    async def scenario():
+        gate = ConcurrencyGate(limit=1, max_waiting=1, timeout=0.05)
+        async with gate.slot():
+            # One request may queue, but it times out while the slot is held...
+            with pytest.raises(HTTPException) as timed_out:
+                async with gate.slot():
+                    pass
+            assert timed_out.value.status_code == 503
+
+            # ...and past max_waiting requests are refused without queueing.
+            waiter = asyncio.ensure_future(gate.slot().__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(HTTPException) as shed:
+                async with gate.slot():
+                    pass
+            assert shed.value.headers["Retry-After"]
+            waiter.cancel()
+        async with gate.slot():
+            pass
+
+    asyncio.run(scenario())
@@ -0,0 +1,146 @@
+"""
+Cold storage of completed projects' payments and notes.
+"""
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, update
+
+import pytest
+
+from app.core import archive
+from app.core.archive import ArchiveMissing, archive_path, archive_projects, read_archive
+from app.models.note import Note
+from app.models.payment import Payment
+from app.models.project import Project
+
+from .conftest import DATABASE_URL
+
+LONG_AGO = datetime.utcnow() - timedelta(days=3 * 365)
+
+
+def _sync_engine():
+    return create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+
+
+def _count(model, *criteria) -> int:
+    sync_engine = _sync_engine()
+    with sync_engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(model).where(*criteria)).scalar()
+    sync_engine.dispose()
+    return count
+
+
+def _completed_project(client, tenant, payment_date: date) -> int:
+    headers = tenant.headers
+    project = client.post(
+        "/api/projects",
+        json={"name": "finished", "description": "d", "status": "Completed", "client_id": tenant.client_id},
+        headers=headers,
+    ).json()
+    for amount in (10.0, 20.0):
+        client.post(
+            "/api/payments",
+            json={"amount": amount, "date_paid": payment_date.isoformat(), "project_id": project["id"]},
+            headers=headers,
+        )
+    client.post("/api/notes", json={"content": "wrap-up", "project_id": project["id"]}, headers=headers)
+    sync_engine = _sync_engine()
+    with sync_engine.begin() as conn:
+        conn.execute(update(Project).where(Project.id == project["id"]).values(updated_at=LONG_AGO))
+    sync_engine.dispose()
+    return project["id"]
+
+
+def test_archived_project_reads_back_transparently(client, tenants, run_jobs):
+    small = tenants["small"]
+    headers = small.headers
+    project_id = _completed_project(client, small, LONG_AGO.date())
+    recent_id = _completed_project(client, small, date.today())
+    before = client.get(f"/api/projects/{project_id}/payments", headers=headers).json()
+
+    totals = client.portal.call(archive_projects, 12)
+    assert totals["projects"] >= 1
+
+    # Only the project with no recent payments moved to cold storage.
+    assert os.path.exists(archive_path(project_id))
+    assert _count(Payment, Payment.project_id == project_id) == 0
+    assert _count(Note, Note.project_id == project_id) == 0
+    assert _count(Payment, Payment.project_id == recent_id) == 2
+
+    project = client.get(f"/api/projects/{project_id}", headers=headers).json()
+    assert project["archived_at"] is not None
+    assert project["updated_at"].startswith(LONG_AGO.isoformat()[:10])
+
+    after = client.get(f"/api/projects/{project_id}/payments", headers=headers).json()
+    assert sorted(after, key=lambda p: p["id"]) == sorted(before, key=lambda p: p["id"])
+    notes = client.get(f"/api/projects/{project_id}/notes", headers=headers).json()
+    assert [n["content"] for n in notes] == ["wrap-up"]
+
+    # Rows added after archival are merged with the archive.
+    client.post("/api/notes", json={"content": "late", "project_id": project_id}, headers=headers)
+    notes = client.get(f"/api/projects/{project_id}/notes", headers=headers).json()
+    assert [n["content"] for n in notes] == ["wrap-up", "late"]
+
+    # A second run finds nothing new to archive for this project.
+    assert client.portal.call(archive_projects, 12)["projects"] == 0
+
+    client.delete(f"/api/projects/{project_id}", headers=headers)
+    client.delete(f"/api/projects/{recent_id}", headers=headers)
+    run_jobs()
+    assert not os.path.exists(archive_path(project_id))
+
+
+def test_archived_rows_stay_in_every_read(client, tenants, run_jobs):
+    small = tenants["small"]
+    headers = small.headers
+    cursor = client.get("/api/sync", headers=headers).json()["cursor"]
+    project_id = _completed_project(client, small, LONG_AGO.date())
+    payments = client.get(f"/api/projects/{project_id}/payments", headers=headers).json()
+    [note] = client.get(f"/api/projects/{project_id}/notes", headers=headers).json()
+    snapshot = client.get("/api/sync", headers=headers).json()
+    assert client.portal.call(archive.archive_project, project_id)["payment"] == 2
+
+    listed = client.get("/api/payments", headers=headers).json()
+    assert all(payment in listed for payment in payments)
+    day = LONG_AGO.date().isoformat()
+    in_range = client.get("/api/payments", params={"from": day, "to": day}, headers=headers).json()
+    assert sorted(p["id"] for p in in_range) == sorted(p["id"] for p in payments)
+    assert client.get("/api/payments", params={"from": date.today().isoformat()}, headers=headers).json() == [
+        p for p in listed if p["date_paid"] >= date.today().isoformat()
+    ]
+    assert note in client.get("/api/notes", headers=headers).json()
+    assert client.get(f"/api/payments/{payments[0]['id']}", headers=headers).json() == payments[0]
+    assert client.get(f"/api/notes/{note['id']}", headers=headers).json() == note
+
+    # Archived rows are read-only.
+    assert client.delete(f"/api/payments/{payments[0]['id']}", headers=headers).status_code == 409
+    assert client.put(f"/api/notes/{note['id']}", json={"content": "x", "project_id": project_id},
+                      headers=headers).status_code == 409
+
+    # A full snapshot still has them, a client that synced them gets no
+    # change, and one that had not gets them.
+    full = client.get("/api/sync", headers=headers).json()
+    assert sorted(p["id"] for p in full["payments"]) == sorted(p["id"] for p in snapshot["payments"])
+    assert sorted(n["id"] for n in full["notes"]) == sorted(n["id"] for n in snapshot["notes"])
+    later = client.get("/api/sync", params={"since": snapshot["cursor"]}, headers=headers).json()
+    assert later["payments"] == later["notes"] == later["deleted"] == []
+    behind = client.get("/api/sync", params={"since": cursor}, headers=headers).json()
+    assert sorted(p["id"] for p in behind["payments"]) == sorted(p["id"] for p in payments)
+
+    client.delete(f"/api/projects/{project_id}", headers=headers)
+    run_jobs()
+
+
+def test_missing_archive_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive.settings, "ARCHIVE_DIR", str(tmp_path))
+    with pytest.raises(ArchiveMissing):
+        read_archive(123456)
+
+
+def test_archive_window_cannot_be_shortened():
+    with pytest.raises(ValueError):
+        asyncio.run(archive_projects(archive.settings.ARCHIVE_AFTER_MONTHS - 1))
+    with pytest.raises(SystemExit):
+        archive.main(["--months", str(archive.settings.ARCHIVE_AFTER_MONTHS - 1)])
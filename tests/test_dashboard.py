@@ -0,0 +1,92 @@
+"""
+Period-over-period dashboard KPIs.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.api.dashboard import _format_percent, _period_bounds
+
+from .conftest import DATABASE_URL
+
+
+# The tenant's payments, without those of deleted projects.
+LIVE_PAYMENTS = """
+    SELECT amount, date_paid FROM payments
+    WHERE user_id = :user_id
+      AND project_id NOT IN (SELECT id FROM projects WHERE deleted_at IS NOT NULL)
+"""
+
+
+def _tenant_rows(sql: str, user_id: int):
+    engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), {"user_id": user_id}).all()
+    engine.dispose()
+    return rows
+
+
+@pytest.mark.parametrize("period, now, expected", [
+    ("month", datetime(2025, 1, 15, 9), (datetime(2024, 12, 1), datetime(2025, 1, 1), datetime(2025, 2, 1))),
+    ("month", datetime(2025, 12, 31, 23), (datetime(2025, 11, 1), datetime(2025, 12, 1), datetime(2026, 1, 1))),
+    ("week", datetime(2025, 7, 20, 18), (datetime(2025, 7, 7), datetime(2025, 7, 14), datetime(2025, 7, 21))),
+    ("quarter", datetime(2025, 2, 3), (datetime(2024, 10, 1), datetime(2025, 1, 1), datetime(2025, 4, 1))),
+    ("quarter", datetime(2025, 12, 1), (datetime(2025, 7, 1), datetime(2025, 10, 1), datetime(2026, 1, 1))),
+])
+def test_period_bounds(period, now, expected):
+    assert _period_bounds(period, now) == expected
+
+
+def test_format_percent():
+    assert _format_percent(150.0, 100.0) == "+50%"
+    assert _format_percent(50.0, 100.0) == "-50%"
+    assert _format_percent(10.0, 0.0) == "+100%"
+    assert _format_percent(0.0, 0.0) == "+0%"
+
+
+@pytest.mark.parametrize("period", ["month", "week", "quarter"])
+def test_revenue_change_matches_the_data(client, tenants, period):
+    small = tenants["small"]
+    response = client.get("/api/dashboard/kpis", params={"period": period}, headers=small.headers)
+    assert response.status_code == 200
+    kpis = response.json()
+    assert kpis["period"] == period
+
+    previous_start, current_start, next_start = _period_bounds(period, datetime.utcnow())
+    rows = _tenant_rows(LIVE_PAYMENTS, small.user_id)
+    current = sum(a for a, d in rows if current_start.date().isoformat() <= d < next_start.date().isoformat())
+    previous = sum(a for a, d in rows if previous_start.date().isoformat() <= d < current_start.date().isoformat())
+
+    assert kpis["revenueThisMonth"] == {"value": pytest.approx(current), "change": _format_percent(current, previous)}
+
+
+def test_unknown_period_is_rejected(client, tenants):
+    response = client.get("/api/dashboard/kpis", params={"period": "decade"}, headers=tenants["small"].headers)
+    assert response.status_code == 422
+
+
+def test_kpis_and_activities_are_per_tenant(client, tenants):
+    for tenant in tenants.values():
+        kpis = client.get("/api/dashboard/kpis", headers=tenant.headers).json()
+        [(clients,)] = _tenant_rows(
+            "SELECT count(*) FROM clients WHERE user_id = :user_id AND deleted_at IS NULL", tenant.user_id
+        )
+        # Statuses are stored by enum name.
+        [(active, pending)] = _tenant_rows("""
+            SELECT sum(status = 'ACTIVE'), sum(status = 'PENDING') FROM projects
+            WHERE user_id = :user_id AND deleted_at IS NULL
+        """, tenant.user_id)
+        assert kpis["activeClients"]["value"] == clients
+        assert kpis["projectsInProgress"]["value"] == active
+        assert kpis["pendingTasks"]["value"] == pending
+
+        own = {name for (name,) in _tenant_rows(
+            "SELECT name FROM clients WHERE user_id = :user_id UNION SELECT name FROM projects WHERE user_id = :user_id",
+            tenant.user_id,
+        )}
+        activities = client.get("/api/dashboard/activities", headers=tenant.headers).json()
+        assert activities and {activity["target"] for activity in activities} <= own
+
+    small, large = (client.get("/api/dashboard/kpis", headers=t.headers).json() for t in tenants.values())
+    assert small["activeClients"]["value"] != large["activeClients"]["value"]
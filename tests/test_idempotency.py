@@ -0,0 +1,103 @@
+"""
+Idempotency-Key handling on create routes.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core import idempotency
+from app.core.database import AsyncSessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+
+def _payment(tenant, amount=42.0):
+    return {"amount": amount, "date_paid": "2025-07-01", "project_id": tenant.project_id}
+
+
+def _post(client, tenant, key, body):
+    return client.post("/api/payments", json=body, headers={**tenant.headers, "Idempotency-Key": key})
+
+
+def _payment_count(client, tenant):
+    return len(client.get("/api/payments", headers=tenant.headers).json())
+
+
+def test_retry_replays_the_stored_response(client, tenants, query_recorder):
+    small = tenants["small"]
+    key = uuid.uuid4().hex
+    before = _payment_count(client, small)
+
+    first = _post(client, small, key, _payment(small))
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    with query_recorder.record():
+        retry = _post(client, small, key, _payment(small))
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    # One lookup; no ownership checks and no domain tables.
+    assert query_recorder.count == 1
+
+    assert _payment_count(client, small) == before + 1
+
+
+def test_key_reused_for_a_different_request(client, tenants):
+    small = tenants["small"]
+    key = uuid.uuid4().hex
+    assert _post(client, small, key, _payment(small, 1.0)).status_code == 200
+    assert _post(client, small, key, _payment(small, 2.0)).status_code == 422
+
+
+def test_keys_are_scoped_per_user(client, tenants):
+    key = uuid.uuid4().hex
+    small, large = tenants["small"], tenants["large"]
+    first = _post(client, small, key, _payment(small))
+    other = _post(client, large, key, _payment(large))
+    assert other.status_code == 200
+    assert other.json()["id"] != first.json()["id"]
+
+
+def test_concurrent_duplicate_loses_to_the_first_commit(client, tenants, monkeypatch):
+    small = tenants["small"]
+    key = uuid.uuid4().hex
+    first = _post(client, small, key, _payment(small)).json()
+    before = _payment_count(client, small)
+
+    # Let the duplicate past the up-front lookup, as if both requests had
+    # checked the key before either committed.
+    original = idempotency.Idempotency.replay
+    calls = []
+
+    async def racing_replay(self, db, principal):
+        calls.append(principal)
+        return None if len(calls) == 1 else await original(self, db, principal)
+
+    monkeypatch.setattr(idempotency.Idempotency, "replay", racing_replay)
+    duplicate = _post(client, small, key, _payment(small))
+
+    assert duplicate.status_code == 200
+    assert duplicate.json() == first
+    assert len(calls) == 2
+    assert _payment_count(client, small) == before
+
+
+def test_expired_key_runs_the_request_again(client, tenants):
+    small = tenants["small"]
+    key = uuid.uuid4().hex
+    first = _post(client, small, key, _payment(small)).json()
+
+    async def expire():
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await session.commit()
+
+    client.portal.call(expire)
+    again = _post(client, small, key, _payment(small))
+    assert again.status_code == 200
+    assert again.json()["id"] != first["id"]
@@ -0,0 +1,132 @@
+"""
+Background job runner: retries, failure and status reporting.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app.core import jobs
+from app.core.database import AsyncSessionLocal
+from app.core.jobs import enqueue, job_runner
+from app.models.job import Job
+
+
+@pytest.fixture
+def flaky_handler(monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOBS_RETRY_BASE_SECONDS", 0.0)
+    calls = []
+
+    @job_runner.handler("test_flaky")
+    async def flaky(ctx, fail_times: int):
+        calls.append(ctx.attempt)
+        await ctx.progress(0.5)
+        if len(calls) <= fail_times:
+            raise RuntimeError("transient")
+        return {"calls": len(calls)}
+
+    yield calls
+    job_runner.handlers.pop("test_flaky")
+
+
+@pytest.fixture
+def handler():
+    """
+    Registers ``test_job`` to run the coroutine function a test passes.
+    """
+    def register(func):
+        job_runner.handlers["test_job"] = func
+    yield register
+    job_runner.handlers.pop("test_job", None)
+
+
+def _enqueue(client, tenant, kind="test_flaky", **payload):
+    async def add():
+        async with AsyncSessionLocal() as session:
+            job = enqueue(session, kind, payload, user_id=tenant.user_id, max_attempts=3)
+            await session.commit()
+            return job.id
+    return client.portal.call(add)
+
+
+def test_failed_job_is_retried_until_it_succeeds(client, tenants, run_jobs, flaky_handler):
+    tenant = tenants["small"]
+    job_id = _enqueue(client, tenant, fail_times=2)
+
+    assert run_jobs() == 3
+    job = client.get(f"/api/jobs/{job_id}", headers=tenant.headers).json()
+    assert job["status"] == "Succeeded"
+    assert job["attempts"] == 3
+    assert job["progress"] == 1.0
+    assert job["result"] == {"calls": 3}
+
+
+def test_job_fails_after_max_attempts(client, tenants, run_jobs, flaky_handler):
+    tenant = tenants["small"]
+    job_id = _enqueue(client, tenant, fail_times=10)
+
+    run_jobs()
+    job = client.get(f"/api/jobs/{job_id}", headers=tenant.headers).json()
+    assert job["status"] == "Failed"
+    assert job["attempts"] == 3
+    assert "transient" in job["error"]
+
+
+def test_jobs_are_private_to_their_owner(client, tenants):
+    assert client.get(f"/api/jobs/{tenants['small'].job_id}", headers=tenants["large"].headers).status_code == 404
+
+
+def test_a_job_claimed_again_is_left_to_its_new_claimer(client, tenants, run_jobs, handler):
+    tenant = tenants["small"]
+
+    async def overtaken(ctx):
+        # Another worker claims the job after this one's lease ran out.
+        async with ctx.session() as session:
+            await session.execute(update(Job).where(Job.id == ctx.job_id).values(attempts=ctx.attempt + 1))
+            await session.commit()
+        await ctx.progress(0.5)
+        return {"done": True}
+
+    handler(overtaken)
+    job_id = _enqueue(client, tenant, kind="test_job")
+    assert run_jobs() == 1
+    job = client.get(f"/api/jobs/{job_id}", headers=tenant.headers).json()
+    assert job["status"] == "Running" and job["result"] is None and job["progress"] == 0.0
+
+
+def test_an_unstorable_result_fails_the_attempt(client, tenants, run_jobs, handler, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOBS_RETRY_BASE_SECONDS", 0.0)
+    tenant = tenants["small"]
+
+    async def unstorable(ctx):
+        return {"at": object()}
+
+    handler(unstorable)
+    job_id = _enqueue(client, tenant, kind="test_job")
+    assert run_jobs() == 3
+    job = client.get(f"/api/jobs/{job_id}", headers=tenant.headers).json()
+    assert job["status"] == "Failed" and job["attempts"] == 3
+
+
+def test_worker_survives_a_failing_job(client, monkeypatch):
+    claims = [("shard", 1, "test_job", {}, 1)]
+
+    async def claim():
+        return claims.pop() if claims else None
+
+    async def execute(*claimed):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(job_runner, "_claim", claim)
+    monkeypatch.setattr(job_runner, "_execute", execute)
+
+    async def run_worker():
+        worker = asyncio.create_task(job_runner._worker(0))
+        await asyncio.sleep(0.05)
+        alive = not worker.done()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return alive
+
+    assert client.portal.call(run_worker)
+    assert claims == []
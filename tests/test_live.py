@@ -0,0 +1,123 @@
+"""
+Live dashboard streams: fan-out, backpressure and the SSE/WebSocket routes.
+"""
+import asyncio
+import json
+from datetime import date, timedelta
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core import live
+from app.core.live import RESYNC, LiveHub, Subscription, kpi_event
+from app.core.security import create_access_token
+
+
+def test_slow_subscriber_gets_a_single_resync():
+    subscription = Subscription(user_id=1, size=3)
+    for n in range(5):
+        subscription.offer(kpi_event("activeClients", n))
+
+    assert subscription.queue.qsize() == 1
+    assert subscription.dropped == 5
+    assert asyncio.run(subscription.next(0.1)) is RESYNC
+
+    # Once the resync is consumed, deltas flow again.
+    subscription.offer(kpi_event("activeClients", 1))
+    assert asyncio.run(subscription.next(0.1)) == kpi_event("activeClients", 1)
+
+
+def test_heartbeat_when_idle():
+    assert asyncio.run(Subscription(user_id=1, size=3).next(0.01)) is None
+
+
+def test_fan_out_is_per_user(monkeypatch):
+    monkeypatch.setattr(live.settings, "LIVE_MAX_STREAMS_PER_USER", 2)
+    hub = LiveHub()
+    first, second, other = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+    assert hub.subscribe(1) is None
+
+    hub.committed([(1, [kpi_event("revenueThisMonth", 10.0, date(2025, 7, 1))])])
+    assert first.queue.qsize() == second.queue.qsize() == 1
+    assert other.queue.empty()
+
+    for subscription in (first, second, other):
+        hub.unsubscribe(subscription)
+    assert hub.subscriber_count == 0
+
+
+def test_oversized_relay_messages_become_resyncs():
+    hub = LiveHub()
+    small = [(1, [kpi_event("activeClients", 1)])]
+    assert json.loads(hub._notify_payload(small))["events"] == [[1, [kpi_event("activeClients", 1)]]]
+
+    bulk = [(1, [kpi_event("revenueThisMonth", -1.0, date(2025, 1, 1) + timedelta(days=n)) for n in range(500)]),
+            (2, [kpi_event("activeClients", 1)])]
+    message = hub._notify_payload(bulk)
+    assert len(message.encode()) < live.NOTIFY_LIMIT
+    assert json.loads(message)["events"] == [[1, [RESYNC]], [2, [RESYNC]]]
+
+
+def test_websocket_receives_committed_writes(client, tenants, monkeypatch):
+    monkeypatch.setattr(live.settings, "LIVE_HEARTBEAT_SECONDS", 0.05)
+    small = tenants["small"]
+    with client.websocket_connect(f"/api/dashboard/ws?token={small.token}") as ws:
+        assert ws.receive_json() == {"type": "ready"}
+        assert ws.receive_json() == {"type": "ping"}
+
+        response = client.post(
+            "/api/payments",
+            json={"amount": 25.0, "date_paid": "2025-07-01", "project_id": small.project_id},
+            headers=small.headers,
+        )
+        assert response.status_code == 200
+        event = ws.receive_json()
+        while event["type"] == "ping":
+            event = ws.receive_json()
+        assert event == {"type": "kpi", "kpi": "revenueThisMonth", "delta": 25.0, "date": "2025-07-01"}
+        client.delete(f"/api/payments/{response.json()['id']}", headers=small.headers)
+
+
+def test_deleting_a_project_takes_back_its_revenue(client, tenants, monkeypatch, run_jobs):
+    monkeypatch.setattr(live.settings, "LIVE_HEARTBEAT_SECONDS", 0.05)
+    small = tenants["small"]
+    project = client.post("/api/projects", json={"name": "Short-lived", "description": "", "client_id": small.client_id},
+                          headers=small.headers).json()
+    today = date.today().isoformat()
+    for amount in (10.0, 15.0):
+        client.post("/api/payments", json={"amount": amount, "date_paid": today, "project_id": project["id"]},
+                    headers=small.headers)
+
+    with client.websocket_connect(f"/api/dashboard/ws?token={small.token}") as ws:
+        assert ws.receive_json() == {"type": "ready"}
+        assert client.delete(f"/api/projects/{project['id']}", headers=small.headers).status_code == 202
+        events = []
+        while not any(event["type"] == "kpi" and event["kpi"] == "revenueThisMonth" for event in events):
+            event = ws.receive_json()
+            if event["type"] != "ping":
+                events.append(event)
+    assert events == [
+        {"type": "kpi", "kpi": "pendingTasks", "delta": -1},
+        {"type": "kpi", "kpi": "revenueThisMonth", "delta": -25.0, "date": today},
+    ]
+    run_jobs()
+
+
+def test_websocket_rejects_bad_tokens(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/dashboard/ws?token=nope"):
+            pass
+    assert closed.value.code == 1008
+
+
+def test_sse_stream_ends_when_the_token_expires(client, tenants):
+    token = create_access_token({"sub": tenants["small"].email}, timedelta(seconds=1))
+    response = client.get("/api/dashboard/stream", params={"token": token})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert 'data: {"type":"ready"}' in response.text
+    assert response.text.rstrip().endswith('data: {"type":"expired"}')
+
+
+def test_sse_requires_a_token(client):
+    assert client.get("/api/dashboard/stream").status_code == 401
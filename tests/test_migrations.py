@@ -0,0 +1,61 @@
+"""
+Migrations: a populated SQLite database upgrades from the baseline to head.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from app.core.schema import ALEMBIC_INI, expected_heads
+
+BASELINE = "34148a40dd26"
+
+
+def _alembic(db_path, *args):
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}"}
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", "-c", ALEMBIC_INI, *args],
+        cwd=os.path.dirname(ALEMBIC_INI), env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def test_populated_database_upgrades_to_head(tmp_path):
+    db_path = tmp_path / "migrate.db"
+    assert _alembic(db_path, "upgrade", BASELINE).returncode == 0
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            INSERT INTO users VALUES (1, 'owner@example.com', 'x', NULL, NULL);
+            INSERT INTO clients VALUES (1, 'Client', 'client@example.com', NULL, 1, NULL, NULL);
+            INSERT INTO projects VALUES (1, 'Project', '', 'ACTIVE', 1, NULL, NULL);
+            INSERT INTO payments VALUES (1, 100.0, '2025-01-01', 1, NULL, NULL, NULL);
+            INSERT INTO notes VALUES (1, 'Note', 1, 1, NULL, NULL);
+        """)
+
+    upgrade = _alembic(db_path, "upgrade", "head")
+    assert upgrade.returncode == 0, upgrade.stderr
+
+    with sqlite3.connect(db_path) as conn:
+        assert {row[0] for row in conn.execute("SELECT version_num FROM alembic_version")} == set(expected_heads())
+        owners = [conn.execute(f"SELECT user_id FROM {table}").fetchall() for table in ("projects", "payments", "notes")]
+        assert owners == [[(1,)]] * 3
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        # Children cascade like the models say: (table, column) -> ON DELETE
+        on_delete = {
+            (table, fk[3]): fk[6]
+            for table in ("projects", "payments", "notes")
+            for fk in conn.execute(f"PRAGMA foreign_key_list({table})")
+        }
+        assert on_delete == {
+            ("projects", "client_id"): "CASCADE", ("projects", "user_id"): "NO ACTION",
+            ("payments", "project_id"): "CASCADE", ("payments", "user_id"): "NO ACTION",
+            ("notes", "project_id"): "CASCADE", ("notes", "client_id"): "CASCADE", ("notes", "user_id"): "NO ACTION",
+        }
+
+
+def test_failed_migration_exits(tmp_path):
+    db_path = tmp_path / "broken.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")  # in the initial migration's way
+
+    upgrade = _alembic(db_path, "upgrade", "head")
+    assert upgrade.returncode != 0 and "already exists" in upgrade.stderr
@@ -0,0 +1,105 @@
+"""
+Email outbox: written with the request's transaction, delivered later in
+batches, retried with backoff.
+"""
+import glob
+import os
+import re
+from datetime import datetime, timedelta
+from email import message_from_binary_file, policy
+
+from sqlalchemy import create_engine, select, update
+
+from app.core.config import settings
+from app.core.outbox import outbox
+from app.models.outbox_email import EmailStatus, OutboxEmail
+
+from .conftest import DATABASE_URL, TEST_PASSWORD
+
+
+class BrokenTransport:
+    def __init__(self):
+        self.batches = []
+
+    async def send(self, emails):
+        self.batches.append([email.id for email in emails])
+        raise ConnectionRefusedError("mail server down")
+
+
+def _emails(recipient: str):
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        rows = conn.execute(
+            select(OutboxEmail).where(OutboxEmail.recipient == recipient).order_by(OutboxEmail.id)
+        ).all()
+    sync_engine.dispose()
+    return rows
+
+
+def _register(client, email: str) -> None:
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+
+
+def test_reset_link_is_emailed_after_the_request(client):
+    email = "forgetful@example.com"
+    _register(client, email)
+
+    response = client.post("/api/forgot-password", params={"email": email})
+    assert response.status_code == 200
+    assert "reset_token" not in response.json()
+    [pending] = _emails(email)
+    assert pending.status == EmailStatus.PENDING and pending.kind == "password_reset"
+
+    assert client.portal.call(outbox.drain) >= 1
+    [sent] = _emails(email)
+    assert sent.status == EmailStatus.SENT and sent.attempts == 1 and sent.sent_at is not None
+    assert "token=" in pending.body and sent.body == ""  # the link is not kept once delivered
+
+    [path] = [p for p in glob.glob(os.path.join(settings.EMAIL_FILE_DIR, "*.eml"))
+              if f"-{sent.id}." in os.path.basename(p)]
+    with open(path, "rb") as fh:
+        message = message_from_binary_file(fh, policy=policy.default)
+    assert message["To"] == email
+    token = re.search(r"token=(\S+)", message.get_content()).group(1)
+
+    assert client.post("/api/reset-password", params={"token": token, "new_password": "n3w-password"}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": "n3w-password"}).json()
+    client.portal.call(outbox.drain)
+
+    statuses = client.get("/api/emails", headers={"Authorization": f"Bearer {tokens['access_token']}"}).json()
+    assert [(e["kind"], e["status"]) for e in statuses] == [("password_changed", "Sent"), ("password_reset", "Sent")]
+    assert "body" not in statuses[0]
+
+
+def test_failed_sends_back_off_then_give_up(client, monkeypatch):
+    email = "unlucky@example.com"
+    _register(client, email)
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 2)
+    broken = BrokenTransport()
+    monkeypatch.setattr(outbox, "transport", broken)
+
+    client.post("/api/forgot-password", params={"email": email})
+    client.portal.call(outbox.drain)
+    [retrying] = _emails(email)
+    assert retrying.status == EmailStatus.PENDING
+    assert retrying.attempts == 1
+    assert "mail server down" in retrying.last_error
+    assert "token=" in retrying.body
+    assert retrying.next_attempt_at > datetime.utcnow() + timedelta(seconds=settings.EMAIL_RETRY_BASE_SECONDS - 1)
+    assert any(retrying.id in batch for batch in broken.batches)
+
+    # Not due yet: nothing is sent until the backoff has passed.
+    tried = len(broken.batches)
+    client.portal.call(outbox.dispatch_once)
+    assert not any(retrying.id in batch for batch in broken.batches[tried:])
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.begin() as conn:
+        conn.execute(update(OutboxEmail).where(OutboxEmail.id == retrying.id)
+                     .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    sync_engine.dispose()
+
+    client.portal.call(outbox.drain)
+    [failed] = _emails(email)
+    assert failed.status == EmailStatus.FAILED
+    assert failed.attempts == 2
+    assert failed.body == ""
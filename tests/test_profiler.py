@@ -0,0 +1,58 @@
+"""
+Sampling profiler: stacks of the live worker, optionally tagged by route.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.core.profiler import stack_sampler
+from app.core.request_context import RequestContextMiddleware, scopes_by_task
+
+
+def _spin(until: float) -> None:
+    while time.perf_counter() < until:
+        pass
+
+
+async def _profile_busy_request():
+    async def busy(scope, receive, send):
+        await asyncio.sleep(0.02)  # let the sampler start
+        _spin(time.perf_counter() + 0.2)
+
+    scope = {"type": "http", "method": "GET", "route": SimpleNamespace(path="/api/busy")}
+    task = asyncio.create_task(RequestContextMiddleware(busy)(scope, None, None))
+    profile = await stack_sampler.profile(0.1, 0.005, by_route=True)
+    await task
+    assert task not in scopes_by_task
+    return profile
+
+
+def test_samples_are_tagged_with_the_route(client):
+    profile = client.portal.call(_profile_busy_request)
+    busy = [line for line in profile.collapsed().splitlines() if "_spin (tests/test_profiler.py" in line]
+    assert busy and all(line.startswith("event-loop;GET /api/busy;") for line in busy)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in busy) >= 10
+
+
+def test_profile_formats(client, tenants):
+    headers = tenants["small"].headers
+    collapsed = client.get("/api/admin/profile", params={"seconds": 0.05}, headers=headers)
+    assert collapsed.status_code == 200 and collapsed.headers["content-type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.text.splitlines())
+
+    speedscope = client.get("/api/admin/profile", params={"seconds": 0.05, "format": "speedscope"}, headers=headers)
+    document = speedscope.json()
+    frames = document["shared"]["frames"]
+    assert document["profiles"] and {p["type"] for p in document["profiles"]} == {"sampled"}
+    for profile in document["profiles"]:
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+
+    too_long = client.get("/api/admin/profile", params={"seconds": 3600}, headers=headers)
+    assert too_long.status_code == 400
+
+
+def test_one_profile_at_a_time(client, tenants, monkeypatch):
+    monkeypatch.setattr(stack_sampler, "_running", True)
+    response = client.get("/api/admin/profile", params={"seconds": 0.05}, headers=tenants["small"].headers)
+    assert response.status_code == 409
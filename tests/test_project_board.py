@@ -0,0 +1,73 @@
+"""
+Project board: status columns from one windowed query, paged per column.
+"""
+from sqlalchemy import create_engine
+
+from app.api import queries
+from app.models.project import ProjectStatus
+
+from .conftest import DATABASE_URL, TEST_PASSWORD
+
+
+def _sign_up(client, email: str) -> dict:
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_board_columns_and_cursors(client, query_recorder, run_jobs):
+    headers = _sign_up(client, "board@example.com")
+    owner = client.post("/api/clients", json={"name": "Board", "email": "b@example.com"}, headers=headers).json()
+    made = {status: [] for status in ProjectStatus}
+    for n in range(7):
+        status = ProjectStatus.ACTIVE if n < 5 else ProjectStatus.PENDING
+        project = client.post("/api/projects", json={
+            "name": f"p{n}", "description": "", "status": status.value, "client_id": owner["id"],
+        }, headers=headers).json()
+        made[status].append(project["id"])
+    # Touching a project moves it to the top of its column.
+    client.put(f"/api/projects/{made[ProjectStatus.ACTIVE][0]}", json={"description": "bumped"}, headers=headers)
+    deleted = made[ProjectStatus.PENDING].pop()
+    client.delete(f"/api/projects/{deleted}", headers=headers)
+    run_jobs()
+    active = [made[ProjectStatus.ACTIVE][0], *reversed(made[ProjectStatus.ACTIVE][1:])]
+
+    with query_recorder.record():
+        board = client.get("/api/projects/board", params={"limit": 2}, headers=headers).json()
+    assert query_recorder.count == 2
+    columns = {column["status"]: column for column in board["columns"]}
+    assert list(columns) == ["Pending", "Active", "Completed"]
+    assert [p["id"] for p in columns["Active"]["projects"]] == active[:2]
+    assert columns["Active"]["total"] == 5
+    assert [p["id"] for p in columns["Pending"]["projects"]] == made[ProjectStatus.PENDING]
+    assert columns["Pending"]["total"] == 1 and columns["Pending"]["next_cursor"] is None
+    assert columns["Completed"] == {"status": "Completed", "total": 0, "projects": [], "next_cursor": None}
+
+    seen, cursor = [p["id"] for p in columns["Active"]["projects"]], columns["Active"]["next_cursor"]
+    while cursor:
+        with query_recorder.record():
+            page = client.get("/api/projects/board", params={"limit": 2, "cursor": cursor}, headers=headers).json()
+        assert query_recorder.count == 2
+        [column] = page["columns"]
+        assert column["status"] == "Active" and column["total"] == 5
+        seen += [p["id"] for p in column["projects"]]
+        cursor = column["next_cursor"]
+    assert seen == active
+
+    assert client.get("/api/projects/board", params={"cursor": "nope"}, headers=headers).status_code == 400
+
+
+def test_board_query_uses_the_board_index(client):
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        for statement, params in (
+            (queries.PROJECT_BOARD, {"user_id": 1, "limit": 20}),
+            (queries.PROJECT_BOARD_COLUMN, {"user_id": 1, "status": "ACTIVE",
+                                            "updated_at": "2030-01-01 00:00:00", "id": 0, "limit": 20}),
+        ):
+            compiled = statement.compile(sync_engine)
+            bound = compiled.construct_params(params)
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}",
+                                        tuple(bound[name] for name in compiled.positiontup)).all()
+            assert any("ix_projects_board" in row[-1] for row in plan), plan
+    sync_engine.dispose()
@@ -0,0 +1,86 @@
+"""
+Soft delete + background purge of clients and projects.
+"""
+from sqlalchemy import create_engine, func, select
+
+from app.models.note import Note
+from app.models.payment import Payment
+from app.models.project import Project
+
+from .conftest import DATABASE_URL
+
+
+def _count(model, *criteria) -> int:
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(model).where(*criteria)).scalar()
+    sync_engine.dispose()
+    return count
+
+
+def _create_client_tree(client, headers, projects: int = 3):
+    response = client.post("/api/clients", json={"name": "Doomed", "email": "doomed@example.com"}, headers=headers)
+    client_id = response.json()["id"]
+    client.post("/api/notes", json={"content": "client note", "client_id": client_id}, headers=headers)
+    project_ids = []
+    for n in range(projects):
+        response = client.post("/api/projects", json={"name": f"p{n}", "description": "d", "client_id": client_id}, headers=headers)
+        project_id = response.json()["id"]
+        project_ids.append(project_id)
+        client.post("/api/payments", json={"amount": 5.0, "date_paid": "2025-02-01", "project_id": project_id}, headers=headers)
+        client.post("/api/notes", json={"content": "project note", "project_id": project_id}, headers=headers)
+    return client_id, project_ids
+
+
+def test_delete_client_hides_and_purges_children(client, tenants, run_jobs, monkeypatch):
+    monkeypatch.setattr("app.core.purge.settings.PURGE_BATCH_SIZE", 2)
+    headers = tenants["small"].headers
+    client_id, project_ids = _create_client_tree(client, headers)
+
+    response = client.delete(f"/api/clients/{client_id}", headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    assert client.get(f"/api/clients/{client_id}", headers=headers).status_code == 404
+    assert client.get(f"/api/projects/{project_ids[0]}", headers=headers).status_code == 404
+    assert _count(Payment, Payment.project_id.in_(project_ids)) == len(project_ids)
+
+    assert run_jobs() == 1
+    job = client.get(f"/api/jobs/{job_id}", headers=headers).json()
+    assert job["status"] == "Succeeded"
+    assert job["result"] == {"projects": 3, "payments": 3, "notes": 4}
+    assert _count(Project, Project.client_id == client_id) == 0
+    assert _count(Payment, Payment.project_id.in_(project_ids)) == 0
+    assert _count(Note, Note.client_id == client_id) == 0
+    assert _count(Note, Note.project_id.in_(project_ids)) == 0
+
+
+def test_delete_project_purges_payments_and_notes(client, tenants, run_jobs):
+    headers = tenants["small"].headers
+    client_id, (project_id,) = _create_client_tree(client, headers, projects=1)
+
+    response = client.delete(f"/api/projects/{project_id}", headers=headers)
+    assert response.status_code == 202
+
+    assert client.get(f"/api/projects/{project_id}/payments", headers=headers).status_code == 404
+    run_jobs()
+    assert _count(Project, Project.id == project_id) == 0
+    assert _count(Payment, Payment.project_id == project_id) == 0
+    assert _count(Note, Note.project_id == project_id) == 0
+
+    client.delete(f"/api/clients/{client_id}", headers=headers)
+    run_jobs()
+
+
+def test_deleted_client_children_are_hidden_before_purge(client, tenants, run_jobs):
+    headers = tenants["small"].headers
+    client_id, project_ids = _create_client_tree(client, headers, projects=2)
+    client.delete(f"/api/clients/{client_id}", headers=headers)
+
+    projects = {p["id"] for p in client.get("/api/projects", headers=headers).json()}
+    payments = {p["project_id"] for p in client.get("/api/payments", headers=headers).json()}
+    notes = client.get("/api/notes", headers=headers).json()
+    assert not projects & set(project_ids)
+    assert not payments & set(project_ids)
+    assert not [n for n in notes if n["client_id"] == client_id or n["project_id"] in project_ids]
+    run_jobs()
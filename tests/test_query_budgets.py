@@ -0,0 +1,177 @@
+"""
+Query-count regression tests for every API route.
+
+Each route declares a budget: the maximum number of SQL statements a single
+request may issue. Every case runs once against the ``small`` tenant and once
+against the ``large`` tenant; a route fails if it exceeds its budget or if it
+issues more statements for the larger tenant (an N+1 pattern).
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.main import app
+
+from app.core.security import create_access_token, create_refresh_token, create_reset_token
+from app.core.reports import revenue_cache
+from app.core.suggest import client_suggestions
+
+from .conftest import TEST_PASSWORD, Tenant
+
+
+@dataclass
+class RouteCase:
+    method: str
+    path: str
+    budget: int
+    url: Callable[[Tenant], str]
+    json: Optional[Callable[[Tenant], dict]] = None
+    data: Optional[Callable[[Tenant], dict]] = None
+    params: Optional[Callable[[Tenant], dict]] = None
+    auth: bool = True
+    expected_status: int = 200
+
+    @property
+    def id(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+def _client_body(t: Tenant) -> dict:
+    return {"name": f"{t.name} client", "email": f"new@{t.name}.example.com", "phone": "555-0199"}
+
+
+def _payment_body(t: Tenant) -> dict:
+    return {"amount": 42.0, "date_paid": "2025-01-15", "notes": "retainer", "project_id": t.project_id}
+
+
+def _cold_suggest_url(t: Tenant) -> str:
+    # Budget the index load; a warm lookup issues no statements at all.
+    client_suggestions.clear()
+    return "/api/clients/suggest"
+
+
+def _cold_revenue_url(t: Tenant) -> str:
+    # Budget an uncached report reaching back far enough to read archives.
+    revenue_cache.clear()
+    return "/api/reports/revenue"
+
+
+ROUTE_CASES = [
+    # auth
+    RouteCase("POST", "/api/register", 3, lambda t: "/api/register",
+              json=lambda t: {"email": f"registered-{t.name}@example.com", "password": TEST_PASSWORD}, auth=False),
+    RouteCase("POST", "/api/login", 1, lambda t: "/api/login",
+              data=lambda t: {"username": t.email, "password": TEST_PASSWORD}, auth=False),
+    RouteCase("POST", "/api/forgot-password", 2, lambda t: "/api/forgot-password",
+              params=lambda t: {"email": t.email}, auth=False),
+    RouteCase("POST", "/api/refresh", 1, lambda t: "/api/refresh",
+              json=lambda t: {"refresh_token": t.refresh_token}, auth=False),
+    RouteCase("POST", "/api/logout", 1, lambda t: "/api/logout",
+              json=lambda t: {"refresh_token": create_refresh_token(data={"sub": t.email})}, auth=False),
+    RouteCase("POST", "/api/reset-password", 4, lambda t: "/api/reset-password",
+              params=lambda t: {"token": create_reset_token(data={"sub": t.reset_email}), "new_password": TEST_PASSWORD},
+              auth=False),
+    # users
+    RouteCase("GET", "/api/users/me", 1, lambda t: "/api/users/me"),
+    RouteCase("GET", "/api/users/{id}", 1, lambda t: f"/api/users/{t.user_id}"),
+    # clients
+    RouteCase("POST", "/api/clients", 4, lambda t: "/api/clients", json=_client_body),
+    RouteCase("GET", "/api/clients", 2, lambda t: "/api/clients"),
+    RouteCase("GET", "/api/clients/suggest", 2, _cold_suggest_url, params=lambda t: {"q": "client"}),
+    RouteCase("GET", "/api/clients/{id}", 2, lambda t: f"/api/clients/{t.client_id}"),
+    RouteCase("PUT", "/api/clients/{id}", 5, lambda t: f"/api/clients/{t.client_id}", json=_client_body),
+    RouteCase("DELETE", "/api/clients/{id}", 7, lambda t: f"/api/clients/{t.spare_client_id}", expected_status=202),
+    # projects
+    RouteCase("POST", "/api/projects", 5, lambda t: "/api/projects",
+              json=lambda t: {"name": "new project", "description": "d", "client_id": t.client_id}),
+    RouteCase("GET", "/api/projects", 2, lambda t: "/api/projects"),
+    RouteCase("GET", "/api/projects/board", 2, lambda t: "/api/projects/board", params=lambda t: {"limit": 2}),
+    RouteCase("GET", "/api/projects/{id}", 2, lambda t: f"/api/projects/{t.project_id}"),
+    RouteCase("PUT", "/api/projects/{id}", 5, lambda t: f"/api/projects/{t.project_id}",
+              json=lambda t: {"status": "Active"}),
+    RouteCase("DELETE", "/api/projects/{id}", 7, lambda t: f"/api/projects/{t.spare_project_id}", expected_status=202),
+    RouteCase("GET", "/api/clients/{client_id}/projects", 3, lambda t: f"/api/clients/{t.client_id}/projects"),
+    # payments
+    RouteCase("POST", "/api/payments", 5, lambda t: "/api/payments", json=_payment_body),
+    RouteCase("GET", "/api/payments", 3, lambda t: "/api/payments"),
+    RouteCase("GET", "/api/payments", 3, lambda t: "/api/payments",
+              params=lambda t: {"from": "2025-01-01", "to": "2025-12-31"}),
+    RouteCase("GET", "/api/payments/{id}", 2, lambda t: f"/api/payments/{t.payment_id}"),
+    RouteCase("PUT", "/api/payments/{id}", 5, lambda t: f"/api/payments/{t.payment_id}", json=_payment_body),
+    RouteCase("DELETE", "/api/payments/{id}", 5, lambda t: f"/api/payments/{t.spare_payment_id}"),
+    RouteCase("GET", "/api/projects/{project_id}/payments", 3, lambda t: f"/api/projects/{t.project_id}/payments"),
+    # notes
+    RouteCase("POST", "/api/notes", 5, lambda t: "/api/notes",
+              json=lambda t: {"content": "new note", "client_id": t.client_id}),
+    RouteCase("GET", "/api/notes", 3, lambda t: "/api/notes"),
+    RouteCase("GET", "/api/notes/{id}", 2, lambda t: f"/api/notes/{t.project_note_id}"),
+    RouteCase("PUT", "/api/notes/{id}", 5, lambda t: f"/api/notes/{t.client_note_id}",
+              json=lambda t: {"content": "edited", "client_id": t.client_id}),
+    RouteCase("DELETE", "/api/notes/{id}", 5, lambda t: f"/api/notes/{t.spare_note_id}"),
+    RouteCase("GET", "/api/projects/{project_id}/notes", 3, lambda t: f"/api/projects/{t.project_id}/notes"),
+    RouteCase("GET", "/api/clients/{client_id}/notes", 3, lambda t: f"/api/clients/{t.client_id}/notes"),
+    # dashboard
+    RouteCase("GET", "/api/dashboard/kpis", 4, lambda t: "/api/dashboard/kpis"),
+    RouteCase("GET", "/api/dashboard/activities", 3, lambda t: "/api/dashboard/activities"),
+    # reports
+    RouteCase("GET", "/api/reports/revenue", 3, _cold_revenue_url, params=lambda t: {"group_by": "client"}),
+    # The stream ends once its token expires, so give it one that does at once.
+    RouteCase("GET", "/api/dashboard/stream", 1, lambda t: "/api/dashboard/stream",
+              params=lambda t: {"token": create_access_token({"sub": t.email}, timedelta(seconds=1))}, auth=False),
+    # sync
+    RouteCase("GET", "/api/sync", 6, lambda t: "/api/sync"),
+    RouteCase("GET", "/api/sync", 7, lambda t: "/api/sync", params=lambda t: {"since": 0}),
+    # jobs
+    RouteCase("GET", "/api/jobs/{id}", 2, lambda t: f"/api/jobs/{t.job_id}"),
+    # emails
+    RouteCase("GET", "/api/emails", 2, lambda t: "/api/emails"),
+    # admin
+    RouteCase("GET", "/api/admin/slow-queries", 0, lambda t: "/api/admin/slow-queries"),
+    RouteCase("GET", "/api/admin/profile", 0, lambda t: "/api/admin/profile", params=lambda t: {"seconds": 0.05}),
+]
+
+
+def _call(client, case: RouteCase, tenant: Tenant):
+    kwargs: Dict[str, object] = {}
+    if case.json:
+        kwargs["json"] = case.json(tenant)
+    if case.data:
+        kwargs["data"] = case.data(tenant)
+    if case.params:
+        kwargs["params"] = case.params(tenant)
+    if case.auth:
+        kwargs["headers"] = tenant.headers
+    return client.request(case.method, case.url(tenant), **kwargs)
+
+
+def test_every_api_route_has_a_budget():
+    declared = {(c.method, c.path) for c in ROUTE_CASES}
+    missing = [
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.include_in_schema and route.path.startswith("/api")
+        for method in route.methods
+        if (method, route.path) not in declared
+    ]
+    assert not missing, f"routes without a declared query budget: {missing}"
+
+
+@pytest.mark.parametrize("case", ROUTE_CASES, ids=lambda c: c.id)
+def test_route_query_budget(case: RouteCase, client, tenants, query_recorder):
+    counts = {}
+    for name in ("small", "large"):
+        with query_recorder.record():
+            response = _call(client, case, tenants[name])
+        assert response.status_code == case.expected_status, response.text
+        counts[name] = query_recorder.count
+        assert query_recorder.count <= case.budget, (
+            f"{case.id} issued {query_recorder.count} statements for the {name} tenant "
+            f"(budget {case.budget}):\n" + "\n".join(query_recorder.statements)
+        )
+
+    assert counts["large"] == counts["small"], (
+        f"{case.id} query count grows with result size: {counts}"
+    )
@@ -0,0 +1,76 @@
+"""
+Read-replica routing for GET routes.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.database import ReplicaRouter
+
+from .conftest import DATABASE_URL
+
+
+class _Replica:
+    """
+    A replica engine (pointing at ``url``) that counts its statements.
+    """
+
+    def __init__(self, url: str):
+        self.engine = create_async_engine(url)
+        self.statements = 0
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._count)
+        self.factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    def _count(self, *args):
+        self.statements += 1
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    # The "replica" is a second engine on the test database, which is enough
+    # to tell which engine served a request.
+    replica = _Replica(DATABASE_URL)
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter([replica.factory]))
+    return replica
+
+
+def test_router_pins_recent_writers_to_primary(monkeypatch):
+    monkeypatch.setattr(database.settings, "READ_AFTER_WRITE_SECONDS", 60.0)
+    router = ReplicaRouter([])
+    router.mark_write("writer@example.com")
+    assert router.is_sticky("writer@example.com")
+    assert not router.is_sticky("reader@example.com")
+
+
+def test_get_routes_read_from_replica(client, tenants, replica, query_recorder):
+    with query_recorder.record():
+        response = client.get("/api/clients", headers=tenants["small"].headers)
+    assert response.status_code == 200
+    assert replica.statements == 2
+
+
+def test_reads_stick_to_primary_after_write(client, tenants, replica):
+    tenant = tenants["small"]
+    response = client.put(
+        f"/api/clients/{tenant.client_id}",
+        json={"name": "sticky", "email": "sticky@example.com", "phone": None},
+        headers=tenant.headers,
+    )
+    assert response.status_code == 200
+
+    response = client.get(f"/api/clients/{tenant.client_id}", headers=tenant.headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "sticky"
+    assert replica.statements == 0
+
+
+def test_unreachable_replica_falls_back_to_primary(client, tenants, monkeypatch):
+    broken = _Replica("sqlite+aiosqlite:////nonexistent-dir/replica.db")
+    router = ReplicaRouter([broken.factory])
+    monkeypatch.setattr(database, "replica_router", router)
+
+    response = client.get("/api/clients", headers=tenants["large"].headers)
+    assert response.status_code == 200
+    assert router.candidates() == []
@@ -0,0 +1,100 @@
+"""
+Revenue reports: SQL bucketing, gap filling, series maths and the cache of
+ended buckets.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, literal, select
+
+from app.core.archive import archive_project
+from app.core.reports import bucket_start, date_bucket, moving_averages
+
+from .conftest import DATABASE_URL, TEST_PASSWORD
+
+
+def _sign_up(client, email: str) -> dict:
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def _project(client, headers, name: str) -> dict:
+    owner = client.post("/api/clients", json={"name": name, "email": f"{name}@example.com"}, headers=headers).json()
+    return client.post("/api/projects", json={"name": f"{name} site", "description": "", "client_id": owner["id"]},
+                       headers=headers).json()
+
+
+def _pay(client, headers, project: dict, amount: float, day: str) -> None:
+    response = client.post("/api/payments", json={"amount": amount, "date_paid": day, "project_id": project["id"]},
+                           headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def _report(client, headers, **params) -> dict:
+    response = client.get("/api/reports/revenue", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_weekly_revenue_by_client(client, query_recorder):
+    headers = _sign_up(client, "finance@example.com")
+    acme, globex = _project(client, headers, "acme"), _project(client, headers, "globex")
+    _pay(client, headers, acme, 100.0, "2024-01-02")
+    _pay(client, headers, acme, 50.0, "2024-01-17")
+    _pay(client, headers, globex, 30.0, "2024-01-03")
+    _pay(client, headers, globex, 999.0, "2024-01-22")  # after the range
+
+    weeks = {"bucket": "week", "from": "2024-01-03", "to": "2024-01-21", "window": 2}
+    report = _report(client, headers, **weeks)
+    assert report["buckets"] == ["2024-01-01", "2024-01-08", "2024-01-15"]
+    [total] = report["series"]
+    assert total["id"] is None and total["total"] == 180.0
+    assert total["revenue"] == [130.0, 0.0, 50.0]
+    assert total["running_total"] == [130.0, 130.0, 180.0]
+    assert total["moving_average"] == [130.0, 65.0, 25.0]
+
+    by_client = _report(client, headers, group_by="client", **weeks)["series"]
+    assert [(s["name"], s["revenue"]) for s in by_client] == [("acme", [100.0, 0.0, 50.0]), ("globex", [30.0, 0.0, 0.0])]
+
+    # Ended buckets are cached until the user's data changes.
+    with query_recorder.record():
+        assert _report(client, headers, group_by="client", **weeks)["series"] == by_client
+    assert query_recorder.count == 1  # the user
+    _pay(client, headers, globex, 20.0, "2024-01-09")
+    with query_recorder.record():
+        by_client = _report(client, headers, group_by="client", **weeks)["series"]
+    assert query_recorder.count > 1
+    assert by_client[1]["revenue"] == [30.0, 20.0, 0.0]
+
+    months = _report(client, headers, bucket="month", group_by="project", **{"from": "2024-01-01", "to": "2024-02-29"})
+    assert months["buckets"] == ["2024-01-01", "2024-02-01"]
+    assert [s["revenue"] for s in months["series"]] == [[1049.0, 0.0], [150.0, 0.0]]
+
+    bad = client.get("/api/reports/revenue", params={"from": "2024-02-01", "to": "2024-01-01"}, headers=headers)
+    assert bad.status_code == 400
+
+
+def test_archived_payments_are_included(client, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.core.archive.settings.ARCHIVE_DIR", str(tmp_path))
+    headers = _sign_up(client, "archived-finance@example.com")
+    project = _project(client, headers, "oldco")
+    _pay(client, headers, project, 75.0, "2023-03-10")
+    assert client.portal.call(archive_project, project["id"])["payment"] == 1
+
+    report = _report(client, headers, bucket="month", group_by="client", **{"from": "2023-03-01", "to": "2023-04-30"})
+    assert [(s["name"], s["revenue"]) for s in report["series"]] == [("oldco", [75.0, 0.0])]
+
+
+def test_sql_buckets_match_python_buckets(client):
+    days = [date(2024, 2, 20) + timedelta(days=n) for n in range(40)]
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        for unit in ("day", "week", "month"):
+            starts = conn.execute(select(*(date_bucket(unit, literal(day)) for day in days))).one()
+            assert list(starts) == [bucket_start(unit, day) for day in days]
+    sync_engine.dispose()
+
+
+def test_moving_average_warms_up():
+    assert moving_averages([3.0, 6.0, 9.0, 0.0], 3) == [3.0, 4.5, 6.0, 5.0]
+    assert moving_averages([], 3) == []
@@ -0,0 +1,63 @@
+"""
+ORM-free list routes return exactly what the response schemas would.
+"""
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.client import Client
+from app.models.note import Note
+from app.models.payment import Payment
+from app.models.project import Project
+from app.schemas.note import Note as NoteSchema
+from app.schemas.payment import Payment as PaymentSchema
+from app.schemas.project import Project as ProjectSchema
+
+from .conftest import DATABASE_URL
+
+
+def _expected(schema, statement):
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with Session(sync_engine) as session:
+        rows = session.execute(statement).scalars().all()
+        expected = [schema.model_validate(row, from_attributes=True).model_dump(mode="json") for row in rows]
+    sync_engine.dispose()
+    return sorted(expected, key=lambda item: item["id"])
+
+
+def _get(client, tenant, url, **params):
+    response = client.get(url, params=params, headers=tenant.headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    return sorted(response.json(), key=lambda item: item["id"])
+
+
+def test_payments_match_schema(client, tenants):
+    small = tenants["small"]
+    live = select(Payment).join(Project).where(Payment.user_id == small.user_id, Project.deleted_at.is_(None))
+    assert _get(client, small, "/api/payments") == _expected(PaymentSchema, live)
+    since = "2025-01-01"
+    assert _get(client, small, "/api/payments", **{"from": since}) == _expected(
+        PaymentSchema, live.where(Payment.date_paid >= since)
+    )
+
+
+def test_notes_match_schema(client, tenants):
+    small = tenants["small"]
+    live = (
+        select(Note)
+        .outerjoin(Client, Note.client_id == Client.id)
+        .outerjoin(Project, Note.project_id == Project.id)
+        .where(Note.user_id == small.user_id, Client.deleted_at.is_(None), Project.deleted_at.is_(None))
+    )
+    expected = _expected(NoteSchema, live)
+    assert small.client_note_id in [note["id"] for note in expected]
+    assert _get(client, small, "/api/notes") == expected
+
+
+def test_client_projects_match_schema(client, tenants):
+    small = tenants["small"]
+    expected = _expected(
+        ProjectSchema,
+        select(Project).where(Project.client_id == small.client_id, Project.deleted_at.is_(None)),
+    )
+    assert expected and _get(client, small, f"/api/clients/{small.client_id}/projects") == expected
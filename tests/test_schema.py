@@ -0,0 +1,59 @@
+"""
+Startup schema check: every ``DB_STARTUP`` mode.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.schema import SchemaOutOfDate, ensure_schema, expected_heads
+
+
+def _run(tmp_path, mode, monkeypatch, stamp=None):
+    """
+    ``ensure_schema`` in ``mode`` on a fresh database (at revision ``stamp``,
+    if any); returns its tables afterwards.
+    """
+    monkeypatch.setattr(settings, "DB_STARTUP", mode)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+        try:
+            if stamp is not None:
+                async with engine.begin() as conn:
+                    await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+                    await conn.execute(text("INSERT INTO alembic_version VALUES (:rev)"), {"rev": stamp})
+            await ensure_schema(engine)
+            async with engine.connect() as conn:
+                return set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_check_passes_at_head(tmp_path, monkeypatch):
+    (head,) = expected_heads()
+    assert _run(tmp_path, "check", monkeypatch, stamp=head) == {"alembic_version"}
+
+
+@pytest.mark.parametrize("stamp", [None, "0000000000"])
+def test_check_fails_unless_at_head(tmp_path, monkeypatch, stamp):
+    with pytest.raises(SchemaOutOfDate, match="alembic upgrade head"):
+        _run(tmp_path, "check", monkeypatch, stamp=stamp)
+
+
+def test_create_all_creates_the_tables(tmp_path, monkeypatch):
+    tables = _run(tmp_path, "create_all", monkeypatch)
+    assert {"users", "clients", "projects", "payments", "notes", "token_revocations"} <= tables
+
+
+def test_off_leaves_the_database_alone(tmp_path, monkeypatch):
+    assert _run(tmp_path, "off", monkeypatch) == set()
+
+
+def test_unknown_mode_is_refused(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="Unknown DB_STARTUP mode"):
+        _run(tmp_path, "migrate", monkeypatch)
@@ -0,0 +1,127 @@
+"""
+Tenant sharding: directory placement, per-request routing and online moves,
+with the test database as shard 0 and two more SQLite files.
+"""
+import itertools
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.core.config import settings
+from app.core.database import Base, Shard, shard_map
+from app.core.shards import ShardMoveError, _set_entry, init_shards, move_tenant
+from app.models.client import Client
+from app.models.payment import Payment
+from app.models.tenant_shard import TenantShard
+from app.models.user import User
+
+from .conftest import DATABASE_URL, TEST_PASSWORD
+
+
+@pytest.fixture
+def shards(client, monkeypatch):
+    """
+    Two extra shards for the duration of a test.
+    """
+    directory = tempfile.mkdtemp(prefix="frexta-shards-")
+    urls = [f"sqlite+aiosqlite:///{os.path.join(directory, f'shard{n}.db')}" for n in (1, 2)]
+    for url in urls:
+        sync_engine = create_engine(url.replace("+aiosqlite", ""))
+        Base.metadata.create_all(sync_engine)
+        sync_engine.dispose()
+    extra = [Shard.from_url(n, url) for n, url in enumerate(urls, start=1)]
+    monkeypatch.setattr(shard_map, "shards", [shard_map.directory, *extra])
+    monkeypatch.setattr(shard_map, "_entries", {})
+    monkeypatch.setattr(settings, "SHARD_DIRECTORY_TTL_SECONDS", 0.0)
+    yield {0: DATABASE_URL, 1: urls[0], 2: urls[1]}
+    for shard in extra:
+        client.portal.call(shard.dispose)
+
+
+def _count(url: str, model, *criteria) -> int:
+    sync_engine = create_engine(url.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(model).where(*criteria)).scalar()
+    sync_engine.dispose()
+    return count
+
+
+def _email_on(shard: int, prefix: str) -> str:
+    return next(
+        email for email in (f"{prefix}{n}@example.com" for n in itertools.count())
+        if shard_map.place(email) == shard
+    )
+
+
+def _sign_up(client, email: str) -> dict:
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_tenant_lives_on_its_shard_and_moves_online(client, shards, run_jobs):
+    email = _email_on(1, "sharded")
+    headers = _sign_up(client, email)
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 400
+    assert _count(shards[0], TenantShard, TenantShard.email == email, TenantShard.shard == 1) == 1
+    assert _count(shards[0], User, User.email == email) == 0
+
+    created = client.post("/api/clients", json={"name": "Acme", "email": "acme@example.com"}, headers=headers).json()
+    project = client.post(
+        "/api/projects",
+        json={"name": "site", "description": "d", "status": "Active", "client_id": created["id"]},
+        headers=headers,
+    ).json()
+    client.post("/api/payments", json={"amount": 5.0, "date_paid": "2025-01-02", "project_id": project["id"]},
+                headers=headers)
+    assert _count(shards[1], Payment) == 1
+    before = client.get("/api/clients", headers=headers).json()
+    assert [c["name"] for c in before] == ["Acme"]
+
+    # While a move is in progress, writes are refused and reads still work.
+    client.portal.call(lambda: _set_entry(email, moving=True))
+    response = client.post("/api/clients", json={"name": "Later", "email": "l@example.com"}, headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert client.get("/api/clients", headers=headers).json() == before
+    client.portal.call(lambda: _set_entry(email, moving=False))
+
+    copied = client.portal.call(move_tenant, email, 2, 0.0)
+    assert copied["users"] == 1 and copied["payments"] == 1
+    assert _count(shards[1], User) == 0 and _count(shards[1], Payment) == 0
+    assert _count(shards[2], Payment) == 1
+    assert client.get("/api/clients", headers=headers).json() == before
+    assert client.get(f"/api/projects/{project['id']}/payments", headers=headers).json()[0]["amount"] == 5.0
+
+    # Jobs are claimed from the tenant's new shard.
+    assert client.delete(f"/api/clients/{created['id']}", headers=headers).status_code == 202
+    run_jobs()
+    assert _count(shards[2], Client) == 0
+    assert _count(shards[2], Payment) == 0
+
+
+def test_move_refuses_ids_taken_on_the_target(client, shards):
+    # SQLite shards allocate ids independently, so both users get id 1.
+    first, second = _email_on(1, "first"), _email_on(2, "second")
+    _sign_up(client, first)
+    _sign_up(client, second)
+
+    with pytest.raises(ShardMoveError):
+        client.portal.call(move_tenant, first, 2, 0.0)
+    assert _count(shards[1], User, User.email == first) == 1
+    assert _count(shards[2], User, User.email == first) == 0
+    assert _count(shards[0], TenantShard, TenantShard.email == first, TenantShard.shard == 1,
+                  TenantShard.moving.is_(False)) == 1
+
+
+def test_init_records_existing_users(client, shards, tenants):
+    small = tenants["small"]
+    totals = client.portal.call(init_shards)
+    assert totals["shards"] == 3
+    assert _count(shards[0], TenantShard, TenantShard.email == small.email, TenantShard.shard == 0,
+                  TenantShard.user_id == small.user_id) == 1
+    # Existing tenants on shard 0 are routed exactly as before.
+    assert client.get("/api/clients", headers=small.headers).status_code == 200
+    assert client.portal.call(init_shards)["recorded"] == 0
@@ -0,0 +1,83 @@
+"""
+Slow-query log: statements over the threshold are kept with their route,
+user and normalized SQL, and some get their plan captured.
+"""
+import pytest
+
+from app.core.config import settings
+from app.core.database import engine, sqlite_read_engine
+from app.core.slow_queries import _explain_sql, normalize, slow_query_log
+
+from .conftest import TEST_PASSWORD
+
+
+@pytest.fixture
+def slow_log(client, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_ENABLED", True)
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0)  # everything is slow
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 1.0)
+    slow_query_log.clear()
+    slow_query_log.install(engine, sqlite_read_engine, plan_engines={engine: sqlite_read_engine})
+    yield slow_query_log
+    slow_query_log.uninstall()
+    slow_query_log.clear()
+
+
+def test_slow_queries_carry_request_context(client, tenants, slow_log):
+    small = tenants["small"]
+    response = client.get(f"/api/clients/{small.client_id}", headers=small.headers)
+    assert response.status_code == 200
+    client.portal.call(slow_log.drain)
+
+    entries = client.get("/api/admin/slow-queries", headers=small.headers).json()
+    assert entries
+    assert {entry["route"] for entry in entries} == {"GET /api/clients/{id}"}
+    assert {entry["principal"] for entry in entries} == {small.email}
+    statements = [entry["statement"] for entry in entries]
+    assert all(str(small.client_id) not in sql and small.email not in sql for sql in statements)
+    # One plan at a time: only some of the entries got one.
+    plans = [entry["explain"] for entry in entries if entry["explain"]]
+    assert plans and all("SEARCH" in plan or "SCAN" in plan for plan in plans)
+
+    limited = client.get("/api/admin/slow-queries", params={"limit": 1}, headers=small.headers).json()
+    assert limited == entries[:1]
+
+
+def test_writes_are_explained_on_the_read_pool(client, tenants, slow_log):
+    small = tenants["small"]
+    current = client.get(f"/api/clients/{small.client_id}", headers=small.headers).json()
+    slow_log.clear()
+    response = client.put(f"/api/clients/{small.client_id}", json=current, headers=small.headers)
+    assert response.status_code == 200
+    client.portal.call(slow_log.drain)
+
+    # The writer's only connection is still in the request's transaction.
+    writes = [entry for entry in slow_log.recent(50) if entry["statement"].startswith("UPDATE")]
+    assert any(entry["explain"] for entry in writes)
+
+
+def test_locking_reads_are_not_analyzed():
+    assert _explain_sql("postgresql", "SELECT 1").startswith("EXPLAIN (ANALYZE")
+    for statement in ("SELECT * FROM jobs WHERE id = $1 FOR UPDATE SKIP LOCKED",
+                      "select * from jobs for no key update",
+                      "SELECT id FROM projects FOR SHARE",
+                      "SELECT pg_advisory_xact_lock($1)",
+                      "SELECT pg_try_advisory_lock(42)",
+                      "SELECT nextval('payments_id_seq')"):
+        assert _explain_sql("postgresql", statement) == f"EXPLAIN {statement}"
+
+
+def test_slow_queries_are_for_admins_only(client):
+    email = "not-admin@example.com"
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    response = client.get("/api/admin/slow-queries", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 403
+
+
+def test_normalize_folds_literals_and_lists():
+    assert normalize("SELECT * FROM clients\n WHERE user_id = $1 AND name = 'O''Brien' AND id IN ($2, $3, $4)") == (
+        "SELECT * FROM clients WHERE user_id = ? AND name = ? AND id IN (...)")
+    assert normalize("SELECT id FROM t1 WHERE n > 10 LIMIT :limit OFFSET %(offset)s") == (
+        "SELECT id FROM t1 WHERE n > ? LIMIT ? OFFSET ?")
+    assert normalize("SELECT x::text FROM payments WHERE amount = -2.5") == "SELECT x::text FROM payments WHERE amount = ?"
@@ -0,0 +1,69 @@
+"""
+SQLite mode: tuned connections, one writer and a pool of readers.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import AsyncSessionLocal, PrimaryReadSessionLocal, engine, sqlite_read_engine
+from app.models.sync_tombstone import SyncTombstone
+
+
+def test_connections_are_tuned(client):
+    async def pragmas(session_factory):
+        async with session_factory() as session:
+            return {
+                name: (await session.execute(text(f"PRAGMA {name}"))).scalar()
+                for name in ("journal_mode", "synchronous", "foreign_keys", "query_only")
+            }
+
+    assert client.portal.call(pragmas, AsyncSessionLocal) == {
+        "journal_mode": "wal", "synchronous": 1, "foreign_keys": 1, "query_only": 0,
+    }
+    assert client.portal.call(pragmas, PrimaryReadSessionLocal)["query_only"] == 1
+
+
+def test_readers_refuse_writes(client):
+    async def write():
+        async with PrimaryReadSessionLocal() as session:
+            await session.execute(text("DELETE FROM sync_tombstones"))
+
+    with pytest.raises(OperationalError):
+        client.portal.call(write)
+
+
+def test_get_routes_use_the_reader_pool(client, tenants):
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    event.listen(sqlite_read_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/api/clients", headers=tenants["small"].headers)
+    finally:
+        event.remove(sqlite_read_engine.sync_engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    assert len(statements) == 2
+
+
+def test_concurrent_writers_queue_for_the_writer(client, tenants):
+    user_id = tenants["small"].user_id
+
+    async def write(n: int):
+        async with AsyncSessionLocal() as session:
+            session.add(SyncTombstone(user_id=user_id, entity="note", entity_id=-n, sync_seq=0))
+            await asyncio.sleep(0)
+            await session.commit()
+
+    async def write_all():
+        await asyncio.gather(*(write(n) for n in range(1, 21)))
+        async with AsyncSessionLocal() as session:
+            deleted = await session.execute(text("DELETE FROM sync_tombstones WHERE entity_id < 0"))
+            await session.commit()
+        return deleted.rowcount
+
+    assert engine.pool.size() == 1
+    assert client.portal.call(write_all) == 20
@@ -0,0 +1,84 @@
+"""
+Client typeahead: answered from a per-tenant in-memory index that the client
+routes keep current.
+"""
+from app.core.config import settings
+from app.core.suggest import TenantIndex, client_suggestions
+
+from .conftest import TEST_PASSWORD
+
+
+def _sign_up(client, email: str) -> dict:
+    assert client.post("/api/register", json={"email": email, "password": TEST_PASSWORD}).status_code == 200
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def _names(client, headers, q: str, **params):
+    response = client.get("/api/clients/suggest", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [match["name"] for match in response.json()]
+
+
+def test_suggestions_follow_writes_without_queries(client, query_recorder):
+    headers = _sign_up(client, "typeahead@example.com")
+    for name, email, phone in (
+        ("Zoë Smith", "zoe@smithworks.io", "+1 (555) 010-2030"),
+        ("Acme Corp", "billing@acme.example.com", None),
+        ("Jonas Acker", "jonas@example.com", "555 777 1234"),
+    ):
+        client.post("/api/clients", json={"name": name, "email": email, "phone": phone}, headers=headers)
+
+    with query_recorder.record():
+        assert _names(client, headers, "ac") == ["Acme Corp", "Jonas Acker"]
+    assert query_recorder.count == 2  # the user and the tenant's clients, once
+
+    with query_recorder.record():
+        assert _names(client, headers, "zoe") == ["Zoë Smith"]
+        assert _names(client, headers, "SMITH zo") == ["Zoë Smith"]
+        assert _names(client, headers, "worksi") == []
+        assert _names(client, headers, "onas ack") == ["Jonas Acker"]  # substring, via trigrams
+        assert _names(client, headers, "555-777") == ["Jonas Acker"]
+        assert _names(client, headers, "0102030") == ["Zoë Smith"]
+        assert _names(client, headers, "a", limit=1) == ["Acme Corp"]
+    assert query_recorder.count == 0
+
+    created = client.post("/api/clients", json={"name": "Acorn Ltd", "email": "hi@acorn.example.com"},
+                          headers=headers).json()
+    assert _names(client, headers, "ac") == ["Acme Corp", "Acorn Ltd", "Jonas Acker"]
+    client.put(f"/api/clients/{created['id']}", json={"name": "Oak Ltd", "email": "hi@oak.example.com"},
+               headers=headers)
+    assert _names(client, headers, "acor") == []
+    assert _names(client, headers, "oak") == ["Oak Ltd"]
+    assert client.delete(f"/api/clients/{created['id']}", headers=headers).status_code == 202
+    assert _names(client, headers, "oak") == []
+
+
+def test_index_is_bounded_and_rebuilt_when_old(client, tenants, monkeypatch, query_recorder):
+    small, large = tenants["small"], tenants["large"]
+    client_suggestions.clear()
+    monkeypatch.setattr(settings, "CLIENT_SUGGEST_TENANTS", 1)
+    assert _names(client, small.headers, "small")
+    assert _names(client, large.headers, "large")
+
+    # Only the large tenant's index is kept; the small one is loaded again.
+    with query_recorder.record():
+        _names(client, large.headers, "large")
+        _names(client, small.headers, "small")
+    assert query_recorder.count == 2
+
+    monkeypatch.setattr(settings, "CLIENT_SUGGEST_MAX_AGE_SECONDS", 0.0)
+    with query_recorder.record():
+        _names(client, small.headers, "small")
+    assert query_recorder.count == 2
+
+
+def test_tenant_index_updates_in_place():
+    index = TenantIndex([(1, "Ada Lovelace", "ada@example.com", None), (2, "Alan Turing", "alan@example.com", None)])
+    assert index.search("a", 10) == [1, 2]
+    index.upsert((1, "Grace Hopper", "grace@example.com", "555-0100"))
+    assert index.search("a", 10) == [2]
+    assert index.search("hop", 10) == [1]
+    index.remove(2)
+    assert index.search("a", 10) == []
+    assert len(index) == 1 and index._prefixes == sorted(index._prefixes)
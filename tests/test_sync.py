@@ -0,0 +1,70 @@
+"""
+Incremental sync: cursors, changed rows and tombstones.
+"""
+import uuid
+
+from .conftest import TEST_PASSWORD
+
+
+def _new_user(client):
+    email = f"sync-{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/api/register", json={"email": email, "password": TEST_PASSWORD})
+    tokens = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD}).json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def _ids(rows):
+    return sorted(row["id"] for row in rows)
+
+
+def test_sync_returns_only_the_delta(client):
+    headers = _new_user(client)
+    customer = client.post("/api/clients", json={"name": "Acme", "email": "acme@example.com"}, headers=headers).json()
+    project = client.post("/api/projects", json={"name": "Site", "description": "", "client_id": customer["id"]}, headers=headers).json()
+    payment = client.post(
+        "/api/payments", json={"amount": 10.0, "date_paid": "2025-07-01", "project_id": project["id"]}, headers=headers
+    ).json()
+    note = client.post("/api/notes", json={"content": "hi", "client_id": customer["id"]}, headers=headers).json()
+
+    snapshot = client.get("/api/sync", headers=headers).json()
+    assert snapshot["cursor"] == 4
+    assert [_ids(snapshot[k]) for k in ("clients", "projects", "payments", "notes")] == [
+        [customer["id"]], [project["id"]], [payment["id"]], [note["id"]]
+    ]
+    assert snapshot["deleted"] == []
+
+    # Nothing changed: an empty delta and the same cursor.
+    unchanged = client.get("/api/sync", params={"since": snapshot["cursor"]}, headers=headers).json()
+    assert unchanged == {**unchanged, "cursor": 4, "clients": [], "projects": [], "payments": [], "notes": [], "deleted": []}
+
+    client.put(f"/api/projects/{project['id']}", json={"status": "Active"}, headers=headers)
+    client.delete(f"/api/payments/{payment['id']}", headers=headers)
+
+    delta = client.get("/api/sync", params={"since": snapshot["cursor"]}, headers=headers).json()
+    assert delta["cursor"] == 6
+    assert _ids(delta["projects"]) == [project["id"]] and delta["projects"][0]["status"] == "Active"
+    assert delta["clients"] == delta["payments"] == delta["notes"] == []
+    assert delta["deleted"] == [{"type": "payment", "id": payment["id"]}]
+
+
+def test_deleted_client_is_reported_once(client):
+    headers = _new_user(client)
+    customer = client.post("/api/clients", json={"name": "Gone", "email": "gone@example.com"}, headers=headers).json()
+    cursor = client.get("/api/sync", headers=headers).json()["cursor"]
+
+    assert client.delete(f"/api/clients/{customer['id']}", headers=headers).status_code == 202
+
+    delta = client.get("/api/sync", params={"since": cursor}, headers=headers).json()
+    assert delta["clients"] == []
+    assert delta["deleted"] == [{"type": "client", "id": customer["id"]}]
+
+    after = client.get("/api/sync", params={"since": delta["cursor"]}, headers=headers).json()
+    assert after["deleted"] == []
+
+
+def test_sync_is_per_user(client, tenants):
+    headers = _new_user(client)
+    client.post("/api/clients", json={"name": "Mine", "email": "mine@example.com"}, headers=headers)
+
+    theirs = client.get("/api/sync", params={"since": 0}, headers=tenants["small"].headers).json()
+    assert all(row["name"] != "Mine" for row in theirs["clients"])
@@ -0,0 +1,55 @@
+"""
+Rows carry their owner's user_id, so moving one under another user's client
+or project must be refused.
+"""
+from sqlalchemy import create_engine, select
+
+from app.models.note import Note
+from app.models.payment import Payment
+from app.models.project import Project
+
+from .conftest import DATABASE_URL
+
+
+def _owner(model, row_id: int) -> int:
+    sync_engine = create_engine(DATABASE_URL.replace("+aiosqlite", ""))
+    with sync_engine.connect() as conn:
+        user_id = conn.execute(select(model.user_id).where(model.id == row_id)).scalar_one()
+    sync_engine.dispose()
+    return user_id
+
+
+def test_created_rows_carry_owner(client, tenants):
+    tenant = tenants["small"]
+    project = client.post(
+        "/api/projects", json={"name": "owned", "description": "d", "client_id": tenant.client_id}, headers=tenant.headers
+    ).json()
+    payment = client.post(
+        "/api/payments", json={"amount": 1.0, "date_paid": "2025-01-01", "project_id": project["id"]}, headers=tenant.headers
+    ).json()
+    note = client.post("/api/notes", json={"content": "n", "project_id": project["id"]}, headers=tenant.headers).json()
+
+    assert _owner(Project, project["id"]) == tenant.user_id
+    assert _owner(Payment, payment["id"]) == tenant.user_id
+    assert _owner(Note, note["id"]) == tenant.user_id
+
+
+def test_cannot_move_rows_to_another_tenant(client, tenants):
+    small, large = tenants["small"], tenants["large"]
+
+    response = client.put(f"/api/projects/{small.project_id}", json={"client_id": large.client_id}, headers=small.headers)
+    assert response.status_code == 403
+
+    response = client.put(
+        f"/api/payments/{small.payment_id}",
+        json={"amount": 1.0, "date_paid": "2025-01-01", "project_id": large.project_id},
+        headers=small.headers,
+    )
+    assert response.status_code == 403
+
+    response = client.put(
+        f"/api/notes/{small.client_note_id}", json={"content": "moved", "client_id": large.client_id}, headers=small.headers
+    )
+    assert response.status_code == 403
+
+    assert _owner(Project, small.project_id) == small.user_id
@@ -0,0 +1,122 @@
+"""
+Refresh-token rotation and in-memory token revocation.
+"""
+import uuid
+
+from app.core.database import AsyncSessionLocal
+from app.core.revocation import BloomFilter, RevocationList
+from app.core.security import create_reset_token
+
+from .conftest import TEST_PASSWORD
+
+
+def _register_and_login(client):
+    email = f"tokens-{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/api/register", json={"email": email, "password": TEST_PASSWORD})
+    response = client.post("/api/login", data={"username": email, "password": TEST_PASSWORD})
+    assert response.status_code == 200
+    return email, response.json()
+
+
+def _me(client, access_token):
+    return client.get("/api/users/me", headers={"Authorization": f"Bearer {access_token}"}).status_code
+
+
+def test_refresh_rotates_and_detects_reuse(client):
+    _, first = _register_and_login(client)
+
+    response = client.post("/api/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 200
+    second = response.json()
+    assert _me(client, second["access_token"]) == 200
+
+    # Replaying the rotated-out token revokes the whole family.
+    assert client.post("/api/refresh", json={"refresh_token": first["refresh_token"]}).status_code == 401
+    assert client.post("/api/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 401
+    assert _me(client, second["access_token"]) == 401
+
+
+def test_access_token_is_not_a_refresh_token(client):
+    _, tokens = _register_and_login(client)
+    assert client.post("/api/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+
+
+def test_logout_revokes_both_tokens(client):
+    _, tokens = _register_and_login(client)
+    response = client.post(
+        "/api/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == 200
+    assert _me(client, tokens["access_token"]) == 401
+    assert client.post("/api/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_password_reset_revokes_older_tokens(client):
+    email, before = _register_and_login(client)
+    reset_token = create_reset_token(data={"sub": email})
+
+    response = client.post("/api/reset-password", params={"token": reset_token, "new_password": "n3w-password"})
+    assert response.status_code == 200
+    assert _me(client, before["access_token"]) == 401
+    assert client.post("/api/refresh", json={"refresh_token": before["refresh_token"]}).status_code == 401
+    # The reset token itself is single-use.
+    assert client.post("/api/reset-password", params={"token": reset_token, "new_password": "x"}).status_code == 400
+
+    response = client.post("/api/login", data={"username": email, "password": "n3w-password"})
+    assert _me(client, response.json()["access_token"]) == 200
+
+
+def test_revocations_are_rebuilt_from_the_table(client):
+    email, tokens = _register_and_login(client)
+    client.post("/api/logout", json={"refresh_token": tokens["refresh_token"]},
+                headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+    async def fresh_worker_view():
+        fresh = RevocationList()
+        async with AsyncSessionLocal() as session:
+            await fresh.load(session)
+        return fresh
+
+    fresh = client.portal.call(fresh_worker_view)
+    from jose import jwt
+    claims = jwt.get_unverified_claims(tokens["access_token"])
+    assert fresh.is_revoked(claims["jti"], email, claims["iat"])
+    assert not fresh.is_revoked(uuid.uuid4().hex, email, claims["iat"])
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10_000))
+    assert false_positives < 300
+
+
+def test_sync_picks_up_revocations_committed_out_of_order(client):
+    from datetime import datetime, timedelta
+
+    from app.models.token_revocation import TokenRevocation
+
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    late, early = uuid.uuid4().hex, uuid.uuid4().hex
+
+    async def scenario():
+        worker = RevocationList()
+        async with AsyncSessionLocal() as session:
+            await worker.load(session)
+            # Two revocations get their ids; the higher one commits first.
+            base = worker._last_id + 1000
+            session.add(TokenRevocation(id=base + 2, jti=early, subject="a@example.com", expires_at=expires_at))
+            await session.commit()
+            await worker.sync(session)
+            seen_early = worker.is_token_revoked(early)
+            session.add(TokenRevocation(id=base + 1, jti=late, subject="b@example.com", expires_at=expires_at))
+            await session.commit()
+            await worker.sync(session)
+        return seen_early, worker.is_token_revoked(late)
+
+    assert client.portal.call(scenario) == (True, True)